@@ -8,14 +8,20 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import argparse
+import codecs
 import logging
-from bs4 import BeautifulSoup
 import csv
+import json
 import os
 import re
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 
 # 配置日志
@@ -26,14 +32,339 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 导入页面缓存和数据库工具类
+try:
+    from .page_cache import PageCache, CACHE_DIR, TRUNCATED_HEADER  # 当作为包导入时
+except ImportError:
+    from page_cache import PageCache, CACHE_DIR, TRUNCATED_HEADER  # 当在同一目录下直接运行时
+
+try:
+    from .html_extract import AbstractExtractor, AbstractSectionDetector, extract_citation_metadata, extract_dataset_links
+except ImportError:
+    from html_extract import AbstractExtractor, AbstractSectionDetector, extract_citation_metadata, extract_dataset_links
+
+try:
+    from .host_health import HostHealth
+except ImportError:
+    from host_health import HostHealth
+
+try:
+    from .db_helper import DBHelper
+except ImportError:
+    try:
+        from db_helper import DBHelper
+    except ImportError:
+        DBHelper = None
+
+# brotli 为可选依赖，安装后 urllib3 会自动解码 br 压缩的响应
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# 期刊识别规则表：DOI前缀 -> 期刊名（按从具体到宽泛的顺序匹配）
+JOURNAL_DOI_PREFIXES = [
+    ("10.1038/s41597", "Nature Scientific Data"),
+    ("10.1038/sdata", "Nature Scientific Data"),
+    ("10.5194/essd", "Earth System Science Data"),
+    ("10.5194", "Copernicus Journal"),
+    ("10.1038", "Nature"),
+    ("10.1126", "Science"),
+    ("10.1073", "PNAS"),
+    ("10.1002", "Wiley Journal"),
+    ("10.1111", "Wiley Journal"),
+    ("10.1007", "Springer Journal"),
+    ("10.1186", "Springer Journal"),
+    ("10.1016", "Elsevier Journal"),
+]
+
+# 期刊识别规则表：域名关键字 -> 期刊名（nature.com 和 copernicus.org 需要解析路径，单独处理）
+JOURNAL_DOMAIN_RULES = [
+    ("science.org", "Science"),
+    ("pnas.org", "PNAS"),
+    ("wiley.com", "Wiley Journal"),
+    ("springer.com", "Springer Journal"),
+    ("springeropen.com", "Springer Journal"),
+    ("biomedcentral.com", "Springer Journal"),
+    ("elsevier.com", "Elsevier Journal"),
+    ("sciencedirect.com", "Elsevier Journal"),
+]
+
+DOI_PATTERN = re.compile(r'10\.\d{4,9}/[^\s?#"<>]+', re.IGNORECASE)
+
+
+
+# 解析进程中复用的提取器（每个进程、每个后端一个，选择器只编译一次）
+_PROCESS_EXTRACTORS = {}
+
+
+def parse_page(content, encoding, journal, backend="auto", collect_datasets=True, extractor=None):
+    """解析论文页面，提取摘要、引用元数据和数据集链接
+    
+    只依赖参数本身，可以在解析进程池的子进程中执行。
+    
+    参数:
+        content: 页面原始字节
+        encoding: 页面编码
+        journal: 期刊名称
+        backend: HTML解析后端（未传入 extractor 时使用）
+        collect_datasets: 是否提取数据集链接
+        extractor: (可选) 当前进程已有的 AbstractExtractor
+    
+    返回:
+        dict: abstract、metadata、datasets、parse_time（秒）
+    """
+    start_time = time.monotonic()
+    if extractor is None:
+        extractor = _PROCESS_EXTRACTORS.get(backend)
+        if extractor is None:
+            extractor = _PROCESS_EXTRACTORS[backend] = AbstractExtractor(backend=backend)
+    html = content.decode(encoding or 'utf-8', errors='replace')
+    return {
+        "abstract": extractor.extract(html, journal),
+        "metadata": extract_citation_metadata(html),
+        "datasets": extract_dataset_links(html) if collect_datasets else [],
+        "parse_time": time.monotonic() - start_time,
+    }
+
+
+class FetchDeferred(Exception):
+    """主机熔断、退避过长或超出时间预算，本次放弃抓取，留待下次运行
+    
+    sent 为 False 表示放弃时还没有发出请求（熔断、退避过长或预算不足）。
+    """
+    
+    def __init__(self, message, sent=True):
+        super().__init__(message)
+        self.sent = sent
+
+
+class ResolvedURLCache:
+    """DOI -> 最终URL 的持久化缓存
+    
+    记录 doi.org 重定向后的最终地址，再次获取同一DOI时直接请求最终地址，
+    省去重定向的往返。缓存以JSON文件保存，在 flush() 时原子写入。
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'resolved_urls.json')
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取DOI解析缓存失败，将重新建立: {e}")
+            self._data = {}
+    
+    def get(self, doi):
+        """获取DOI对应的最终URL"""
+        if not doi:
+            return None
+        with self._lock:
+            return self._data.get(doi.lower())
+    
+    def set(self, doi, final_url):
+        """记录DOI对应的最终URL"""
+        if not doi or not final_url:
+            return
+        doi = doi.lower()
+        with self._lock:
+            if self._data.get(doi) != final_url:
+                self._data[doi] = final_url
+                self._dirty = True
+    
+    def flush(self):
+        """将缓存写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"写入DOI解析缓存失败: {e}")
+
+
 class AbstractFetcher:
     """论文摘要获取类"""
     
-    def __init__(self):
-        """初始化摘要获取器"""
+    def __init__(self, session=None, pool_connections=10, pool_maxsize=10, max_retries=3, backoff_factor=0.5, url_cache=None,
+                 page_cache=None, use_page_cache=True, offline=False, parser_backend="auto",
+                 stream=False, stream_max_bytes=512 * 1024, stream_chunk_size=16 * 1024,
+                 host_health=None, max_backoff_wait=10.0, request_timeout=30, collect_datasets=True):
+        """初始化摘要获取器
+        
+        参数:
+            session: (可选) 外部传入的 requests.Session，用于在多个组件间共享连接池
+            pool_connections: 连接池缓存的主机数量
+            pool_maxsize: 每个主机保持的最大连接数
+            max_retries: 连接错误及 429/5xx 状态码的最大重试次数
+            backoff_factor: 重试的指数退避因子（秒）
+            url_cache: (可选) DOI解析缓存，默认使用 cache/resolved_urls.json
+            page_cache: (可选) 页面缓存实例，默认使用 cache/pages
+            use_page_cache: 是否启用页面缓存
+            offline: 离线模式，只读取页面缓存，不访问网络
+            parser_backend: HTML解析后端（auto/selectolax/lxml/bs4）
+            stream: 流式下载模式，摘要容器闭合后立即停止读取页面
+            stream_max_bytes: 流式下载的字节上限
+            stream_chunk_size: 流式下载每次读取的块大小
+            host_health: (可选) 主机健康跟踪器，用于熔断与退避
+            max_backoff_wait: 主机处于退避期时最多原地等待的秒数，超过则推迟到下次运行
+            request_timeout: 单次请求的超时时间（秒），不会超过剩余的时间预算
+            collect_datasets: 是否同时提取页面中的数据仓储链接（流式模式下会读取到字节上限而不在摘要结束处停止）
+        """
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept-Encoding': ACCEPT_ENCODING
         }
+        self._owns_session = session is None
+        self.session = session or self._build_session(pool_connections, pool_maxsize, max_retries, backoff_factor)
+        self.session.headers.update(self.headers)
+        self.url_cache = url_cache or ResolvedURLCache()
+        self.page_cache = page_cache if page_cache is not None else (PageCache() if use_page_cache else None)
+        self.offline = offline
+        self.extractor = AbstractExtractor(backend=parser_backend)
+        self.stream = stream
+        self.stream_max_bytes = stream_max_bytes
+        self.stream_chunk_size = stream_chunk_size
+        self.host_health = host_health or HostHealth()
+        self.max_backoff_wait = max_backoff_wait
+        self.request_timeout = request_timeout
+        self.collect_datasets = collect_datasets
+        self.deadline = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """重置累计统计：页面数、传输字节数、下载与解析耗时（秒）"""
+        with self._stats_lock:
+            self.stats = {"pages": 0, "bytes": 0, "fetch_time": 0.0, "parse_time": 0.0}
+    
+    def _add_stats(self, nbytes, fetch_time, parse_time):
+        with self._stats_lock:
+            self.stats["pages"] += 1
+            self.stats["bytes"] += nbytes
+            self.stats["fetch_time"] += fetch_time
+            self.stats["parse_time"] += parse_time
+    
+    @staticmethod
+    def _build_session(pool_connections, pool_maxsize, max_retries, backoff_factor):
+        """创建带连接池、keep-alive 和重试策略的会话"""
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def set_deadline(self, seconds):
+        """设置整体抓取的时间预算（秒），None 表示不限制"""
+        self.deadline = time.monotonic() + seconds if seconds else None
+    
+    def remaining_time(self):
+        """剩余的时间预算（秒），未设置预算时返回None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+    
+    def _request_timeout(self):
+        """本次请求可用的超时时间，超出预算时抛出 FetchDeferred"""
+        remaining = self.remaining_time()
+        if remaining is None:
+            return self.request_timeout
+        if remaining <= 1:
+            raise FetchDeferred("已超出抓取时间预算", sent=False)
+        return min(self.request_timeout, remaining)
+    
+    def _wait_for_host(self, host):
+        """等待主机退避结束；熔断中或需要等待过久时抛出 FetchDeferred"""
+        if self.host_health.is_open(host):
+            raise FetchDeferred(f"主机 {host} 处于熔断状态", sent=False)
+        wait = self.host_health.wait_time(host)
+        if wait <= 0:
+            return
+        remaining = self.remaining_time()
+        if wait > self.max_backoff_wait or (remaining is not None and wait >= remaining):
+            raise FetchDeferred(f"主机 {host} 退避中，需等待 {wait:.1f} 秒", sent=False)
+        logger.info(f"主机 {host} 退避中，等待 {wait:.1f} 秒")
+        time.sleep(wait)
+    
+    def _send(self, url, stream=None):
+        """通过会话发送GET请求，并记录主机健康状态"""
+        host = self.host_health.host_of(url)
+        self._wait_for_host(host)
+        try:
+            response = self.session.get(
+                url, 
+                timeout=self._request_timeout(),
+                allow_redirects=True,  # 自动处理重定向
+                stream=self.stream if stream is None else stream
+            )
+        except requests.RequestException as e:
+            self.host_health.record_failure(host, str(e))
+            raise FetchDeferred(f"请求失败: {e}") from e
+        
+        # 429 和 5xx 视为主机异常（会话的重试已用尽），其余状态码视为主机正常
+        final_host = self.host_health.host_of(response.url) or host
+        if response.status_code == 429 or response.status_code >= 500:
+            self.host_health.record_failure(final_host, f"状态码 {response.status_code}")
+        else:
+            self.host_health.record_success(final_host)
+        return response
+    
+    def fetch_page(self, url):
+        """获取任意页面（如期刊的文章列表页），与摘要抓取共享会话、熔断和时间预算
+        
+        返回:
+            requests.Response；主机熔断或超出预算时抛出 FetchDeferred
+        """
+        response = self._send(url, stream=False)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise FetchDeferred(f"服务器暂时不可用，状态码: {response.status_code}")
+        return response
+    
+    def close(self):
+        """写回缓存，并关闭自身创建的会话，释放连接池"""
+        self.url_cache.flush()
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self._owns_session and self.session is not None:
+            self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def request_url(self, doi_or_url):
+        """获取该DOI或URL时实际请求的地址（已解析过的DOI使用缓存的最终地址）"""
+        url = doi_or_url if doi_or_url.startswith("http") else self.doi_to_url(doi_or_url)
+        if not url:
+            return None
+        return self.url_cache.get(self.extract_doi(url)) or url
     
     def doi_to_url(self, doi):
         """将DOI转换为URL"""
@@ -50,44 +381,59 @@ class AbstractFetcher:
         # 构造DOI解析URL
         return f"https://doi.org/{doi}"
     
-    def get_journal_from_url(self, url):
-        """从URL中识别期刊"""
+    def extract_doi(self, url):
+        """从DOI或URL中提取DOI（小写），无法提取时返回空字符串"""
         if not url:
+            return ""
+        match = DOI_PATTERN.search(url)
+        return match.group(0).rstrip("./").lower() if match else ""
+    
+    def get_journal_from_url(self, url, final_url=None):
+        """从URL中识别期刊
+        
+        完全基于静态规则表，不发送任何网络请求：先匹配DOI前缀，再匹配域名。
+        
+        参数:
+            url: 原始DOI链接或论文URL
+            final_url: (可选) GET请求重定向后的最终URL
+        """
+        if not url and not final_url:
             return "unknown"
-            
-        # 检查DOI格式的特殊处理
-        if "doi.org/10.1038/s41597" in url:
-            return "Nature Scientific Data"
-            
-        domain = urlparse(url).netloc
-        path = urlparse(url).path
         
-        # 首先检查重定向后的最终URL
-        final_url = url
-        try:
-            # 发送HEAD请求，只获取头信息，不下载内容
-            response = requests.head(url, headers=self.headers, timeout=10, allow_redirects=True)
-            final_url = response.url
-            print(f"重定向后的URL: {final_url}")
-        except Exception as e:
-            print(f"获取最终URL失败: {e}")
-            # 如果HEAD请求失败，使用原始URL
+        # 优先按DOI前缀识别（原始URL与最终URL中任意一个包含DOI即可）
+        for candidate in (url, final_url):
+            doi = self.extract_doi(candidate)
+            if doi:
+                for prefix, journal in JOURNAL_DOI_PREFIXES:
+                    if doi.startswith(prefix):
+                        return journal
         
-        final_domain = urlparse(final_url).netloc
-        final_path = urlparse(final_url).path
+        # 再按域名和路径识别，优先使用最终URL
+        for candidate in (final_url, url):
+            if not candidate:
+                continue
+            journal = self._journal_from_domain(candidate)
+            if journal != "unknown":
+                return journal
+        return "unknown"
+    
+    def _journal_from_domain(self, url):
+        """根据域名规则表识别期刊"""
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        path = parsed.path
         
         # 特别检查Nature Scientific Data (最优先)
-        if ("nature.com" in final_domain and 
-            ("/sdata/" in final_path or 
-             "scientificdata" in final_domain or 
-             "scientificdata" in final_path or
-             "s41597" in final_path)):  # 通过DOI前缀识别
+        if ("nature.com" in domain and 
+            ("/sdata/" in path or 
+             "scientificdata" in domain or 
+             "scientificdata" in path or
+             "s41597" in path)):  # 通过DOI前缀识别
             return "Nature Scientific Data"
             
-        # 检查最终URL
-        if "nature.com" in final_domain:
+        if "nature.com" in domain:
             # 先尝试从URL提取期刊名
-            journal_part = final_path.split('/')[1] if len(final_path.split('/')) > 1 else ""
+            journal_part = path.split('/')[1] if len(path.split('/')) > 1 else ""
             
             # 根据路径识别特定期刊
             if journal_part == "sdata" or "scientificdata" in journal_part:
@@ -99,155 +445,364 @@ class AbstractFetcher:
                     return f"Nature {journal_part.capitalize()}"
             else:
                 return "Nature"
-        elif "copernicus.org" in final_domain:
-            if "/essd/" in final_path:
+        elif "copernicus.org" in domain:
+            # ESSD 使用子域名 essd.copernicus.org，旧链接使用 /essd/ 路径
+            if domain.startswith("essd.") or "/essd/" in path:
                 return "Earth System Science Data"
-            else:
-                journal_part = final_path.split('/')[1] if len(final_path.split('/')) > 1 else ""
-                if journal_part:
-                    return f"Copernicus {journal_part.upper()}"
-                return "Copernicus Journal"
-        elif "science.org" in final_domain:
-            return "Science"
-        elif "pnas.org" in final_domain:
-            return "PNAS"
-        elif "wiley.com" in final_domain:
-            return "Wiley Journal"
-        elif "springer.com" in final_domain or "springeropen.com" in final_domain:
-            return "Springer Journal"
-        elif "elsevier.com" in final_domain or "sciencedirect.com" in final_domain:
-            return "Elsevier Journal"
+            subdomain = domain.split(".")[0]
+            if subdomain not in ("www", "copernicus"):
+                return f"Copernicus {subdomain.upper()}"
+            journal_part = path.split('/')[1] if len(path.split('/')) > 1 else ""
+            if journal_part:
+                return f"Copernicus {journal_part.upper()}"
+            return "Copernicus Journal"
+        
+        for domain_keyword, journal in JOURNAL_DOMAIN_RULES:
+            if domain_keyword in domain:
+                return journal
+        
+        # 尝试从DOI中提取出版商信息
+        if "/10." in url:
+            publisher = url.split("/10.")[1].split("/")[0]
+            if publisher:
+                return f"{publisher.upper()} Journal"
+        return "unknown"
+    
+    def _get_page(self, url, doi):
+        """获取论文页面，优先读取页面缓存
+        
+        返回:
+            (状态码, 最终URL, 页面原始字节, 编码, 传输字节数)；请求失败时抛出异常
+        """
+        if self.page_cache is not None:
+            cached = self.page_cache.get(url=url, doi=doi)
+            if cached and cached.status == 200:
+                logger.info(f"命中页面缓存: {cached.final_url}")
+                return 200, cached.final_url, cached.content, cached.encoding, 0
+        
+        if self.offline:
+            logger.warning(f"离线模式下页面缓存未命中: {url}")
+            return None, url, b"", None, 0
+        
+        # 已解析过的DOI直接请求最终地址，省去 doi.org 的重定向往返
+        request_url = self.url_cache.get(doi) or url
+        
+        # 发送请求
+        logger.info(f"正在获取页面内容: {request_url}")
+        print(f"正在请求: {request_url}")  # 添加更明显的输出
+        
+        # 流式模式下只读取到摘要结束为止
+        response = self._send(request_url)
+        
+        # 缓存的最终地址失效时，回退到原始DOI链接重新解析
+        if response.status_code != 200 and request_url != url:
+            logger.warning(f"缓存的最终URL请求失败 ({response.status_code})，改用原始链接: {url}")
+            response.close()
+            response = self._send(url)
+        
+        print(f"请求状态码: {response.status_code}")  # 输出状态码
+        if response.status_code != 200:
+            response.close()
+            if response.status_code == 429 or response.status_code >= 500:
+                raise FetchDeferred(f"服务器暂时不可用，状态码: {response.status_code}")
+            return response.status_code, response.url, b"", None, 0
+        
+        # 记录DOI重定向后的最终地址，供下次直接使用
+        self.url_cache.set(doi, response.url)
+        
+        headers = dict(response.headers)
+        if self.stream:
+            try:
+                content, complete = self._read_stream(response, self.get_journal_from_url(url, response.url))
+            except requests.RequestException as e:
+                self.host_health.record_failure(self.host_health.host_of(response.url), str(e))
+                raise FetchDeferred(f"读取页面失败: {e}") from e
+            encoding = response.encoding or 'utf-8'
+            nbytes = self._wire_bytes(response, content)
+            if not complete:
+                # 页面缓存不保存不完整的页面
+                headers[TRUNCATED_HEADER] = '1'
         else:
-            # 尝试从DOI中提取出版商信息
-            if "/10." in url:
-                doi_part = url.split("/10.")[1]
-                if "1038/s41597" in doi_part:  # 专门检查Nature Scientific Data的DOI
-                    return "Nature Scientific Data"
-                publisher = doi_part.split("/")[0]
-                if publisher:
-                    return f"{publisher.upper()} Journal"
-            
-            return "unknown"
+            content = response.content
+            encoding = response.encoding or response.apparent_encoding
+            nbytes = self._wire_bytes(response, content)
+        
+        if self.page_cache is not None:
+            self.page_cache.put(
+                url, response.url, content,
+                status=response.status_code,
+                headers=headers,
+                encoding=encoding,
+                doi=doi
+            )
+        return response.status_code, response.url, content, encoding, nbytes
     
-    def fetch_abstract(self, doi_or_url, journal_name=None): # 添加 journal_name 参数
-        """获取论文摘要
+    @staticmethod
+    def _wire_bytes(response, content):
+        """实际从连接读取的字节数（压缩传输时小于正文长度）"""
+        try:
+            return response.raw.tell() or len(content)
+        except Exception:
+            return len(content)
+    
+    def _read_stream(self, response, journal):
+        """分块读取响应，摘要容器闭合或达到字节上限后立即停止
         
-        参数:
-            doi_or_url: DOI或论文URL
-            journal_name: (可选) 期刊名称，用于辅助识别
+        返回:
+            (已读取的原始字节, 是否完整读取了整个页面)
+        """
+        detector = AbstractSectionDetector(journal)
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        chunks = []
+        total = 0
+        complete = True
+        try:
+            for chunk in response.iter_content(chunk_size=self.stream_chunk_size):
+                if not chunk:
+                    continue
+                chunks.append(chunk)
+                total += len(chunk)
+                # 需要提取数据集链接时不能在摘要结束处停止（数据可用性声明在正文之后）
+                if detector.supported and not self.collect_datasets:
+                    detector.feed(decoder.decode(chunk))
+                    if detector.closed:
+                        logger.info(f"摘要已结束，提前停止下载 (已读取 {total} 字节)")
+                        complete = False
+                        break
+                if total >= self.stream_max_bytes:
+                    logger.info(f"达到流式下载上限 {self.stream_max_bytes} 字节，停止下载")
+                    complete = False
+                    break
+        finally:
+            # 提前结束时关闭连接，不再读取剩余内容
+            response.close()
+        return b"".join(chunks), complete
+    
+    def extract_abstract(self, html, journal):
+        """从页面HTML中按期刊选择器提取摘要文本"""
+        return self.extractor.extract(html, journal)
+    
+    def _download(self, doi_or_url):
+        """下载论文页面（只包含网络部分，可在线程池中执行）
         
         返回:
-            字典，包含摘要和期刊信息
+            (结果字典, 页面原始字节, 编码)；无法获取页面时页面字节为None，结果字典即最终结果
         """
         # 转换DOI为URL
         url = doi_or_url if doi_or_url.startswith("http") else self.doi_to_url(doi_or_url)
         
         if not url:
             logger.error(f"无效的DOI或URL: {doi_or_url}")
-            return {"abstract": "", "journal": "unknown", "url": url}
+            return {"abstract": "", "journal": "unknown", "url": url}, None, None
+        
+        doi = self.extract_doi(url)
         
         try:
-            # 发送请求
-            logger.info(f"正在获取页面内容: {url}")
-            print(f"正在请求: {url}")  # 添加更明显的输出
-            
-            # 增加超时设置，并允许重定向
-            response = requests.get(
-                url, 
-                headers=self.headers, 
-                timeout=30,  # 增加超时时间到30秒
-                allow_redirects=True  # 自动处理重定向
-            )
-            
-            print(f"请求状态码: {response.status_code}")  # 输出状态码
+            start_time = time.monotonic()
+            status, final_url, content, encoding, nbytes = self._get_page(url, doi)
             
             # 处理状态码
-            if response.status_code != 200:
-                logger.error(f"获取页面失败，状态码: {response.status_code}")
-                print(f"错误: 获取页面失败，状态码: {response.status_code}")
-                return {"abstract": "", "journal": "unknown", "url": url}
+            if status != 200:
+                logger.error(f"获取页面失败，状态码: {status}")
+                print(f"错误: 获取页面失败，状态码: {status}")
+                return {"abstract": "", "journal": "unknown", "url": url}, None, None
                 
-            # 识别期刊
-            journal = self.get_journal_from_url(url)
+            # 识别期刊（复用GET响应的最终URL，不再额外发送请求）
+            journal = self.get_journal_from_url(url, final_url)
             logger.info(f"识别出期刊: {journal}")
             print(f"识别出期刊: {journal}")
             
-            # 解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 根据不同期刊使用不同的选择器
-            abstract = ""
-            
-            if journal == "Scientific Data":
-                # 尝试多种选择器
-                abstract_elements = soup.select('div#Abs1-content, section[data-title="Abstract"] p')
-                if abstract_elements:
-                    abstract = "\n".join([elem.get_text().strip() for elem in abstract_elements])
-                else:
-                    # 尝试查找更通用的选择器
-                    abstract_elements = soup.select('div.c-article-section__content p')
-                    if abstract_elements:
-                        abstract = "\n".join([elem.get_text().strip() for elem in abstract_elements])
-            
-            elif journal == "Earth System Science Data":
-                # ESSD期刊摘要选择器
-                abstract_elements = soup.select('div.abstract p, div.abstract-content p')
-                if abstract_elements:
-                    abstract = "\n".join([elem.get_text().strip() for elem in abstract_elements])
-            
-            else:
-                # 通用选择器
-                # 尝试常见的摘要标签类名
-                abstract_selectors = [
-                    'div.abstract p', 
-                    'div#abstract', 
-                    'section.abstract',
-                    'div[class*="abstract"]',
-                    'meta[name="description"]'
-                ]
-                
-                for selector in abstract_selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        if selector == 'meta[name="description"]':
-                            abstract = elements[0].get('content', '')
-                        else:
-                            abstract = "\n".join([elem.get_text().strip() for elem in elements])
-                        break
-            
-            # 清理摘要内容
-            if abstract:
-                # 移除多余空白
-                abstract = re.sub(r'\s+', ' ', abstract)
-                # 移除特殊标记
-                abstract = abstract.replace("Abstract", "").strip()
-                abstract = abstract.replace("\n", " ").strip()
-                logger.info(f"成功获取摘要: {abstract[:100]}...")
-            else:
-                logger.warning(f"未能找到摘要内容")
-                
-                # 尝试打印页面内容的一部分，帮助调试
-                page_sample = response.text[:500] + "..." if len(response.text) > 500 else response.text
-            
             return {
-                "abstract": abstract,
+                "abstract": "",
                 "journal": journal,
-                "url": url
-            }
+                "url": url,
+                "final_url": final_url,
+                "bytes": nbytes,
+                "fetch_time": time.monotonic() - start_time,
+                "deferred": False
+            }, content, encoding
+        
+        except FetchDeferred as e:
+            logger.warning(f"推迟获取摘要: {url}, 原因: {e}")
+            return {"abstract": "", "journal": "unknown", "url": url, "deferred": True, "error": str(e),
+                    "sent": e.sent}, None, None
             
         except Exception as e:
             logger.error(f"获取摘要过程中发生错误: {e}")
             import traceback
             print(f"错误: {e}")
             print(traceback.format_exc())  # 打印完整的错误栈
-            return {"abstract": "", "journal": "unknown", "url": url}
+            return {"abstract": "", "journal": "unknown", "url": url}, None, None
+    
+    def _finish(self, result, parsed):
+        """合并下载结果与解析结果，并记录统计"""
+        result.update(
+            abstract=parsed["abstract"],
+            metadata=parsed["metadata"],
+            datasets=parsed["datasets"],
+            elapsed=result["fetch_time"] + parsed["parse_time"]
+        )
+        self._add_stats(result["bytes"], result["fetch_time"], parsed["parse_time"])
+        if result["abstract"]:
+            logger.info(f"成功获取摘要 ({result['bytes']} 字节, {result['elapsed']:.2f}秒): {result['abstract'][:100]}...")
+        else:
+            logger.warning(f"未能找到摘要内容")
+        return result
     
-    def process_csv(self, input_file, output_file=None):
+    def fetch_abstract(self, doi_or_url, journal_name=None): # 添加 journal_name 参数
+        """获取论文摘要
+        
+        参数:
+            doi_or_url: DOI或论文URL
+            journal_name: (可选) 期刊名称，用于辅助识别
+        
+        返回:
+            字典，包含摘要和期刊信息
+        """
+        result, content, encoding = self._download(doi_or_url)
+        if content is None:
+            return result
+        try:
+            parsed = parse_page(content, encoding, result["journal"], collect_datasets=self.collect_datasets, extractor=self.extractor)
+        except Exception as e:
+            logger.error(f"解析页面时发生错误: {e}")
+            return {"abstract": "", "journal": "unknown", "url": result["url"]}
+        return self._finish(result, parsed)
+    
+    def fetch_abstracts(self, items, workers=4, parse_pool=None):
+        """并发获取多篇论文的摘要
+        
+        页面在线程池中下载；每个页面下载完成后立即交给解析进程池，
+        网络等待与CPU解析重叠，解析可使用多个CPU核心。
+        
+        参数:
+            items: DOI或URL列表
+            workers: 并发下载的线程数
+            parse_pool: (可选) concurrent.futures.ProcessPoolExecutor，为None时在当前线程解析
+        
+        返回:
+            list: 与 items 顺序一致的结果字典（格式同 fetch_abstract）
+        """
+        results = [None] * len(items)
+        parsing = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as downloads:
+            download_futures = {downloads.submit(self._download, item): index for index, item in enumerate(items)}
+            for future in as_completed(download_futures):
+                index = download_futures[future]
+                result, content, encoding = future.result()
+                if content is None:
+                    results[index] = result
+                elif parse_pool is None:
+                    # 在当前线程解析，其余下载仍在后台线程中进行
+                    try:
+                        parsed = parse_page(content, encoding, result["journal"], collect_datasets=self.collect_datasets, extractor=self.extractor)
+                        results[index] = self._finish(result, parsed)
+                    except Exception as e:
+                        logger.error(f"解析页面时发生错误: {e}")
+                        results[index] = {"abstract": "", "journal": "unknown", "url": result["url"]}
+                else:
+                    # 只向子进程传递页面字节，返回的是很小的结果字典
+                    parse_future = parse_pool.submit(
+                        parse_page, content, encoding, result["journal"], self.extractor.backend, self.collect_datasets
+                    )
+                    parsing[parse_future] = (index, result)
+        
+        for parse_future in as_completed(parsing):
+            index, result = parsing[parse_future]
+            try:
+                results[index] = self._finish(result, parse_future.result())
+            except Exception as e:
+                logger.error(f"解析页面时发生错误: {e}")
+                results[index] = {"abstract": "", "journal": "unknown", "url": result["url"]}
+        return results
+    
+    def reparse_cache(self, output_file=None, update_db=False):
+        """基于页面缓存重新提取全部摘要，不访问网络
+        
+        参数:
+            output_file: (可选) 结果CSV路径，包含 doi、url、journal、abstract 列
+            update_db: 是否将更长的摘要写回 raw_papers 表，并保存提取到的数据集链接
+        
+        返回:
+            int: 成功提取摘要的页面数
+        """
+        if self.page_cache is None:
+            logger.error("页面缓存未启用，无法重新解析")
+            return 0
+        
+        writer = None
+        f = None
+        if output_file:
+            f = open(output_file, 'w', encoding='utf-8', newline='')
+            writer = csv.DictWriter(f, fieldnames=['doi', 'url', 'journal', 'abstract'])
+            writer.writeheader()
+        
+        extracted = 0
+        updated = 0
+        try:
+            for page in self.page_cache.iter_pages():
+                if page.status != 200:
+                    continue
+                html = page.content.decode(page.encoding or 'utf-8', errors='replace')
+                journal = self.get_journal_from_url(page.url, page.final_url)
+                abstract = self.extract_abstract(html, journal)
+                if not abstract:
+                    logger.warning(f"缓存页面未能提取摘要: {page.final_url}")
+                    continue
+                extracted += 1
+                if writer:
+                    writer.writerow({'doi': page.doi or '', 'url': page.final_url, 'journal': journal, 'abstract': abstract})
+                if update_db and DBHelper and page.doi:
+                    if DBHelper.update_raw_abstract(page.doi, abstract):
+                        updated += 1
+                    if self.collect_datasets:
+                        DBHelper.save_paper_datasets([(page.doi, dataset) for dataset in extract_dataset_links(html)])
+        finally:
+            if f:
+                f.close()
+        
+        logger.info(f"缓存重新解析完成，共提取 {extracted} 条摘要，更新数据库 {updated} 条")
+        return extracted
+    
+    def _load_checkpoint(self, checkpoint_file, input_file):
+        """读取CSV批处理的断点，输入文件不一致时忽略"""
+        if not os.path.exists(checkpoint_file):
+            return None
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('input') != os.path.abspath(input_file):
+                logger.warning(f"断点文件对应的输入文件不同，忽略断点: {checkpoint_file}")
+                return None
+            return checkpoint
+        except Exception as e:
+            logger.warning(f"读取断点文件失败，将从头开始: {e}")
+            return None
+    
+    def _save_checkpoint(self, checkpoint_file, input_file, rows_done, output_offset):
+        """原子写入CSV批处理的断点：已完成的行数及对应的输出文件偏移量"""
+        tmp_path = f"{checkpoint_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'input': os.path.abspath(input_file),
+                'rows_done': rows_done,
+                'output_offset': output_offset,
+                'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }, f)
+        os.replace(tmp_path, checkpoint_file)
+    
+    def process_csv(self, input_file, output_file=None, workers=4, resume=True, checkpoint_every=10):
         """处理CSV文件中的DOI，获取摘要
         
+        逐行流式读取输入，以有限并发抓取摘要，按输入顺序追加写入输出文件，
+        并维护断点文件（输出文件名加 .checkpoint 后缀），中断后重新运行会从断点继续。
+        
         参数:
             input_file: 输入CSV文件路径，需要包含doi列
             output_file: 输出CSV文件路径，默认为input_file加上_with_abstracts后缀
+            workers: 并发抓取的线程数
+            resume: 是否从断点继续
+            checkpoint_every: 每写入多少行更新一次断点
         """
         if not os.path.exists(input_file):
             logger.error(f"输入文件不存在: {input_file}")
@@ -256,63 +811,97 @@ class AbstractFetcher:
         if not output_file:
             name, ext = os.path.splitext(input_file)
             output_file = f"{name}_with_abstracts{ext}"
+        checkpoint_file = f"{output_file}.checkpoint"
         
         try:
-            # 读取输入CSV
-            data = []
-            with open(input_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                headers = reader.fieldnames
+            with open(input_file, 'r', encoding='utf-8', newline='') as fin:
+                reader = csv.DictReader(fin)
+                headers = list(reader.fieldnames or [])
                 
                 # 检查是否有doi列
                 if 'doi' not in headers:
                     logger.error(f"输入文件 {input_file} 中没有doi列")
                     return False
                     
-                # 检查是否已有abstract列
-                if 'abstract' not in headers:
-                    headers.append('abstract')
-                    
-                data = list(reader)
+                # 检查是否已有abstract和journal列
+                for column in ('abstract', 'journal'):
+                    if column not in headers:
+                        headers.append(column)
                 
-            logger.info(f"读取了 {len(data)} 条记录，开始获取摘要...")
-            
-            # 获取摘要
-            for i, row in enumerate(data):
-                doi = row.get('doi', '')
-                existing_abstract = row.get('abstract', '')
+                # 读取断点：截断输出文件到断点位置，丢弃断点之后未确认的行
+                checkpoint = self._load_checkpoint(checkpoint_file, input_file) if resume else None
+                rows_done = 0
+                if checkpoint and os.path.exists(output_file):
+                    rows_done = checkpoint.get('rows_done', 0)
+                    fout = open(output_file, 'r+', encoding='utf-8', newline='')
+                    fout.seek(checkpoint.get('output_offset', 0))
+                    fout.truncate()
+                    logger.info(f"从断点继续，跳过已完成的 {rows_done} 条记录")
+                else:
+                    fout = open(output_file, 'w', encoding='utf-8', newline='')
                 
-                # 检查现有摘要是否足够长
-                if existing_abstract and len(existing_abstract) > 50:
-                    logger.info(f"使用CSV中已有的摘要 (DOI: {doi})")
-                    continue
+                with fout, ThreadPoolExecutor(max_workers=workers) as executor:
+                    writer = csv.DictWriter(fout, fieldnames=headers, extrasaction='ignore')
+                    if rows_done == 0:
+                        writer.writeheader()
                     
-                if not doi:
-                    logger.warning(f"记录 {i+1}/{len(data)} 没有DOI，跳过")
-                    continue
-                
-                logger.info(f"处理记录 {i+1}/{len(data)} DOI: {doi}")
-                result = self.fetch_abstract(doi)
-                
-                if result['abstract']:
-                    row['abstract'] = result['abstract']
+                    pending = deque()  # 按输入顺序排列的 (行, Future或None)
+                    max_in_flight = max(1, workers * 2)
+                    fetched = deferred = 0
                     
-                    # 如果没有journal信息，添加
-                    if 'journal' not in row or not row['journal']:
-                        row['journal'] = result['journal']
-                
-                # 每10条记录休息一下，避免被服务器封锁
-                if (i + 1) % 10 == 0:
-                    logger.info("暂停2秒...")
-                    time.sleep(2)
+                    def write_ready(block):
+                        """按输入顺序写出已完成的行；block为True时等待队首完成"""
+                        nonlocal rows_done, fetched, deferred
+                        while pending and (block or pending[0][1] is None or pending[0][1].done()):
+                            row, future = pending.popleft()
+                            block = False
+                            if future is not None:
+                                result = future.result()
+                                if result.get('deferred'):
+                                    deferred += 1
+                                elif result['abstract']:
+                                    fetched += 1
+                                    row['abstract'] = result['abstract']
+                                    # 如果没有journal信息，添加
+                                    if not row.get('journal'):
+                                        row['journal'] = result['journal']
+                            writer.writerow(row)
+                            rows_done += 1
+                            if rows_done % checkpoint_every == 0:
+                                fout.flush()
+                                self._save_checkpoint(checkpoint_file, input_file, rows_done, fout.tell())
                     
-            # 写入输出CSV
-            with open(output_file, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(data)
-                
-            logger.info(f"处理完成，结果保存到 {output_file}")
+                    for i, row in enumerate(reader):
+                        if i < rows_done:
+                            continue
+                        
+                        doi = row.get('doi', '')
+                        existing_abstract = row.get('abstract', '')
+                        
+                        # 检查现有摘要是否足够长
+                        if existing_abstract and len(existing_abstract) > 50:
+                            logger.info(f"使用CSV中已有的摘要 (DOI: {doi})")
+                            pending.append((row, None))
+                        elif not doi:
+                            logger.warning(f"记录 {i+1} 没有DOI，跳过")
+                            pending.append((row, None))
+                        else:
+                            logger.info(f"处理记录 {i+1} DOI: {doi}")
+                            pending.append((row, executor.submit(self.fetch_abstract, doi)))
+                        
+                        write_ready(block=len(pending) >= max_in_flight)
+                    
+                    while pending:
+                        write_ready(block=True)
+                    
+                    fout.flush()
+                    self._save_checkpoint(checkpoint_file, input_file, rows_done, fout.tell())
+            
+            # 全部完成后删除断点文件
+            os.remove(checkpoint_file)
+            logger.info(f"处理完成，共 {rows_done} 条记录，新获取摘要 {fetched} 条，推迟 {deferred} 条，结果保存到 {output_file}")
+            if deferred:
+                logger.info("被推迟的记录摘要为空，可将输出文件作为输入重新运行以补全")
             return True
             
         except Exception as e:
@@ -325,36 +914,66 @@ def main():
     parser.add_argument('--doi', help='要获取摘要的DOI或URL')
     parser.add_argument('--input', help='输入CSV文件路径')
     parser.add_argument('--output', help='输出CSV文件路径')
+    parser.add_argument('--pool-size', type=int, default=10, help='每个主机的连接池大小')
+    parser.add_argument('--retries', type=int, default=3, help='请求失败时的最大重试次数')
+    parser.add_argument('--no-cache', action='store_true', help='不使用页面缓存')
+    parser.add_argument('--reparse-cache', action='store_true', help='基于页面缓存重新提取全部摘要（不访问网络）')
+    parser.add_argument('--update-db', action='store_true', help='重新解析时将更长的摘要写回数据库')
+    parser.add_argument('--parser', default='auto', choices=['auto', 'selectolax', 'lxml', 'bs4'], help='HTML解析后端')
+    parser.add_argument('--workers', type=int, default=4, help='CSV模式下并发抓取的线程数')
+    parser.add_argument('--no-resume', action='store_true', help='CSV模式下忽略断点，从头开始')
+    parser.add_argument('--stream', action='store_true', help='流式下载页面，读到摘要结束即停止（不提取数据集链接）')
+    parser.add_argument('--max-bytes', type=int, default=512 * 1024, help='流式下载的字节上限')
     
     args = parser.parse_args()
     
-    fetcher = AbstractFetcher()
-    
-    if args.doi:
-        # 单个DOI模式
-        result = fetcher.fetch_abstract(args.doi)
-        print(f"期刊: {result['journal']}")
-        print(f"摘要: {result['abstract']}")
-        
-    elif args.input:
-        # CSV模式
-        success = fetcher.process_csv(args.input, args.output)
-        if not success:
-            sys.exit(1)
-    
-    else:
-        # 交互模式
-        print("请输入DOI或URL (输入q退出):")
-        while True:
-            doi = input("> ")
-            if doi.lower() == 'q':
-                break
+    fetcher = AbstractFetcher(
+        pool_maxsize=max(args.pool_size, args.workers),
+        max_retries=args.retries,
+        use_page_cache=not args.no_cache,
+        offline=args.reparse_cache,
+        parser_backend=args.parser,
+        stream=args.stream,
+        stream_max_bytes=args.max_bytes,
+        collect_datasets=not args.stream
+    )
+    
+    try:
+        if args.reparse_cache:
+            # 离线重新解析模式
+            fetcher.reparse_cache(args.output, update_db=args.update_db)
+        
+        elif args.doi:
+            # 单个DOI模式
+            result = fetcher.fetch_abstract(args.doi)
+            print(f"期刊: {result['journal']}")
+            print(f"摘要: {result['abstract']}")
+            for dataset in result.get('datasets', []):
+                print(f"数据集: [{dataset['repository']}] {dataset['url']}")
+        
+        elif args.input:
+            # CSV模式
+            success = fetcher.process_csv(args.input, args.output, workers=args.workers, resume=not args.no_resume)
+            if not success:
+                sys.exit(1)
+    
+        else:
+            # 交互模式
+            print("请输入DOI或URL (输入q退出):")
+            while True:
+                doi = input("> ")
+                if doi.lower() == 'q':
+                    break
                 
-            if doi:
-                result = fetcher.fetch_abstract(doi)
-                print(f"期刊: {result['journal']}")
-                print(f"摘要: {result['abstract']}")
-                print("\n请输入下一个DOI或URL (输入q退出):")
+                if doi:
+                    result = fetcher.fetch_abstract(doi)
+                    print(f"期刊: {result['journal']}")
+                    print(f"摘要: {result['abstract']}")
+                    for dataset in result.get('datasets', []):
+                        print(f"数据集: [{dataset['repository']}] {dataset['url']}")
+                    print("\n请输入下一个DOI或URL (输入q退出):")
+    finally:
+        fetcher.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+历史论文回填模块
+
+RSS源只包含最近几十篇论文。本模块按时间段遍历期刊的文章列表/归档页面，
+回填指定日期范围内的历史数据论文：
+1. 按年份逐页翻阅文章列表，每页处理完后在 crawl_checkpoint 表记录进度
+2. 中断后重新运行会从断点继续，已覆盖本次日期范围的时间段直接跳过
+3. 新论文复用 RSSCrawler 的去重、摘要增强和批量入库流程，并对请求限速
+
+使用方法:
+python -m get_data.backfill --journal "Scientific Data" --start 2021-01-01 --end 2023-12-31
+"""
+
+import re
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    LISTING_PARSER = "lxml"
+except ImportError:
+    LISTING_PARSER = "html.parser"
+
+# 导入数据库工具类
+try:
+    from .db_helper import DBHelper  # 当作为包导入时
+except ImportError:
+    try:
+        from db_helper import DBHelper  # 当在同一目录下直接运行时
+    except ImportError:
+        print("错误：无法导入数据库工具类，请确保 db_helper.py 文件存在")
+        DBHelper = None
+
+try:
+    from .crawler import RSSCrawler
+    from .abstract_fetcher import AbstractFetcher, FetchDeferred
+except ImportError:
+    from crawler import RSSCrawler
+    from abstract_fetcher import AbstractFetcher, FetchDeferred
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+NATURE_ARTICLE_PATTERN = re.compile(r'/articles/(s41597-[\w-]+)$')
+ESSD_ARTICLE_PATTERN = re.compile(r'essd\.copernicus\.org/articles/(\d+)/(\d+)/(\d{4})/?$')
+ISO_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+
+def parse_nature_listing(html, page_url):
+    """解析 Nature Scientific Data 的文章列表页"""
+    soup = BeautifulSoup(html, LISTING_PARSER)
+    items = []
+    seen = set()
+    for article in soup.select("article"):
+        link = article.select_one('a[href*="/articles/s41597-"]')
+        if not link:
+            continue
+        url = urljoin(page_url, link.get("href", "")).split("?")[0]
+        match = NATURE_ARTICLE_PATTERN.search(url)
+        if not match or url in seen:
+            continue
+        seen.add(url)
+        time_tag = article.select_one("time[datetime]")
+        date_match = ISO_DATE_PATTERN.search(time_tag.get("datetime", "")) if time_tag else None
+        items.append({
+            "title": link.get_text().strip(),
+            "url": url,
+            "doi": f"10.1038/{match.group(1)}",
+            "publishDate": date_match.group(1) if date_match else "",
+        })
+    return items
+
+
+def parse_essd_listing(html, page_url):
+    """解析 ESSD 的卷目录页（每卷对应一年，全部文章列在同一页）"""
+    soup = BeautifulSoup(html, LISTING_PARSER)
+    items = []
+    seen = set()
+    for link in soup.select("a[href]"):
+        url = urljoin(page_url, link.get("href", "")).split("?")[0]
+        match = ESSD_ARTICLE_PATTERN.search(url)
+        title = link.get_text().strip()
+        if not match or url in seen or not title:
+            continue
+        seen.add(url)
+        volume, first_page, year = match.groups()
+        items.append({
+            "title": title,
+            "url": url,
+            "doi": f"10.5194/essd-{volume}-{first_page}-{year}",
+            "publishDate": "",  # 列表页没有日期，摘要增强时从文章页 meta 补全
+        })
+    return items
+
+
+# 归档来源配置：列表页URL模板、解析函数、是否分页
+ARCHIVE_SOURCES = {
+    "Scientific Data": {
+        "listing_url": "https://www.nature.com/sdata/research-articles?searchType=journalSearch&sort=PubDate&year={year}&page={page}",
+        "parser": parse_nature_listing,
+        "paged": True,
+    },
+    "Earth System Science Data": {
+        # ESSD 第1卷为2009年
+        "listing_url": "https://essd.copernicus.org/articles/{volume}/",
+        "parser": parse_essd_listing,
+        "paged": False,
+        "volume_offset": 2008,
+    },
+}
+
+
+class BackfillCrawler:
+    """按日期范围回填历史论文的爬虫"""
+
+    def __init__(self, crawler=None, throttle=2.0, time_budget=None, max_pages=500):
+        """初始化回填爬虫
+
+        参数:
+            crawler: (可选) RSSCrawler 实例，复用其去重、摘要增强与入库流程
+            throttle: 相邻两次请求（列表页或文章页）之间的最小间隔（秒）
+            time_budget: (可选) 本次运行的时间预算（秒），超出后停止并保留断点
+            max_pages: 每个时间段最多翻阅的页数（防止列表页异常时无限翻页）
+        """
+        self.crawler = crawler or RSSCrawler()
+        self.fetcher = self.crawler.abstract_fetcher
+        self.throttle = throttle
+        self.time_budget = time_budget
+        self.max_pages = max_pages
+        self._last_request = 0.0
+        self._seen_dois = set()  # 本次运行中已处理的DOI（列表页跨页可能重复）
+
+    def _wait_throttle(self):
+        """限速：保证相邻请求之间至少间隔 throttle 秒"""
+        wait = self._last_request + self.throttle - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_request = time.monotonic()
+
+    def _out_of_time(self):
+        remaining = self.fetcher.remaining_time()
+        return remaining is not None and remaining <= 0
+
+    def _process_items(self, journal, items, start_date, end_date):
+        """对列表页条目去重、摘要增强并批量入库，返回 (新条目数, 入库数)"""
+        # 每页只查询本页出现的DOI
+        existing_dois = self.crawler.get_existing_dois(item["doi"] for item in items) | self._seen_dois
+        papers = []
+        for item in items:
+            if item["doi"].lower() in existing_dois:
+                continue
+            if item["publishDate"] and not (start_date <= item["publishDate"] <= end_date):
+                continue
+
+            paper_data = {
+                "journal": journal,
+                "title": item["title"],
+                "abstract": "",
+                "publishDate": item["publishDate"],
+                "doi": item["doi"],
+                "url": item["url"],
+                "authors": "Unknown",
+                "tags": "",
+            }
+            self._wait_throttle()
+            deferred_reason = self.crawler.enrich_paper(paper_data, force=True)
+
+            # 日期由文章页补全后再次检查范围
+            publish_date = paper_data.get("publishDate", "")
+            if deferred_reason is None and publish_date and not (start_date <= publish_date <= end_date):
+                continue
+            papers.append((paper_data, deferred_reason))
+            existing_dois.add(item["doi"].lower())
+            self._seen_dois.add(item["doi"].lower())
+
+        saved, deferred = self.crawler.store_papers(papers)
+        if deferred:
+            logger.info(f"{deferred} 条论文的摘要增强被推迟，将在后续爬取中重试")
+        return len(papers), saved
+
+    def backfill_period(self, journal, year, start_date, end_date):
+        """回填某个期刊某一年中 start_date ~ end_date 范围内的论文，返回是否完成该时间段
+
+        断点记录已翻阅到的最早日期和回填时的结束日期：只有二者覆盖了本次的日期范围时才跳过，
+        开始日期更早时从断点继续向后翻页，结束日期更晚时从第1页重新翻阅。
+        """
+        source = ARCHIVE_SOURCES[journal]
+        period = str(year)
+        period_start = max(start_date, f"{year}-01-01")
+        period_end = min(end_date, f"{year}-12-31")
+
+        checkpoint = DBHelper.get_crawl_checkpoint(journal, period) if DBHelper else None
+        page = 1
+        reached = None  # 已翻阅到的最早发布日期
+        covered_to = period_end
+        if checkpoint:
+            if not checkpoint.get("covered_to"):
+                # 旧版本的断点没有记录日期范围：从断点继续，翻到列表末尾或开始日期之前
+                page = checkpoint["next_page"]
+            elif checkpoint["covered_to"] >= period_end:
+                covered_from = checkpoint.get("covered_from")
+                if checkpoint.get("status") == "done" and covered_from and covered_from <= period_start:
+                    logger.info(f"{journal} {period} 已回填至 {covered_from}，跳过")
+                    return True
+                page = checkpoint["next_page"]
+                reached = covered_from
+                covered_to = checkpoint["covered_to"]
+            else:
+                logger.info(f"{journal} {period} 的结束日期晚于已回填的 {checkpoint['covered_to']}，从第 1 页重新翻阅")
+
+        while page <= self.max_pages:
+            if self._out_of_time():
+                logger.warning(f"超出回填时间预算，停止于 {journal} {period} 第 {page} 页")
+                return False
+
+            url = source["listing_url"].format(
+                year=year,
+                page=page,
+                volume=year - source.get("volume_offset", 0)
+            )
+            logger.info(f"回填 {journal} {period} 第 {page} 页: {url}")
+            self._wait_throttle()
+            try:
+                response = self.fetcher.fetch_page(url)
+            except FetchDeferred as e:
+                logger.warning(f"列表页获取被推迟，保留断点: {e}")
+                return False
+
+            items = source["parser"](response.text, response.url) if response.status_code == 200 else []
+            if not items:
+                logger.info(f"{journal} {period} 第 {page} 页没有更多条目，该时间段回填完成")
+                if DBHelper:
+                    DBHelper.save_crawl_checkpoint(journal, period, page, status="done",
+                                                   covered_from=f"{year}-01-01", covered_to=covered_to)
+                return True
+
+            new_count, saved = self._process_items(journal, items, start_date, end_date)
+            logger.info(f"{journal} {period} 第 {page} 页: {len(items)} 条目，新增 {new_count} 条，入库 {saved} 条")
+
+            # 列表按发布日期倒序排列，整页都早于开始日期时无需继续翻页
+            dates = [item["publishDate"] for item in items if item["publishDate"]]
+            if dates:
+                reached = min([min(dates)] + ([reached] if reached else []))
+            exhausted = not source["paged"]
+            finished = exhausted or (dates and max(dates) < start_date)
+            if DBHelper:
+                DBHelper.save_crawl_checkpoint(
+                    journal, period, page + 1,
+                    status="done" if finished else "in_progress",
+                    items_seen=len(items),
+                    items_saved=saved,
+                    covered_from=f"{year}-01-01" if exhausted else reached,
+                    covered_to=covered_to
+                )
+            if finished:
+                return True
+            page += 1
+
+        logger.warning(f"{journal} {period} 已达到最大页数 {self.max_pages}")
+        return True
+
+    def run(self, journal, start_date, end_date, reset=False):
+        """回填指定期刊在日期范围内的论文
+
+        参数:
+            journal: 期刊名称（ARCHIVE_SOURCES 的键）
+            start_date: 开始日期 YYYY-MM-DD
+            end_date: 结束日期 YYYY-MM-DD
+            reset: 是否清除已有断点，从头回填
+
+        返回:
+            bool: 是否完成了整个日期范围
+        """
+        if journal not in ARCHIVE_SOURCES:
+            logger.error(f"不支持回填的期刊: {journal}")
+            return False
+        if reset and DBHelper:
+            DBHelper.reset_crawl_checkpoints(journal)
+
+        self.fetcher.set_deadline(self.time_budget)
+
+        start_year = int(start_date[:4])
+        end_year = int(end_date[:4])
+        # 从最近的年份开始回填
+        for year in range(end_year, start_year - 1, -1):
+            if not self.backfill_period(journal, year, start_date, end_date):
+                return False
+        logger.info(f"{journal} {start_date} ~ {end_date} 回填完成")
+        return True
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="历史论文回填工具")
+    parser.add_argument("--journal", required=True, choices=list(ARCHIVE_SOURCES), help="要回填的期刊")
+    parser.add_argument("--start", required=True, help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", default=datetime.now().strftime("%Y-%m-%d"), help="结束日期 YYYY-MM-DD，默认今天")
+    parser.add_argument("--throttle", type=float, default=2.0, help="相邻请求的最小间隔（秒）")
+    parser.add_argument("--time-budget", type=float, default=None, help="本次运行的时间预算（秒）")
+    parser.add_argument("--reset", action="store_true", help="清除断点，从头回填")
+    parser.add_argument("--stream", action="store_true", help="流式下载文章页，读到摘要结束即停止（不提取数据集链接）")
+    args = parser.parse_args()
+
+    if not DBHelper:
+        logger.error("数据库工具类未正确初始化，无法回填")
+        sys.exit(1)
+    DBHelper.initialize_tables()
+
+    crawler = RSSCrawler(abstract_fetcher=AbstractFetcher(stream=args.stream, collect_datasets=not args.stream))
+    try:
+        backfill = BackfillCrawler(crawler, throttle=args.throttle, time_budget=args.time_budget)
+        completed = backfill.run(args.journal, args.start, args.end, reset=args.reset)
+    finally:
+        crawler.close()
+
+    if not completed:
+        logger.info("回填未全部完成，重新运行同一命令即可从断点继续")
+
+
+if __name__ == "__main__":
+    main()
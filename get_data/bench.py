@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫性能基准测试
+
+通过本地回放服务器运行完整的 RSSCrawler.crawl()，不访问真实站点，结果可重复：
+1. 默认使用合成RSS源（条目数可设为 10 ~ 10000），每个条目对应一个文章页面
+2. 也可以回放 `python -m get_data.replay record` 录制的真实夹具
+3. 报告每秒条目数、传输字节数，以及各阶段（RSS下载/解析、去重、构建、
+   页面下载、摘要解析、入库）的耗时
+4. normalize 子命令对RSS条目规范化（日期解析、摘要清理）做微基准测试
+5. llm 子命令用本地模拟LLM端点（带长尾延迟）比较开启/关闭对冲请求时每篇论文的延迟分位数
+
+使用方法:
+python -m get_data.bench crawl --entries 10 100 1000
+python -m get_data.bench crawl --entries 1000 --stream --parser lxml
+python -m get_data.bench crawl --fixtures fixtures/live
+python -m get_data.bench normalize --entries 10000
+python -m get_data.bench llm --papers 400 --slow-rate 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+
+try:
+    from .replay import ReplayServer, SyntheticSite, FixtureStore, install_replay
+    from .crawler import RSSCrawler
+    from .feed_scheduler import FeedScheduler
+    from .abstract_fetcher import AbstractFetcher, ResolvedURLCache
+    from .page_cache import PageCache
+    from .entry_normalizer import EntryNormalizer
+    from .mock_llm import MockLLMServer
+    from .llm_router import LLMRouter, Endpoint, percentile
+    from .rate_limiter import RateLimiter
+    from .process import NLPProcessor, FIELD_TASKS
+except ImportError:
+    from replay import ReplayServer, SyntheticSite, FixtureStore, install_replay
+    from crawler import RSSCrawler
+    from feed_scheduler import FeedScheduler
+    from abstract_fetcher import AbstractFetcher, ResolvedURLCache
+    from page_cache import PageCache
+    from entry_normalizer import EntryNormalizer
+    from mock_llm import MockLLMServer
+    from llm_router import LLMRouter, Endpoint, percentile
+    from rate_limiter import RateLimiter
+    from process import NLPProcessor, FIELD_TASKS
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 报告中各阶段的显示顺序
+CRAWL_STAGES = ["feed_fetch", "feed_parse", "dedup", "build", "enrich", "page_fetch", "page_parse", "store"]
+
+
+def run_crawl(resolver, feeds, stream=False, parser_backend="auto", use_db=False, page_cache=False, quiet=True,
+              fetch_workers=4, parse_processes=None):
+    """在回放服务器上执行一次完整爬取，返回统计结果字典"""
+    with tempfile.TemporaryDirectory() as workdir, ReplayServer(resolver) as server:
+        feeds_file = os.path.join(workdir, 'feeds.json')
+        with open(feeds_file, 'w', encoding='utf-8') as f:
+            json.dump(feeds, f)
+
+        session = AbstractFetcher._build_session(10, 10, 0, 0)
+        install_replay(session, server.base_url)
+        fetcher = AbstractFetcher(
+            session=session,
+            url_cache=ResolvedURLCache(os.path.join(workdir, 'resolved_urls.json')),
+            page_cache=PageCache(os.path.join(workdir, 'pages')) if page_cache else None,
+            use_page_cache=page_cache,
+            parser_backend=parser_backend,
+            stream=stream,
+            collect_datasets=not stream
+        )
+        crawler = RSSCrawler(
+            abstract_fetcher=fetcher,
+            scheduler=FeedScheduler(feeds_file=feeds_file, persist=False),
+            use_db=use_db,
+            fetch_workers=fetch_workers,
+            parse_processes=parse_processes
+        )
+
+        # 屏蔽爬取过程中的逐条日志和打印输出，避免终端输出成为瓶颈
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        if quiet:
+            root_logger.setLevel(logging.WARNING)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+                start = time.perf_counter()
+                crawler.crawl(force_all=True)
+                wall = time.perf_counter() - start
+        finally:
+            root_logger.setLevel(previous_level)
+            crawler.close()
+            session.close()
+
+    stages = dict(crawler.stage_times)
+    stages["page_fetch"] = fetcher.stats["fetch_time"]
+    stages["page_parse"] = fetcher.stats["parse_time"]
+    entries = crawler.last_entry_count
+    return {
+        "entries": entries,
+        "saved": crawler.last_added_count,
+        "pages": fetcher.stats["pages"],
+        "wall_seconds": wall,
+        "entries_per_second": entries / wall if wall else 0.0,
+        "feed_bytes": crawler.feed_bytes,
+        "page_bytes": fetcher.stats["bytes"],
+        "stages": stages,
+    }
+
+
+def format_result(label, result):
+    """格式化一次基准测试的结果"""
+    lines = [
+        f"== {label} ==",
+        f"  条目 {result['entries']}，页面 {result['pages']}，总耗时 {result['wall_seconds']:.2f}s，"
+        f"{result['entries_per_second']:.1f} 条/秒",
+        f"  RSS {result['feed_bytes'] / 1024:.1f} KB，页面 {result['page_bytes'] / 1024:.1f} KB（传输字节）",
+    ]
+    stages = result["stages"]
+    for stage in CRAWL_STAGES + sorted(set(stages) - set(CRAWL_STAGES)):
+        if stage in stages:
+            lines.append(f"  {stage:<15}{stages[stage]:>9.3f}s")
+    return "\n".join(lines)
+
+
+def essd_entries(count):
+    """合成的 ESSD 风格条目（RFC 822 日期、带作者行的纯文本摘要）"""
+    return [{
+        "title": f"Synthetic ESSD dataset {i}",
+        "link": f"https://essd.copernicus.org/articles/17/{i}/2025/",
+        "guid": f"10.5194/essd-17-{i}-2025",
+        "pubDate": f"Wed, {1 + i % 28:02d} Apr 2025 15:46:08 +0200",
+        "description": "Anna Smith, Bob Jones, and Carl Lee\nEarth Syst. Sci. Data, 17, 1-20, 2025\n"
+                       + "A long-term gridded dataset of synthetic observations. " * 8,
+    } for i in range(count)]
+
+
+def time_per_call(func, items, repeat=3):
+    """多次遍历 items 调用 func，返回最快一轮的平均耗时（微秒/次）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(items) * 1e6 if items else 0.0
+
+
+def run_normalize(entries):
+    """RSS条目规范化的微基准测试，返回各项的 微秒/次"""
+    sdata = feedparser.parse(SyntheticSite(entries).feed_xml()).entries
+    essd = essd_entries(entries)
+    normalizer = EntryNormalizer()
+    dates = {
+        "date_iso": [entry["updated"] for entry in sdata],
+        "date_rfc822": [entry["pubDate"] for entry in essd],
+        "date_rfc822_tzname": [entry["pubDate"].replace("+0200", "GMT") for entry in essd],
+        "date_embedded": [f"Scientific Data, Published online: {entry['updated']}; doi:x" for entry in sdata],
+    }
+    results = {}
+    for label, values in dates.items():
+        results[label] = time_per_call(lambda value: normalizer.format_date(value, label), values)
+    results["normalize_sdata"] = time_per_call(lambda entry: normalizer.normalize(entry, "Scientific Data"), sdata)
+    results["normalize_essd"] = time_per_call(lambda entry: normalizer.normalize(entry, "Earth System Science Data"), essd)
+    results["entry_doi"] = time_per_call(normalizer.entry_doi, sdata)
+    return results
+
+
+def run_llm(papers, endpoints=2, hedge_percentile=95, concurrency=8, latency=0.1, slow_rate=0.05, slow_latency=2.0):
+    """在本地模拟LLM端点上逐篇生成NLP字段，返回每篇论文的延迟分位数和各端点统计"""
+    servers = [MockLLMServer(latency=latency, slow_rate=slow_rate, slow_latency=slow_latency).start()
+               for _ in range(endpoints)]
+    router = LLMRouter([Endpoint(f"mock{i}", server.base_url, "mock", "mock") for i, server in enumerate(servers)],
+                       hedge_percentile=hedge_percentile)
+    processor = NLPProcessor(concurrency=concurrency, rate_limiter=RateLimiter(0), router=router, use_db=False)
+    processor.cache = None
+    processor.classifier = None
+    fields = list(FIELD_TASKS)
+
+    def one(index):
+        start = time.perf_counter()
+        processor.generate_fields(f"Synthetic dataset paper {index}", f"Abstract of synthetic paper {index}.", fields)
+        return time.perf_counter() - start
+
+    root_logger = logging.getLogger()
+    previous_level = root_logger.level
+    root_logger.setLevel(logging.WARNING)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(one, range(papers)))
+        wall = time.perf_counter() - start
+    finally:
+        root_logger.setLevel(previous_level)
+        processor.close()
+        for server in servers:
+            server.stop()
+    return {
+        "papers": papers,
+        "hedge_percentile": hedge_percentile,
+        "wall_seconds": wall,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "endpoints": router.summary(),
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="爬虫性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="通过回放服务器测试 RSSCrawler.crawl() 的吞吐量")
+    crawl_parser.add_argument("--entries", type=int, nargs="+", default=[10, 100, 1000], help="合成RSS源的条目数（可指定多个）")
+    crawl_parser.add_argument("--page-kb", type=int, default=100, help="合成文章页面的大小（KB）")
+    crawl_parser.add_argument("--fixtures", help="回放录制的夹具目录（代替合成RSS源）")
+    crawl_parser.add_argument("--stream", action="store_true", help="流式下载文章页面")
+    crawl_parser.add_argument("--parser", default="auto", choices=["auto", "selectolax", "lxml", "bs4"], help="HTML解析后端")
+    crawl_parser.add_argument("--page-cache", action="store_true", help="启用页面缓存（写入临时目录）")
+    crawl_parser.add_argument("--fetch-workers", type=int, default=4, help="并发下载文章页面的线程数")
+    crawl_parser.add_argument("--parse-processes", type=int, help="解析页面的进程数（默认CPU核心数，0或1表示在下载线程所在进程解析）")
+    crawl_parser.add_argument("--db", action="store_true", help="去重与入库使用 db_config.py 中的数据库（请使用测试库）")
+    crawl_parser.add_argument("--json", help="将结果以JSON格式写入该文件")
+    crawl_parser.add_argument("--verbose", action="store_true", help="保留爬取过程中的日志输出")
+
+    normalize_parser = subparsers.add_parser("normalize", help="RSS条目规范化（日期解析、摘要清理）的微基准测试")
+    normalize_parser.add_argument("--entries", type=int, default=10000, help="每类合成条目的数量")
+    normalize_parser.add_argument("--json", help="将结果以JSON格式写入该文件")
+    llm_parser = subparsers.add_parser("llm", help="模拟LLM端点上比较开启/关闭对冲请求时每篇论文的延迟")
+    llm_parser.add_argument("--papers", type=int, default=400, help="处理的论文数")
+    llm_parser.add_argument("--endpoints", type=int, default=2, help="模拟端点数")
+    llm_parser.add_argument("--concurrency", type=int, default=8, help="并发处理的论文数")
+    llm_parser.add_argument("--latency", type=float, default=0.1, help="正常响应的平均延迟（秒）")
+    llm_parser.add_argument("--slow-rate", type=float, default=0.05, help="长尾响应的比例")
+    llm_parser.add_argument("--slow-latency", type=float, default=2.0, help="长尾响应的延迟（秒）")
+    llm_parser.add_argument("--hedge-percentile", type=float, default=95, help="开启对冲时使用的延迟分位数")
+    llm_parser.add_argument("--json", help="将结果以JSON格式写入该文件")
+    args = parser.parse_args()
+
+    if args.command == "llm":
+        results = []
+        for hedge_percentile in (0, args.hedge_percentile):
+            result = run_llm(args.papers, endpoints=args.endpoints, hedge_percentile=hedge_percentile,
+                             concurrency=args.concurrency, latency=args.latency,
+                             slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+            label = f"对冲 P{hedge_percentile:g}" if hedge_percentile else "不对冲"
+            print(f"== llm {args.papers} papers, {label} ==")
+            print(f"  总耗时 {result['wall_seconds']:.2f}s，每篇论文 p50 {result['p50']:.3f}s，"
+                  f"p95 {result['p95']:.3f}s，p99 {result['p99']:.3f}s")
+            for name, stats in result["endpoints"].items():
+                print(f"  {name}: 请求 {stats['requests']}，错误 {stats['errors']}，"
+                      f"对冲 {stats['hedges']}（先返回 {stats['hedge_wins']}）")
+            results.append(result)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        return
+
+    if args.command == "normalize":
+        results = run_normalize(args.entries)
+        print(f"== normalize {args.entries} entries ==")
+        for label, micros in results.items():
+            print(f"  {label:<20}{micros:>9.2f} µs/次")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        return
+
+    results = []
+    options = dict(stream=args.stream, parser_backend=args.parser, use_db=args.db,
+                   page_cache=args.page_cache, quiet=not args.verbose,
+                   fetch_workers=args.fetch_workers, parse_processes=args.parse_processes)
+    if args.fixtures:
+        with open(os.path.join(args.fixtures, 'feeds.json'), 'r', encoding='utf-8') as f:
+            feeds = json.load(f)
+        result = run_crawl(FixtureStore(args.fixtures), feeds, **options)
+        result["label"] = f"fixtures {args.fixtures}"
+        print(format_result(result["label"], result))
+        results.append(result)
+    else:
+        for entries in args.entries:
+            site = SyntheticSite(entries, page_kb=args.page_kb)
+            result = run_crawl(site, site.feeds(), **options)
+            result["label"] = f"synthetic {entries} entries"
+            print(format_result(result["label"], result))
+            results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,18 @@ import feedparser
 import csv
 import os
 from datetime import datetime
-from bs4 import BeautifulSoup
 import logging
 import requests  # 保留，可能其他地方仍需使用
 from urllib.parse import urlparse # 保留，可能其他地方仍需使用
 import re        # 保留，可能其他地方仍需使用
 import time      # 保留，可能其他地方仍需使用
 import random    # 保留，可能其他地方仍需使用
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from .abstract_fetcher import AbstractFetcher # 导入 AbstractFetcher
+from .entry_normalizer import EntryNormalizer
+from .feed_scheduler import FeedScheduler
 
 # 导入数据库工具类
 try:
@@ -38,306 +42,387 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 推迟论文的最大重试次数，超过后直接使用RSS摘要入库
+DEFERRED_MAX_ATTEMPTS = 5
+
 class RSSCrawler:
     """通用RSS爬虫类，支持多个期刊"""
     
-    def __init__(self):
-        # 定义多个期刊的RSS源和名称
-        self.journals = [
-            {
-                "name": "Scientific Data",
-                "rss_url": "https://www.nature.com/sdata.rss"
-            },
-            {
-                "name": "Earth System Science Data",
-                "rss_url": "https://essd.copernicus.org/articles/xml/rss2_0.xml"
-            }
-        ]
+    def __init__(self, abstract_fetcher=None, time_budget=None, scheduler=None, use_db=True,
+                 fetch_workers=4, parse_processes=None):
+        """
+        参数:
+            abstract_fetcher: (可选) 共享的摘要获取器
+            time_budget: (可选) 整次爬取的时间预算（秒），超出后未完成的摘要增强推迟到下次运行
+            scheduler: (可选) RSS源调度器，默认从 feeds.json 和 feed_sources 表加载
+            use_db: 是否读写数据库（去重与入库）；为False时只执行抓取与解析，用于录制和基准测试
+            fetch_workers: 每个RSS源并发下载文章页面的线程数
+            parse_processes: 解析页面的进程数，默认为CPU核心数；0或1表示在当前进程解析
+        """
+        self.use_db = use_db and DBHelper is not None
+        # 初始化数据库表（RSS源调度状态也保存在数据库中）
+        if self.use_db:
+            DBHelper.initialize_tables()
+        
+        # RSS源从配置文件/数据库加载，由调度器决定每次爬取哪些源
+        self.scheduler = scheduler or FeedScheduler(persist=self.use_db)
+        self.journals = self.scheduler.feeds
         self.last_added_count = 0  # 新增属性，用于跟踪新添加的记录数
         self.headers = {  # 添加请求头
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        self.abstract_fetcher = AbstractFetcher() # 初始化 AbstractFetcher
-        
-        # 初始化数据库表
-        if DBHelper:
-            DBHelper.initialize_tables()
+        # 初始化 AbstractFetcher，RSS 与网页抓取共享同一个连接池会话
+        self.abstract_fetcher = abstract_fetcher or AbstractFetcher()
+        self.session = self.abstract_fetcher.session
+        self.time_budget = time_budget
+        self.last_deferred_count = 0  # 本次推迟的论文数
+        self.stage_times = {}  # 本次爬取各阶段的累计耗时（秒）
+        self.feed_bytes = 0    # 本次下载的RSS源字节数
+        self.last_entry_count = 0  # 本次处理的RSS条目总数
+        self.normalizer = EntryNormalizer()  # 条目规范化（按RSS源缓存日期格式）
+        self.fetch_workers = fetch_workers
+        self.parse_processes = (os.cpu_count() or 1) if parse_processes is None else parse_processes
+        self._parse_pool = None  # 解析进程池，首次需要时创建
+    
+    def _get_parse_pool(self):
+        """返回解析进程池（HTML解析是CPU密集型，放到子进程中不受GIL限制）"""
+        if self.parse_processes <= 1:
+            return None
+        if self._parse_pool is None:
+            # 使用spawn启动子进程，避免fork时复制连接池和数据库连接
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"启动 {self.parse_processes} 个页面解析进程")
+        return self._parse_pool
+    
+    @contextmanager
+    def _timed(self, stage):
+        """累计某个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + time.perf_counter() - start
             
-    def get_existing_dois(self):
-        """获取数据库中已存在的所有DOI，用于去重"""
-        if DBHelper:
-            try:
-                connection = DBHelper.get_connection()
-                if not connection:
-                    logger.error("无法连接到数据库，获取现有DOI失败")
-                    return set()
-                    
-                with connection.cursor() as cursor:
-                    cursor.execute("SELECT doi FROM raw_papers WHERE doi IS NOT NULL AND doi != ''")
-                    existing_dois = {row[0] for row in cursor.fetchall()}
-                    logger.info(f"从数据库获取到 {len(existing_dois)} 个现有DOI")
-                    return existing_dois
-            except Exception as e:
-                logger.error(f"获取现有DOI时发生错误: {e}")
-                return set()
-            finally:
-                if connection:
-                    connection.close()
+    def get_existing_dois(self, dois):
+        """返回给定DOI中已入库（或已推迟）的部分（小写），用于去重
+        
+        只查询本次RSS中出现的DOI，爬取启动时不再加载整张表；
+        已推迟的论文由 retry_deferred_papers 负责，不重复处理。
+        """
+        if self.use_db:
+            return DBHelper.get_existing_dois(dois)
         return set()
 
-    # --- 继续使用现有方法 --- 
+    def retry_deferred_papers(self):
+        """重试之前推迟的摘要增强，成功或达到最大重试次数后写入 raw_papers
+        
+        时间预算用完后不再重试；目标主机仍在熔断中的论文本次跳过。没有发出请求的推迟
+        （熔断、退避或预算不足）不计入重试次数，论文保持到期状态，下次运行再试。
+        """
+        if not self.use_db:
+            return 0
+        
+        saved = 0
+        skipped = 0
+        for item in DBHelper.get_due_deferred_papers():
+            remaining = self.abstract_fetcher.remaining_time()
+            if remaining is not None and remaining <= 0:
+                logger.info("抓取时间预算已用完，剩余的推迟论文留待下次重试")
+                break
+            paper_data = item['paper_data']
+            doi = item['doi']
+            target = paper_data.get('url') or doi
+            host_health = self.abstract_fetcher.host_health
+            if host_health.is_open(host_health.host_of(self.abstract_fetcher.request_url(target))):
+                skipped += 1
+                continue
+            result = self.abstract_fetcher.fetch_abstract(target, journal_name=paper_data.get('journal'))
+            
+            if result.get('deferred'):
+                if not result.get('sent', True):
+                    skipped += 1
+                    continue
+                if item['attempts'] < DEFERRED_MAX_ATTEMPTS:
+                    DBHelper.save_deferred_paper(paper_data, result.get('error', ''))
+                    continue
+                logger.warning(f"DOI {doi} 已重试 {item['attempts']} 次仍无法获取摘要，使用RSS摘要入库")
+            elif len(result.get('abstract', '')) > len(paper_data.get('abstract', '')):
+                paper_data['abstract'] = result['abstract']
+            
+            if DBHelper.insert_raw_paper(paper_data):
+                DBHelper.delete_deferred_paper(doi)
+                DBHelper.save_paper_datasets([(doi, dataset) for dataset in result.get('datasets') or []])
+                saved += 1
+        
+        if saved:
+            logger.info(f"推迟的论文重试完成，写入 {saved} 条")
+        if skipped:
+            logger.info(f"{skipped} 条推迟的论文因主机熔断或退避未发出请求，留待下次重试")
+        return saved
+
+    def close(self):
+        """释放共享会话的连接池和解析进程池"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        self.abstract_fetcher.close()
+
+    def fetch_feed(self, rss_url):
+        """通过共享会话下载RSS源并解析，复用与网页抓取相同的连接
+
+        下载失败时返回没有条目的结果（不再由 feedparser 重新下载，避免对失败的源重复请求），
+        调用方按最小轮询间隔安排该源重试。
+        """
+        try:
+            with self._timed("feed_fetch"):
+                response = self.session.get(rss_url, timeout=30)
+                response.raise_for_status()
+                content = response.content
+        except Exception as e:
+            logger.error(f"下载RSS源失败: {rss_url}, 错误: {e}")
+            return feedparser.FeedParserDict(entries=[], bozo=True, bozo_exception=e)
+        self.feed_bytes += len(content)
+        # 只传递与编码识别相关的响应头，正文已由会话完成解压
+        response_headers = {k.lower(): v for k, v in response.headers.items() if k.lower() in ("content-type", "content-location")}
+        with self._timed("feed_parse"):
+            return feedparser.parse(content, response_headers=response_headers)
+
+    # --- 条目规范化由 EntryNormalizer 完成 ---
     def clean_abstract(self, raw_abstract, title, journal_name):
         """清理HTML和冗余标题"""
-        # 移除HTML标签
-        soup = BeautifulSoup(raw_abstract, "html.parser")
-        text = soup.get_text()
-        # 移除标题（常重复）
-        text = text.replace(title, "").strip()
-        # 移除元数据（针对不同期刊的元数据格式）
-        lines = text.split("\n")
-        cleaned_lines = []
-        if journal_name == "Nature Scientific Data":
-            # Nature的RSS摘要通常很短或没有，主要依赖网页抓取
-            cleaned_lines = [line for line in lines if not line.startswith("Scientific Data,")]
-        elif journal_name == "Earth System Science Data":
-            # ESSD的RSS摘要可能包含作者和期刊信息，需要清理
-            cleaned_lines = [line for line in lines if not ("Earth Syst. Sci. Data" in line or "Preprint under review" in line or line.count(',') > 3)] # 尝试移除作者行
-        else:
-            cleaned_lines = lines
-        
-        # 进一步清理可能的作者信息（基于大写字母和逗号）
-        final_lines = []
-        for line in cleaned_lines:
-            if not (len(line.split()) > 2 and line.count(',') > 1 and all(word[0].isupper() for word in line.replace(',', '').split() if word)): # 启发式移除作者行
-                final_lines.append(line)
-                
-        return " ".join(final_lines).strip()
+        return self.normalizer.clean_abstract(raw_abstract, title, journal_name)
     
     def format_date(self, pub_date_str, journal_name):
         """根据期刊名称解析日期字符串并格式化为 YYYY-MM-DD"""
-        if not pub_date_str:
-            logger.warning(f"日期字符串为空，使用当前日期")
-            return datetime.now().strftime("%Y-%m-%d")
+        return self.normalizer.format_date(pub_date_str, journal_name)
 
-        parsed_date = None
-        try:
-            if journal_name == "Scientific Data":
-                # Scientific Data 通常使用 YYYY-MM-DD 格式
-                try:
-                    parsed_date = datetime.strptime(pub_date_str, "%Y-%m-%d")
-                except ValueError:
-                    # 作为后备，尝试从类似 'Scientific Data, Published online: 2025-04-23; | doi:...' 的字符串提取
-                    match = re.search(r'(\d{4}-\d{2}-\d{2})', pub_date_str)
-                    if match:
-                        parsed_date = datetime.strptime(match.group(1), "%Y-%m-%d")
-                    else:
-                         logger.warning(f"无法从 Scientific Data 的日期字符串 '{pub_date_str}' 解析日期")
+    def entry_doi(self, entry):
+        """从RSS条目中提取DOI"""
+        return self.normalizer.entry_doi(entry)
 
-            elif journal_name == "Earth System Science Data":
-                # ESSD 通常使用 RFC 822 格式，例如 'Wed, 23 Apr 2025 15:46:08 +0200'
-                # Python's %z handles timezone offsets like +0200
-                try:
-                    # 尝试去除可能存在的时区名称 (如 GMT, CEST)，因为 %z 可能无法处理它们
-                    parts = pub_date_str.split()
-                    if len(parts) > 5 and not parts[-1].startswith(('+', '-')):
-                         pub_date_str = " ".join(parts[:-1]) # 移除最后的时区名称
+    def build_paper(self, entry, journal_name, doi):
+        """将RSS条目转换为论文数据字典（不访问网络）"""
+        return self.normalizer.normalize(entry, journal_name, doi)
 
-                    # 尝试解析带时区的格式
-                    parsed_date = datetime.strptime(pub_date_str, "%a, %d %b %Y %H:%M:%S %z")
-                except ValueError:
-                     # 如果带时区的解析失败，尝试不带时区的格式
-                     try:
-                         parsed_date = datetime.strptime(pub_date_str, "%a, %d %b %Y %H:%M:%S")
-                         logger.warning(f"ESSD 日期 '{pub_date_str}' 缺少时区信息，已解析")
-                     except ValueError:
-                         logger.warning(f"无法从 ESSD 的日期字符串 '{pub_date_str}' 解析日期")
+    def needs_web_fetch(self, paper_data, force=False):
+        """判断是否需要从网页获取摘要（摘要为空或过短时）
+        
+        参数:
+            paper_data: 论文数据字典
+            force: 是否无论RSS摘要长短都尝试网页抓取（用于没有RSS摘要的回填数据）
+        """
+        abstract = paper_data.get("abstract", "")
+        journal_name = paper_data.get("journal", "")
+        url = paper_data.get("url", "")
+        
+        # --- 摘要增强逻辑 ---
+        # 如果摘要为空或过短，尝试从网页获取
+        should_fetch_web = force
+        if not abstract:
+            # 如果RSS完全没有摘要，对所有期刊都尝试抓取
+            should_fetch_web = True
+            logger.debug(f"RSS摘要缺失，准备从网页获取: {url}")
+        elif journal_name != "Earth System Science Data" and len(abstract) < 100:
+            # 对于非ESSD期刊，如果摘要过短，尝试抓取
+            should_fetch_web = True
+            logger.debug(f"RSS摘要过短 (<100 chars)，准备从网页获取: {url}")
+        # 对于ESSD，只要RSS提供了摘要（即使很短），就不再从网页抓取
 
+        if should_fetch_web and not url:
+            logger.warning(f"摘要缺失/过短且无URL，无法从网页获取")
+            return False
+        if not should_fetch_web and abstract and journal_name == "Earth System Science Data":
+            logger.debug(f"ESSD期刊已有RSS摘要，跳过网页抓取")
+        return should_fetch_web
+
+    def apply_web_result(self, paper_data, web_abstract_data):
+        """将网页抓取结果合并到论文数据中
+        
+        返回:
+            网页抓取被推迟时返回推迟原因，否则返回None
+        """
+        if web_abstract_data.get('deferred'):
+            return web_abstract_data.get('error', '')
+        
+        # 同一次解析中提取的数据仓储链接，随论文一起入库
+        if web_abstract_data.get('datasets'):
+            paper_data['datasets'] = web_abstract_data['datasets']
+        
+        # 补全回填数据缺失的元数据（发布日期、作者）
+        metadata = web_abstract_data.get('metadata') or {}
+        if not paper_data.get('publishDate') and metadata.get('publishDate'):
+            paper_data['publishDate'] = metadata['publishDate']
+        if paper_data.get('authors') in (None, '', 'Unknown') and metadata.get('authors'):
+            paper_data['authors'] = metadata['authors']
+        
+        if web_abstract_data.get('abstract'): # 检查字典和 'abstract' 键
+            fetched_web_abstract = web_abstract_data['abstract']
+            # 只有当网页抓取的摘要比RSS的长时才替换
+            if len(fetched_web_abstract) > len(paper_data.get("abstract", "")):
+                logger.debug(f"使用网页获取的更长摘要替换RSS摘要")
+                paper_data['abstract'] = fetched_web_abstract # 使用网页获取的摘要
             else:
-                # 其他期刊或未知期刊，尝试通用格式
-                common_formats = [
-                    "%Y-%m-%d",
-                    "%Y-%m-%dT%H:%M:%S%z",
-                    "%Y-%m-%dT%H:%M:%SZ",
-                    "%a, %d %b %Y %H:%M:%S %z",
-                    "%a, %d %b %Y %H:%M:%S",
-                ]
-                for fmt in common_formats:
-                    try:
-                        parsed_date = datetime.strptime(pub_date_str, fmt)
-                        break # 解析成功即跳出循环
-                    except ValueError:
-                        continue
-                if not parsed_date:
-                    logger.warning(f"无法使用通用格式解析日期字符串 '{pub_date_str}'")
+                logger.debug(f"网页获取的摘要不比RSS摘要长，保留RSS摘要")
+        else:
+            logger.warning(f"无法从网页获取有效摘要")
+        return None
 
-            if parsed_date:
-                return parsed_date.strftime("%Y-%m-%d")
+    def enrich_paper(self, paper_data, force=False):
+        """摘要为空或过短时从网页获取摘要
+        
+        参数:
+            paper_data: 论文数据字典（原地更新 abstract）
+            force: 是否无论RSS摘要长短都尝试网页抓取（用于没有RSS摘要的回填数据）
+        
+        返回:
+            网页抓取被推迟时返回推迟原因，否则返回None
+        """
+        if not self.needs_web_fetch(paper_data, force):
+            return None
+        logger.debug(f"开始从网页获取摘要: {paper_data['url']}")
+        web_abstract_data = self.abstract_fetcher.fetch_abstract(paper_data['url'], journal_name=paper_data.get("journal"))
+        return self.apply_web_result(paper_data, web_abstract_data)
+
+    def enrich_papers(self, papers, force=False):
+        """批量增强论文摘要：页面并发下载，解析交给进程池
+        
+        参数:
+            papers: 论文数据字典列表（原地更新）
+            force: 同 enrich_paper
+        
+        返回:
+            与 papers 顺序一致的推迟原因列表（未推迟为None）
+        """
+        reasons = [None] * len(papers)
+        targets = [index for index, paper_data in enumerate(papers) if self.needs_web_fetch(paper_data, force)]
+        if not targets:
+            return reasons
+        logger.info(f"开始从网页获取 {len(targets)} 篇论文的摘要")
+        results = self.abstract_fetcher.fetch_abstracts(
+            [papers[index]['url'] for index in targets],
+            workers=self.fetch_workers,
+            parse_pool=self._get_parse_pool()
+        )
+        for index, web_abstract_data in zip(targets, results):
+            reasons[index] = self.apply_web_result(papers[index], web_abstract_data)
+        return reasons
+
+    def store_papers(self, papers):
+        """批量写入论文：可入库的批量upsert到 raw_papers，被推迟的写入 deferred_papers
+        
+        参数:
+            papers: [(论文数据字典, 推迟原因或None), ...]
+        
+        返回:
+            (写入 raw_papers 的数量, 推迟的数量)
+        """
+        if not self.use_db:
+            # 不使用数据库时只统计，不写入
+            return sum(1 for paper, reason in papers if paper.get("doi") and reason is None), 0
+        
+        ready = []
+        deferred = 0
+        for paper_data, deferred_reason in papers:
+            if not paper_data.get("doi"):  # 确保有DOI
+                continue
+            if deferred_reason is not None:
+                # 主机异常或超出时间预算，推迟到下次运行再增强摘要
+                if DBHelper.save_deferred_paper(paper_data, deferred_reason):
+                    deferred += 1
             else:
-                # 如果所有尝试都失败，返回当前日期
-                logger.warning(f"最终无法解析日期 '{pub_date_str}'，使用当前日期")
-                return datetime.now().strftime("%Y-%m-%d")
+                ready.append(paper_data)
+        
+        saved = (DBHelper.bulk_upsert_raw_papers(ready) or 0) if ready else 0
+        DBHelper.save_paper_datasets([
+            (paper_data["doi"], dataset) for paper_data in ready for dataset in paper_data.get("datasets", [])
+        ])
+        return saved, deferred
 
-        except Exception as e:
-            logger.error(f"日期格式化时发生意外错误: {e}，日期字符串: '{pub_date_str}'，使用当前日期")
-            return datetime.now().strftime("%Y-%m-%d")
+    @staticmethod
+    def entry_dates(entries):
+        """RSS条目的发布日期（YYYY-MM-DD），用于估算源的发布频率"""
+        dates = []
+        for entry in entries:
+            parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+            if parsed:
+                dates.append(time.strftime("%Y-%m-%d", parsed))
+        return dates
 
-    def crawl(self):
-        """执行RSS爬取"""
-        all_data = []
+    def crawl(self, force_all=False):
+        """执行RSS爬取
+        
+        参数:
+            force_all: 是否忽略调度，轮询全部RSS源（全量更新时使用）
+        """
         db_saved_count = 0  # 数据库保存计数
         skipped_count = 0   # 新增跳过计数
+        deferred_count = 0  # 推迟摘要增强的计数
         
         # 确保数据库表已初始化
-        if DBHelper:
+        if self.use_db:
             DBHelper.initialize_tables()
         
-        existing_dois = self.get_existing_dois()  # 获取现有DOI
+        self.stage_times = {}
+        self.feed_bytes = 0
+        self.last_entry_count = 0
+        seen_dois = set()  # 本次运行中已处理的DOI（同一论文可能出现在多个RSS源中）
+        
+        # 设置整次爬取的时间预算，超出后剩余的网页抓取全部推迟
+        self.abstract_fetcher.set_deadline(self.time_budget)
         
-        for journal_info in self.journals:
+        for journal_info in self.scheduler.due_feeds(force=force_all):
             journal_name = journal_info["name"]
             rss_url = journal_info["rss_url"]
             logger.info(f"开始爬取 {journal_name} RSS: {rss_url}")
             try:
-                feed = feedparser.parse(rss_url)
+                feed = self.fetch_feed(rss_url)
+                if feed.bozo and not feed.entries:
+                    # 下载或解析失败：不把空结果当作一次成功的轮询，按最小间隔重试
+                    self.scheduler.record_failure(journal_info)
+                    continue
                 
                 # 每个期刊的统计计数
                 journal_skipped = 0
-                journal_saved = 0
+                papers = []
                 
                 logger.info(f"{journal_name} RSS包含 {len(feed.entries)} 条条目")
-                for i, entry in enumerate(feed.entries):
-                    # 先尝试获取DOI，提前检查是否重复
-                    doi = entry.get("dc_identifier", "").replace("doi:", "") if "dc_identifier" in entry else entry.get("guid", "")
-                    url = entry.get("link", "")
-                    if not doi and url and "doi.org" in url:
-                        try:
-                            doi = url.split("doi.org/")[1]
-                        except IndexError:
-                            pass
-                    elif not doi and url and "nature.com/articles/" in url:
-                        try:
-                            doi = url.split("articles/")[1]
-                        except IndexError:
-                            pass
-                    
+                self.last_entry_count += len(feed.entries)
+                # 先提取全部DOI，一次批量查询出已存在的部分
+                entry_dois = [self.entry_doi(entry) for entry in feed.entries]
+                with self._timed("dedup"):
+                    existing_dois = self.get_existing_dois(entry_dois) | seen_dois
+                for entry, doi in zip(feed.entries, entry_dois):
                     # 提前检查DOI是否存在，如果存在则跳过该条目
                     if not doi:
                         logger.warning(f"条目没有DOI标识: {entry.get('title', 'Unknown')}")
-                    elif doi in existing_dois:
-                        logger.info(f"跳过已存在的DOI: {doi}, 标题: {entry.get('title', 'Unknown')}")
+                    elif doi.lower() in existing_dois:
+                        logger.debug(f"跳过已存在的DOI: {doi}, 标题: {entry.get('title', 'Unknown')}")
                         skipped_count += 1
                         journal_skipped += 1
                         continue
-                    
-                    # 只处理新条目
-                    title = entry.get("title", "Unknown")
-                    
-                    # 兼容不同RSS的描述字段
-                    raw_abstract = ""
-                    fields_to_try = ["description", "summary", "content", "content:encoded", "dc:description"]
-                    for field in fields_to_try:
-                        if field in entry:
-                            raw_abstract = entry.get(field, "")
-                            if raw_abstract: break
-                    
-                    # 直接使用RSS配置的期刊名
-                    current_journal_name = journal_name
-                    
-                    abstract = self.clean_abstract(raw_abstract, title, current_journal_name)
-                    
-                    # --- 获取日期 ---
-                    pub_date_str = ""
-                    if journal_name == "Scientific Data":
-                        # 优先 updated (可能对应 <dc:date> 或 <published>)
-                        updated_date = entry.get("updated", entry.get("published", None))
-                        if updated_date and re.match(r'\d{4}-\d{2}-\d{2}', updated_date.split('T')[0]): # 提取 YYYY-MM-DD 部分
-                            pub_date_str = updated_date.split('T')[0]
-                            logger.info(f"使用 'updated' 或 'published' 字段提取日期: {pub_date_str}")
-
-                        # 其次尝试 dc:date (注意 feedparser 可能不带命名空间前缀)
-                        if not pub_date_str:
-                            dc_date = entry.get("dc_date", None)
-                            if dc_date and re.match(r'\d{4}-\d{2}-\d{2}', dc_date):
-                                pub_date_str = dc_date
-                                logger.info(f"使用 'dc_date' 字段提取日期: {pub_date_str}")
-
-                        # 最后从 dc_source 提取
-                        if not pub_date_str:
-                            dc_source = entry.get("dc_source", None)
-                            if dc_source:
-                                match = re.search(r'(\d{4}-\d{2}-\d{2})', dc_source)
-                                if match:
-                                    pub_date_str = match.group(1)
-                                    logger.info(f"从 'dc_source' 字段提取日期: {pub_date_str}")
-
-                    elif journal_name == "Earth System Science Data":
-                        # ESSD 的逻辑保持不变
-                        pub_date_str = entry.get("pubDate", entry.get("dc_date", entry.get("published", "")))
                     else:
-                        # 其他期刊的默认顺序保持不变
-                        pub_date_str = entry.get("published", entry.get("pubDate", entry.get("dc_date", "")))
-
-                    # 调用 format_date 方法 (确保它能处理 YYYY-MM-DD)
-                    formatted_date = self.format_date(pub_date_str, journal_name)
-                                
-                    authors = entry.get("author", "Unknown")
-                    # 兼容标签字段
-                    tags = entry.get("category", "").split(",") if "category" in entry else []
+                        existing_dois.add(doi.lower())
+                        seen_dois.add(doi.lower())
                     
-                    # --- 摘要增强逻辑 ---
-                    # 如果摘要为空或过短，尝试从网页获取
-                    should_fetch_web = False
-                    if not abstract:
-                        # 如果RSS完全没有摘要，对所有期刊都尝试抓取
-                        should_fetch_web = True
-                        logger.info(f"RSS摘要缺失，准备从网页获取: {url}")
-                    elif current_journal_name != "Earth System Science Data" and len(abstract) < 100:
-                        # 对于非ESSD期刊，如果摘要过短，尝试抓取
-                        should_fetch_web = True
-                        logger.info(f"RSS摘要过短 (<100 chars)，准备从网页获取: {url}")
-                    # 对于ESSD，只要RSS提供了摘要（即使很短），就不再从网页抓取
-
-                    if should_fetch_web:
-                        if url:
-                            logger.info(f"开始从网页获取摘要: {url}")
-                            # 使用 AbstractFetcher 获取摘要
-                            web_abstract_data = self.abstract_fetcher.fetch_abstract(url, journal_name=current_journal_name)
-                            if web_abstract_data and web_abstract_data.get('abstract'): # 检查字典和 'abstract' 键
-                                fetched_web_abstract = web_abstract_data['abstract']
-                                # 只有当网页抓取的摘要比RSS的长时才替换
-                                if len(fetched_web_abstract) > len(abstract):
-                                    logger.info(f"使用网页获取的更长摘要替换RSS摘要")
-                                    abstract = fetched_web_abstract # 使用网页获取的摘要
-                                else:
-                                    logger.info(f"网页获取的摘要不比RSS摘要长，保留RSS摘要")
-                            else:
-                                logger.warning(f"无法从网页获取有效摘要")
-                        else:
-                            logger.warning(f"摘要缺失/过短且无URL，无法从网页获取")
-                    elif abstract and current_journal_name == "Earth System Science Data":
-                        logger.info(f"ESSD期刊已有RSS摘要，跳过网页抓取")
-
-                    # 格式化日期
-                    formatted_date = self.format_date(pub_date_str, journal_name)
-                    
-                    # 创建论文数据字典
-                    paper_data = {
-                        "journal": current_journal_name,
-                        "title": title,
-                        "abstract": abstract,
-                        "publishDate": formatted_date,
-                        "doi": doi,
-                        "url": url,
-                        "authors": authors,
-                        "tags": ",".join(tags)
-                    }
-                    
-                    # 保存到数据库
-                    if DBHelper:
-                        if doi:  # 确保有DOI
-                            if DBHelper.insert_raw_paper(paper_data):
-                                db_saved_count += 1
-                                journal_saved += 1
+                    # 只处理新条目
+                    with self._timed("build"):
+                        papers.append(self.build_paper(entry, journal_name, doi))
+                
+                # 并发下载需要增强的页面，解析在进程池中与下载重叠进行
+                with self._timed("enrich"):
+                    papers = list(zip(papers, self.enrich_papers(papers)))
+                
+                # 保存到数据库（批量）
+                with self._timed("store"):
+                    journal_saved, journal_deferred = self.store_papers(papers)
+                db_saved_count += journal_saved
+                deferred_count += journal_deferred
+                
+                # 根据本次观察到的发布频率安排下次轮询
+                self.scheduler.record_poll(journal_info, self.entry_dates(feed.entries), len(papers))
                 
                 # 期刊处理完成后输出统计
                 logger.info(f"{journal_name} 爬取完成，共处理 {len(feed.entries)} 条目，跳过 {journal_skipped} 条已存在条目，插入 {journal_saved} 条新数据")
@@ -345,7 +430,16 @@ class RSSCrawler:
             except Exception as e:
                 logger.error(f"{journal_name} 爬取过程中发生错误: {e}")
         
-        logger.info(f"所有期刊爬取完成，共跳过 {skipped_count} 条已存在条目，执行 {db_saved_count} 次数据库插入")
+        # 利用剩余时间预算重试之前推迟的论文
+        with self._timed("retry_deferred"):
+            db_saved_count += self.retry_deferred_papers()
+        
+        logger.info(f"所有期刊爬取完成，共跳过 {skipped_count} 条已存在条目，执行 {db_saved_count} 次数据库插入，推迟 {deferred_count} 条")
+        logger.info("各阶段耗时: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_times.items()))
+        health = self.abstract_fetcher.host_health.summary()
+        if health:
+            logger.info(f"各主机请求统计: {health}")
+        self.last_deferred_count = deferred_count
         self.last_added_count = db_saved_count  # 记录新增数量
         return db_saved_count
 
@@ -357,7 +451,10 @@ def main():
     
     # 爬取数据
     crawler = RSSCrawler()
-    db_operations_count = crawler.crawl()
+    try:
+        db_operations_count = crawler.crawl()
+    finally:
+        crawler.close()
     print(f"数据爬取完成，共执行 {db_operations_count} 次数据库操作")
     return db_operations_count
 
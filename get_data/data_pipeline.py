@@ -10,7 +10,7 @@
 3. 直接将处理好的数据保存到数据库
 
 使用方法:
-python data_pipeline.py [--full-update]
+python data_pipeline.py [--full-update] [--time-budget 秒数]
 """
 
 import os
@@ -54,8 +54,13 @@ except ImportError as e:
         sys.exit(1)
 
 
-def run_pipeline(full_update=False):
-    """运行数据处理流水线"""
+def run_pipeline(full_update=False, time_budget=None):
+    """运行数据处理流水线
+    
+    参数:
+        full_update: 是否执行全量更新
+        time_budget: (可选) 爬取阶段的时间预算（秒），超时未完成的摘要增强推迟到下次运行
+    """
     logger.info("开始执行数据处理流水线...")
     
     # 检查数据库是否正常初始化
@@ -69,8 +74,12 @@ def run_pipeline(full_update=False):
     # 步骤1: 爬取最新数据并保存到数据库
     logger.info("步骤1: 爬取最新数据并保存到数据库")
     try:
-        crawler = RSSCrawler()
-        articles = crawler.crawl()
+        crawler = RSSCrawler(time_budget=time_budget)
+        try:
+            # 全量更新时忽略调度，轮询全部RSS源
+            articles = crawler.crawl(force_all=full_update)
+        finally:
+            crawler.close()
         
         # 检查是否有新数据
         has_new_articles = crawler.last_added_count > 0
@@ -97,9 +106,10 @@ def run_pipeline(full_update=False):
     logger.info("步骤2: 处理数据 (NLP处理)")
     try:
         # 创建处理器，移除文件路径参数
-        processor = NLPProcessor()
-        # 处理数据
-        processed_count = processor.process_papers()
+        with NLPProcessor() as processor:
+            # 处理数据
+            # 全量更新时待处理论文较多，使用多篇合并的批量模式；增量更新按待处理数量自动选择
+            processed_count = processor.process_papers(batch=True if full_update else None)
     except Exception as e:
         logger.error(f"处理数据失败: {e}")
         return False, 0
@@ -122,10 +132,12 @@ if __name__ == "__main__":
     # 命令行参数
     parser = argparse.ArgumentParser(description="数据论文处理流水线")
     parser.add_argument("--full-update", action="store_true", help="执行全量更新而非增量更新")
+    parser.add_argument("--time-budget", type=float, default=float(os.environ.get("CRAWL_TIME_BUDGET", 0)) or None,
+                        help="爬取阶段的时间预算（秒），默认读取环境变量 CRAWL_TIME_BUDGET，不设置则不限制")
     args = parser.parse_args()
     
     # 运行流水线
-    success, count = run_pipeline(full_update=args.full_update)
+    success, count = run_pipeline(full_update=args.full_update, time_budget=args.time_budget)
     
     if not success:
         logger.error("流水线执行失败")
@@ -11,7 +11,9 @@
 """
 
 import os
+import re
 import logging
+import hashlib
 import pymysql
 from datetime import datetime
 import json
@@ -44,6 +46,100 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 参与内容哈希的原始论文字段（DOI为主键，不参与）
+RAW_CONTENT_FIELDS = ('title', 'abstract', 'publishDate', 'url', 'authors', 'tags', 'journal')
+
+# 写入原始论文（新增或按DOI更新），参数顺序为 RAW_CONTENT_FIELDS + (doi, content_hash)
+RAW_UPSERT_SQL = """
+    INSERT INTO raw_papers (
+        title, abstract, publishDate, url, authors, tags, journal, doi, content_hash
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        title = VALUES(title),
+        abstract = VALUES(abstract),
+        publishDate = VALUES(publishDate),
+        url = VALUES(url),
+        authors = VALUES(authors),
+        tags = VALUES(tags),
+        journal = VALUES(journal),
+        content_hash = VALUES(content_hash),
+        updated_at = NOW()
+"""
+
+# 只补写内容哈希（不更新 updated_at）
+RAW_HASH_UPDATE_SQL = "UPDATE raw_papers SET content_hash = %s, updated_at = updated_at WHERE doi = %s"
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_raw_value(value):
+    """规范化原始论文字段：列表转为逗号分隔字符串，合并空白"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        value = ','.join(str(item).strip() for item in value if item)
+    return WHITESPACE_PATTERN.sub(' ', str(value)).strip()
+
+
+def raw_content_hash(paper):
+    """原始论文内容的规范化哈希，只有字段内容真正变化时才会改变"""
+    payload = json.dumps([normalize_raw_value(paper.get(field)) for field in RAW_CONTENT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def raw_field_diff(old, new):
+    """比较两条原始论文记录，返回 {字段: {"old": 旧值, "new": 新值}}（只包含变化的字段）"""
+    diff = {}
+    for field in RAW_CONTENT_FIELDS:
+        old_value = normalize_raw_value(old.get(field))
+        new_value = normalize_raw_value(new.get(field))
+        if old_value != new_value:
+            diff[field] = {"old": old_value, "new": new_value}
+    return diff
+
+
+# 处理后论文中由NLP生成的字段，missing_fields 的第 i 位表示第 i 个字段为空
+NLP_FIELDS = ('titleCn', 'interpretationCn', 'tags', 'Subject')
+# 随NLP字段一起逐字段保存的元数据列
+NLP_META_FIELDS = ('subject_source',)
+# 视为空白的字符：只含这些字符的字段也算缺失（SQL 与 Python 两侧使用同一组字符，保证掩码一致）
+BLANK_CHARS = ' \t\n\r'
+
+
+def _blank_sql(field):
+    """字段为NULL、空串或只含空白字符时为真的SQL表达式（MySQL 的 TRIM 只去除空格，先去掉制表符和换行）"""
+    stripped = field
+    for char in BLANK_CHARS.strip(' '):
+        stripped = f"REPLACE({stripped}, CHAR({ord(char)} USING utf8mb4), '')"
+    return f"COALESCE(TRIM({stripped}), '') = ''"
+
+
+MISSING_FIELDS_SQL = " | ".join(f"(({_blank_sql(field)}) << {bit})" for bit, field in enumerate(NLP_FIELDS))
+
+
+def missing_fields_mask(paper):
+    """计算论文缺失NLP字段的位掩码（0 表示字段齐全）"""
+    mask = 0
+    for bit, field in enumerate(NLP_FIELDS):
+        value = paper.get(field)
+        if isinstance(value, list):
+            value = ','.join(value)
+        if not (value or '').strip(BLANK_CHARS):
+            mask |= 1 << bit
+    return mask
+
+
+# 需要（重新）处理的原始论文：未处理，或处理后原始内容发生了变化（r 为 raw_papers，p 为 LEFT JOIN 的 processed_papers）
+UNPROCESSED_CONDITION = """
+    (p.doi IS NULL
+     OR (p.source_hash IS NOT NULL AND r.content_hash IS NOT NULL AND p.source_hash != r.content_hash)
+     OR (p.source_hash IS NULL AND EXISTS (
+          SELECT 1 FROM raw_paper_changes c
+          WHERE c.doi = r.doi AND c.changed_at > p.updated_at
+     )))
+"""
+
+
 class DBHelper:
     """数据库辅助工具类，提供数据库操作封装"""
     
@@ -79,6 +175,7 @@ class DBHelper:
                         authors VARCHAR(500),
                         tags TEXT,
                         journal VARCHAR(255),
+                        content_hash CHAR(64),
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                         INDEX idx_doi (doi),
@@ -86,6 +183,21 @@ class DBHelper:
                         INDEX idx_date (publishDate)
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
                 """)
+                DBHelper._ensure_column(cursor, 'raw_papers', 'content_hash', 'CHAR(64)')
+                
+                # 创建原始论文字段级变更记录表（只记录内容真正变化的更新）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS raw_paper_changes (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        doi VARCHAR(255) NOT NULL,
+                        old_hash CHAR(64),
+                        new_hash CHAR(64) NOT NULL,
+                        changed_fields MEDIUMTEXT NOT NULL,
+                        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        INDEX idx_doi (doi),
+                        INDEX idx_changed_at (changed_at)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
                 
                 # 创建处理后论文数据表
                 cursor.execute("""
@@ -102,95 +214,714 @@ class DBHelper:
                         tags TEXT,
                         Subject VARCHAR(50),
                         journal VARCHAR(255),
+                        source_hash CHAR(64),
+                        missing_fields TINYINT UNSIGNED NOT NULL DEFAULT 0,
+                        subject_source VARCHAR(20),
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                         INDEX idx_doi (doi),
                         INDEX idx_subject (Subject),
+                        INDEX idx_missing_fields (missing_fields),
                         INDEX idx_journal (journal),
                         INDEX idx_date (publishDate)
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
                 """)
+                # source_hash 记录生成该处理结果时原始论文的内容哈希
+                DBHelper._ensure_column(cursor, 'processed_papers', 'source_hash', 'CHAR(64)')
+                # subject_source 记录学科分类的来源：llm、classifier（本地分类器）或 human（人工标注）
+                DBHelper._ensure_column(cursor, 'processed_papers', 'subject_source', 'VARCHAR(20)')
+                # missing_fields 为缺失NLP字段的位掩码，字段补全只查询该值非0的行
+                if DBHelper._ensure_column(cursor, 'processed_papers', 'missing_fields', 'TINYINT UNSIGNED NOT NULL DEFAULT 0'):
+                    cursor.execute(f"UPDATE processed_papers SET missing_fields = {MISSING_FIELDS_SQL}")
+                    cursor.execute("ALTER TABLE processed_papers ADD INDEX idx_missing_fields (missing_fields)")
+                    logger.info("已为已有的处理后论文计算 missing_fields")
+                else:
+                    # 旧版本把只含空白的字段视为已填写：重新计算这些行的掩码，使其进入字段补全
+                    cursor.execute(f"""
+                        UPDATE processed_papers SET missing_fields = {MISSING_FIELDS_SQL}
+                        WHERE missing_fields = 0 AND ({MISSING_FIELDS_SQL}) <> 0
+                    """)
+                
+                # 创建论文关联数据集表（摘要抓取时从页面中提取的数据仓储链接）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS paper_datasets (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        doi VARCHAR(255) NOT NULL,
+                        repository VARCHAR(50) NOT NULL,
+                        identifier VARCHAR(255) NOT NULL,
+                        url VARCHAR(500) NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE KEY uk_doi_dataset (doi, repository, identifier),
+                        INDEX idx_doi (doi)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                
+                # 创建推迟抓取的论文表（摘要增强失败，留待下次运行重试）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS deferred_papers (
+                        doi VARCHAR(255) PRIMARY KEY,
+                        paper_data TEXT NOT NULL,
+                        attempts INT NOT NULL DEFAULT 1,
+                        last_error VARCHAR(500),
+                        next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        INDEX idx_next_attempt (next_attempt_at)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                
+                # 创建回填爬取断点表（按数据源和时间段记录翻页进度）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS crawl_checkpoint (
+                        source VARCHAR(100) NOT NULL,
+                        period VARCHAR(20) NOT NULL,
+                        next_page INT NOT NULL DEFAULT 1,
+                        status VARCHAR(20) NOT NULL DEFAULT 'in_progress',
+                        items_seen INT NOT NULL DEFAULT 0,
+                        items_saved INT NOT NULL DEFAULT 0,
+                        covered_from VARCHAR(10),
+                        covered_to VARCHAR(10),
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        PRIMARY KEY (source, period)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                # 已翻阅到的最早日期与回填时的结束日期（判断时间段是否覆盖了本次的日期范围）
+                DBHelper._ensure_column(cursor, 'crawl_checkpoint', 'covered_from', 'VARCHAR(10)')
+                DBHelper._ensure_column(cursor, 'crawl_checkpoint', 'covered_to', 'VARCHAR(10)')
+                
+                # 创建NLP处理租约表（多个工作进程领取待处理论文，租约过期后可被其他进程重新领取）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS nlp_leases (
+                        doi VARCHAR(255) PRIMARY KEY,
+                        worker_id VARCHAR(100) NOT NULL,
+                        lease_until DATETIME NOT NULL,
+                        attempts INT NOT NULL DEFAULT 1,
+                        claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        INDEX idx_worker (worker_id),
+                        INDEX idx_lease_until (lease_until)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                
+                # 创建NLP处理日志表（每次运行的开始/结束、每次模型调用的成功/失败/缓存命中）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS nlp_journal (
+                        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                        run_id VARCHAR(64) NOT NULL,
+                        doi VARCHAR(255),
+                        task VARCHAR(50) NOT NULL,
+                        fields VARCHAR(255),
+                        attempt INT NOT NULL DEFAULT 1,
+                        status VARCHAR(20) NOT NULL,
+                        detail VARCHAR(500),
+                        prompt_tokens INT,
+                        completion_tokens INT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        INDEX idx_run (run_id),
+                        INDEX idx_doi (doi)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                
+                DBHelper._ensure_column(cursor, 'nlp_journal', 'prompt_tokens', 'INT')
+                DBHelper._ensure_column(cursor, 'nlp_journal', 'completion_tokens', 'INT')
+                
+                # 创建RSS源配置与调度状态表
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS feed_sources (
+                        name VARCHAR(255) PRIMARY KEY,
+                        rss_url VARCHAR(500) NOT NULL,
+                        enabled TINYINT(1) NOT NULL DEFAULT 1,
+                        min_interval_minutes INT NOT NULL DEFAULT 60,
+                        max_interval_minutes INT NOT NULL DEFAULT 1440,
+                        avg_gap_hours DOUBLE,
+                        last_polled_at DATETIME,
+                        next_poll_at DATETIME,
+                        last_new_count INT NOT NULL DEFAULT 0,
+                        INDEX idx_next_poll (next_poll_at)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                
+                connection.commit()
+                logger.info("数据库表初始化完成")
+                return True
+        except Exception as e:
+            logger.error(f"数据库表初始化失败: {e}")
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def _ensure_column(cursor, table, column, definition):
+        """为已存在的旧表补充新增的列（CREATE TABLE IF NOT EXISTS 不会修改旧表）"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, column))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"为表 {table} 添加列 {column}")
+            return True
+        return False
+    
+    @staticmethod
+    def _fetch_raw_rows(cursor, dois, batch_size=500):
+        """按DOI批量读取已有原始论文的内容字段和内容哈希，返回 {小写DOI: 行字典}"""
+        rows = {}
+        dois = list(dict.fromkeys(dois))
+        columns = ", ".join(("doi", "content_hash") + RAW_CONTENT_FIELDS)
+        for start in range(0, len(dois), batch_size):
+            batch = dois[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"SELECT {columns} FROM raw_papers WHERE doi IN ({placeholders})", batch)
+            for row in cursor.fetchall():
+                record = dict(zip(("doi", "content_hash") + RAW_CONTENT_FIELDS, row))
+                rows[record["doi"].lower()] = record
+        return rows
+    
+    @staticmethod
+    def _record_raw_changes(cursor, changes):
+        """写入字段级变更记录，changes 为 [(doi, 旧哈希, 新哈希, {字段: {old, new}}), ...]"""
+        if not changes:
+            return
+        cursor.executemany("""
+            INSERT INTO raw_paper_changes (doi, old_hash, new_hash, changed_fields)
+            VALUES (%s, %s, %s, %s)
+        """, [
+            (doi, old_hash, new_hash, json.dumps(diff, ensure_ascii=False))
+            for doi, old_hash, new_hash, diff in changes
+        ])
+    
+    @staticmethod
+    def insert_raw_paper(paper_data):
+        """
+        将原始论文数据插入数据库
+        
+        内容哈希与已有记录相同时不写入；内容变化时更新记录并保存字段级变更。
+        
+        参数:
+            paper_data (dict): 包含论文数据的字典
+            
+        返回:
+            bool: 是否成功（内容未变化也视为成功）
+        """
+        return DBHelper.bulk_upsert_raw_papers([paper_data]) is not None
+    
+    @staticmethod
+    def bulk_upsert_raw_papers(papers):
+        """
+        批量插入或更新原始论文数据（单个事务）
+        
+        先按DOI读取已有记录的内容哈希：
+        1. 哈希相同的论文直接跳过，不更新 updated_at
+        2. 内容变化的论文更新记录，并在 raw_paper_changes 中保存字段级变更
+        3. 新论文直接插入
+        
+        整批写入失败时回滚并改为逐条写入，跳过出错的论文，其余论文照常提交。
+        
+        参数:
+            papers (list): 论文数据字典列表
+            
+        返回:
+            int: 实际写入（新增或内容变化）的论文数量，失败（没有任何论文写入成功）时返回None
+        """
+        papers = list({paper['doi'].lower(): paper for paper in papers if paper.get('doi')}.values())
+        if not papers:
+            return 0
+        
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，批量写入原始论文数据失败")
+            return None
+            
+        try:
+            with connection.cursor() as cursor:
+                existing = DBHelper._fetch_raw_rows(cursor, [paper['doi'] for paper in papers])
+                
+                rows = []
+                changes = {}
+                hash_updates = []
+                unchanged = 0
+                for paper in papers:
+                    content_hash = raw_content_hash(paper)
+                    old = existing.get(paper['doi'].lower())
+                    if old is not None:
+                        if old['content_hash'] == content_hash:
+                            unchanged += 1
+                            continue
+                        diff = raw_field_diff(old, paper)
+                        if not diff:
+                            # 旧记录尚无哈希但内容相同：只补写哈希，不视为变更
+                            hash_updates.append((content_hash, paper['doi']))
+                            unchanged += 1
+                            continue
+                        changes[paper['doi']] = (paper['doi'], old['content_hash'], content_hash, diff)
+                        logger.info(f"原始论文内容变化，DOI: {paper['doi']}，字段: {', '.join(diff)}")
+                    rows.append(tuple(paper.get(field, '') for field in RAW_CONTENT_FIELDS) + (
+                        paper['doi'],
+                        content_hash
+                    ))
+                
+                try:
+                    if hash_updates:
+                        cursor.executemany(RAW_HASH_UPDATE_SQL, hash_updates)
+                    if rows:
+                        cursor.executemany(RAW_UPSERT_SQL, rows)
+                    DBHelper._record_raw_changes(cursor, list(changes.values()))
+                    connection.commit()
+                    saved, saved_changes, failed = rows, len(changes), 0
+                except Exception as e:
+                    logger.warning(f"批量写入原始论文数据失败，改为逐条写入: {e}")
+                    connection.rollback()
+                    saved, saved_changes, failed = DBHelper._upsert_raw_rows_one_by_one(
+                        connection, cursor, rows, changes, hash_updates
+                    )
+                
+                logger.info(
+                    f"批量写入原始论文数据：新增 {len(saved) - saved_changes} 条，内容变化 {saved_changes} 条，"
+                    f"未变化跳过 {unchanged} 条" + (f"，失败跳过 {failed} 条" if failed else "")
+                )
+                if rows and not saved:
+                    return None
+                return len(saved)
+        except Exception as e:
+            logger.error(f"批量写入原始论文数据失败: {e}")
+            connection.rollback()
+            return None
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def _upsert_raw_rows_one_by_one(connection, cursor, rows, changes, hash_updates=()):
+        """
+        逐条写入原始论文（每条单独提交），出错的论文回滚后记录日志并跳过
+        
+        返回:
+            (成功写入的行列表, 其中内容变化的数量, 失败数量)
+        """
+        for content_hash, doi in hash_updates:
+            try:
+                cursor.execute(RAW_HASH_UPDATE_SQL, (content_hash, doi))
+                connection.commit()
+            except Exception as e:
+                logger.error(f"补写原始论文内容哈希失败，DOI: {doi}，错误: {e}")
+                connection.rollback()
+        
+        saved = []
+        saved_changes = 0
+        for row in rows:
+            doi = row[-2]
+            change = changes.get(doi)
+            try:
+                cursor.execute(RAW_UPSERT_SQL, row)
+                DBHelper._record_raw_changes(cursor, [change] if change else [])
+                connection.commit()
+            except Exception as e:
+                logger.error(f"写入原始论文失败，已跳过，DOI: {doi}，错误: {e}")
+                connection.rollback()
+                continue
+            saved.append(row)
+            saved_changes += int(change is not None)
+        return saved, saved_changes, len(rows) - len(saved)
+    
+    @staticmethod
+    def update_raw_abstract(doi, abstract):
+        """
+        用更长的摘要更新原始论文数据（用于从页面缓存重新解析后回写）
+        
+        参数:
+            doi (str): 论文DOI
+            abstract (str): 新提取的摘要
+            
+        返回:
+            bool: 是否有记录被更新
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，更新原始论文摘要失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                old = DBHelper._fetch_raw_rows(cursor, [doi]).get(doi.lower())
+                if old is None or len(old['abstract'] or '') >= len(abstract):
+                    return False
                 
+                paper = dict(old, abstract=abstract)
+                content_hash = raw_content_hash(paper)
+                diff = raw_field_diff(old, paper)
+                if not diff:
+                    return False
+                cursor.execute("""
+                    UPDATE raw_papers SET abstract = %s, content_hash = %s, updated_at = NOW()
+                    WHERE doi = %s
+                """, (abstract, content_hash, doi))
+                DBHelper._record_raw_changes(cursor, [(doi, old['content_hash'], content_hash, diff)])
+                connection.commit()
+                logger.info(f"更新原始论文摘要，DOI: {doi}")
+                return True
+        except Exception as e:
+            logger.error(f"更新原始论文摘要失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def save_paper_datasets(records):
+        """
+        批量保存论文关联的数据集链接（已存在的自动跳过）
+        
+        参数:
+            records (list): [(论文DOI, {"repository", "identifier", "url"}), ...]
+            
+        返回:
+            int: 新增的记录数
+        """
+        records = [(doi, dataset) for doi, dataset in records if doi and dataset.get('url')]
+        if not records:
+            return 0
+        
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，保存数据集链接失败")
+            return 0
+            
+        try:
+            with connection.cursor() as cursor:
+                affected = cursor.executemany("""
+                    INSERT IGNORE INTO paper_datasets (doi, repository, identifier, url)
+                    VALUES (%s, %s, %s, %s)
+                """, [(
+                    doi,
+                    dataset.get('repository', ''),
+                    dataset.get('identifier', '')[:255],
+                    dataset['url'][:500]
+                ) for doi, dataset in records])
+                connection.commit()
+                if affected:
+                    logger.info(f"保存 {affected} 条数据集链接")
+                return affected
+        except Exception as e:
+            logger.error(f"保存数据集链接失败: {e}")
+            connection.rollback()
+            return 0
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def save_deferred_paper(paper_data, error=""):
+        """
+        保存摘要增强被推迟的论文，重试间隔随尝试次数指数增长（15分钟起，最长1天）
+        
+        参数:
+            paper_data (dict): 爬虫生成的论文数据字典
+            error (str): 推迟原因
+            
+        返回:
+            bool: 是否成功
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，保存推迟论文失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO deferred_papers (doi, paper_data, attempts, last_error, next_attempt_at)
+                    VALUES (%s, %s, 1, %s, NOW() + INTERVAL 15 MINUTE)
+                    ON DUPLICATE KEY UPDATE
+                        attempts = attempts + 1,
+                        paper_data = VALUES(paper_data),
+                        last_error = VALUES(last_error),
+                        next_attempt_at = NOW() + INTERVAL LEAST(1440, 15 * POW(2, attempts - 1)) MINUTE
+                """, (
+                    paper_data.get('doi', ''),
+                    json.dumps(paper_data, ensure_ascii=False),
+                    (error or '')[:500]
+                ))
+                connection.commit()
+                logger.info(f"推迟摘要增强，DOI: {paper_data.get('doi', '')}")
+                return True
+        except Exception as e:
+            logger.error(f"保存推迟论文失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def get_due_deferred_papers(limit=100):
+        """
+        获取已到重试时间的推迟论文
+        
+        返回:
+            list: 每项包含 doi、paper_data(dict)、attempts
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取推迟论文失败")
+            return []
+            
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT doi, paper_data, attempts FROM deferred_papers
+                    WHERE next_attempt_at <= NOW()
+                    ORDER BY next_attempt_at ASC
+                    LIMIT %s
+                """, (limit,))
+                rows = cursor.fetchall()
+                for row in rows:
+                    row['paper_data'] = json.loads(row['paper_data'])
+                return rows
+        except Exception as e:
+            logger.error(f"获取推迟论文失败: {e}")
+            return []
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def get_existing_dois(dois, batch_size=500):
+        """
+        查询给定DOI中已存在于 raw_papers 或 deferred_papers 的部分，用于爬取时去重
+        
+        只按本次RSS中出现的DOI分批执行 IN 查询（走唯一索引），
+        查询成本与RSS条目数相关，不随数据库中的论文总数增长。
+        
+        参数:
+            dois (iterable): 待检查的DOI
+            batch_size (int): 每条 IN 查询包含的最大DOI数
+            
+        返回:
+            set: 已存在的DOI（小写），失败时返回空集合
+        """
+        dois = list(dict.fromkeys(doi for doi in dois if doi))
+        if not dois:
+            return set()
+        
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，查询已存在DOI失败")
+            return set()
+            
+        try:
+            existing = set()
+            with connection.cursor() as cursor:
+                for start in range(0, len(dois), batch_size):
+                    batch = dois[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(f"""
+                        SELECT doi FROM raw_papers WHERE doi IN ({placeholders})
+                        UNION
+                        SELECT doi FROM deferred_papers WHERE doi IN ({placeholders})
+                    """, batch + batch)
+                    existing.update(row[0].lower() for row in cursor.fetchall())
+            return existing
+        except Exception as e:
+            logger.error(f"查询已存在DOI失败: {e}")
+            return set()
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def delete_deferred_paper(doi):
+        """从推迟表中移除论文"""
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，删除推迟论文失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM deferred_papers WHERE doi = %s", (doi,))
+                connection.commit()
+                return True
+        except Exception as e:
+            logger.error(f"删除推迟论文失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def get_crawl_checkpoint(source, period):
+        """
+        获取回填爬取断点
+        
+        返回:
+            dict: 包含 next_page、status、items_seen、items_saved、covered_from、covered_to，不存在时返回None
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取爬取断点失败")
+            return None
+            
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT next_page, status, items_seen, items_saved, covered_from, covered_to FROM crawl_checkpoint
+                    WHERE source = %s AND period = %s
+                """, (source, period))
+                return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"获取爬取断点失败: {e}")
+            return None
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def save_crawl_checkpoint(source, period, next_page, status='in_progress', items_seen=0, items_saved=0,
+                              covered_from=None, covered_to=None):
+        """
+        保存回填爬取断点（条目计数为本次增量，累加到已有记录上）
+        
+        参数:
+            covered_from: (可选) 已翻阅到的最早发布日期 YYYY-MM-DD，列表翻完时为该时间段的第一天
+            covered_to: (可选) 回填的结束日期 YYYY-MM-DD（该日期之前的条目都已处理）
+        
+        返回:
+            bool: 是否成功
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，保存爬取断点失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO crawl_checkpoint (
+                        source, period, next_page, status, items_seen, items_saved, covered_from, covered_to
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        next_page = VALUES(next_page),
+                        status = VALUES(status),
+                        items_seen = items_seen + VALUES(items_seen),
+                        items_saved = items_saved + VALUES(items_saved),
+                        covered_from = COALESCE(VALUES(covered_from), covered_from),
+                        covered_to = COALESCE(VALUES(covered_to), covered_to)
+                """, (source, period, next_page, status, items_seen, items_saved, covered_from, covered_to))
+                connection.commit()
+                return True
+        except Exception as e:
+            logger.error(f"保存爬取断点失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def reset_crawl_checkpoints(source):
+        """清除某个数据源的全部回填断点"""
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，清除爬取断点失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM crawl_checkpoint WHERE source = %s", (source,))
                 connection.commit()
-                logger.info("数据库表初始化完成")
                 return True
         except Exception as e:
-            logger.error(f"数据库表初始化失败: {e}")
+            logger.error(f"清除爬取断点失败: {e}")
+            connection.rollback()
             return False
         finally:
             connection.close()
     
     @staticmethod
-    def insert_raw_paper(paper_data):
+    def get_feed_sources(enabled_only=True):
         """
-        将原始论文数据插入数据库
+        获取RSS源配置及调度状态
+        
+        返回:
+            list: RSS源字典列表
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取RSS源失败")
+            return []
+            
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                if enabled_only:
+                    cursor.execute("SELECT * FROM feed_sources WHERE enabled = 1")
+                else:
+                    cursor.execute("SELECT * FROM feed_sources")
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"获取RSS源失败: {e}")
+            return []
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def upsert_feed_sources(feeds):
+        """
+        写入RSS源配置（只更新配置字段，不覆盖调度状态）
         
         参数:
-            paper_data (dict): 包含论文数据的字典
+            feeds (list): 包含 name、rss_url 及可选间隔配置的字典列表
             
         返回:
             bool: 是否成功
         """
+        if not feeds:
+            return True
         connection = DBHelper.get_connection()
         if not connection:
-            logger.error("无法连接到数据库，原始论文数据插入失败")
+            logger.error("无法连接到数据库，写入RSS源失败")
             return False
             
         try:
             with connection.cursor() as cursor:
-                # 检查是否已存在相同DOI的记录
-                cursor.execute(
-                    "SELECT COUNT(*) FROM raw_papers WHERE doi = %s",
-                    (paper_data.get('doi', ''),)
-                )
-                count = cursor.fetchone()[0]
-                
-                if count > 0:
-                    # 更新现有记录
-                    cursor.execute("""
-                        UPDATE raw_papers SET
-                        title = %s,
-                        abstract = %s,
-                        publishDate = %s,
-                        url = %s,
-                        authors = %s,
-                        tags = %s,
-                        journal = %s,
-                        updated_at = NOW()
-                        WHERE doi = %s
-                    """, (
-                        paper_data.get('title', ''),
-                        paper_data.get('abstract', ''),
-                        paper_data.get('publishDate', ''),
-                        paper_data.get('url', ''),
-                        paper_data.get('authors', ''),
-                        paper_data.get('tags', ''),
-                        paper_data.get('journal', ''),
-                        paper_data.get('doi', '')
-                    ))
-                    logger.info(f"更新原始论文数据，DOI: {paper_data.get('doi', '')}")
-                else:
-                    # 插入新记录
-                    cursor.execute("""
-                        INSERT INTO raw_papers (
-                            title, abstract, publishDate, doi, url, authors, tags, journal
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        paper_data.get('title', ''),
-                        paper_data.get('abstract', ''),
-                        paper_data.get('publishDate', ''),
-                        paper_data.get('doi', ''),
-                        paper_data.get('url', ''),
-                        paper_data.get('authors', ''),
-                        paper_data.get('tags', ''),
-                        paper_data.get('journal', '')
-                    ))
-                    logger.info(f"插入新的原始论文数据，DOI: {paper_data.get('doi', '')}")
-                
+                cursor.executemany("""
+                    INSERT INTO feed_sources (name, rss_url, enabled, min_interval_minutes, max_interval_minutes)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        rss_url = VALUES(rss_url),
+                        enabled = VALUES(enabled),
+                        min_interval_minutes = VALUES(min_interval_minutes),
+                        max_interval_minutes = VALUES(max_interval_minutes)
+                """, [(
+                    feed['name'],
+                    feed['rss_url'],
+                    1 if feed.get('enabled', True) else 0,
+                    feed.get('min_interval_minutes', 60),
+                    feed.get('max_interval_minutes', 1440)
+                ) for feed in feeds])
+                connection.commit()
+                return True
+        except Exception as e:
+            logger.error(f"写入RSS源失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def update_feed_schedule(name, avg_gap_hours, last_polled_at, next_poll_at, last_new_count):
+        """更新RSS源的调度状态"""
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，更新RSS源调度状态失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE feed_sources SET
+                        avg_gap_hours = %s,
+                        last_polled_at = %s,
+                        next_poll_at = %s,
+                        last_new_count = %s
+                    WHERE name = %s
+                """, (avg_gap_hours, last_polled_at, next_poll_at, last_new_count, name))
                 connection.commit()
                 return True
         except Exception as e:
-            logger.error(f"原始论文数据操作失败: {e}")
+            logger.error(f"更新RSS源调度状态失败: {e}")
             connection.rollback()
             return False
         finally:
@@ -240,6 +971,9 @@ class DBHelper:
                         tags = %s,
                         Subject = %s,
                         journal = %s,
+                        source_hash = %s,
+                        missing_fields = %s,
+                        subject_source = %s,
                         updated_at = NOW()
                         WHERE doi = %s
                     """, (
@@ -253,6 +987,9 @@ class DBHelper:
                         tags,
                         paper_data.get('Subject', ''),
                         paper_data.get('journal', ''),
+                        paper_data.get('source_hash'),
+                        missing_fields_mask(paper_data),
+                        paper_data.get('subject_source'),
                         paper_data.get('doi', '')
                     ))
                     logger.info(f"更新处理后论文数据，DOI: {paper_data.get('doi', '')}")
@@ -261,8 +998,8 @@ class DBHelper:
                     cursor.execute("""
                         INSERT INTO processed_papers (
                             title, titleCn, interpretationCn, abstract, publishDate, doi,
-                            url, authors, tags, Subject, journal
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            url, authors, tags, Subject, journal, source_hash, missing_fields, subject_source
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """, (
                         paper_data.get('title', ''),
                         paper_data.get('titleCn', ''),
@@ -274,7 +1011,10 @@ class DBHelper:
                         paper_data.get('authors', ''),
                         tags,
                         paper_data.get('Subject', ''),
-                        paper_data.get('journal', '')
+                        paper_data.get('journal', ''),
+                        paper_data.get('source_hash'),
+                        missing_fields_mask(paper_data),
+                        paper_data.get('subject_source')
                     ))
                     logger.info(f"插入新的处理后论文数据，DOI: {paper_data.get('doi', '')}")
                 
@@ -287,6 +1027,117 @@ class DBHelper:
         finally:
             connection.close()
     
+    @staticmethod
+    def update_processed_fields(doi, fields):
+        """
+        只更新处理后论文的部分NLP字段，并重新计算 missing_fields（每个字段生成后立即保存）
+        
+        参数:
+            doi: 论文DOI（对应的处理后论文记录必须已存在）
+            fields (dict): {字段: 值}，只接受 NLP_FIELDS 与 NLP_META_FIELDS 中的字段
+            
+        返回:
+            bool: 是否成功
+        """
+        fields = {field: value for field, value in fields.items() if field in NLP_FIELDS + NLP_META_FIELDS}
+        if not fields:
+            return False
+        if isinstance(fields.get('tags'), list):
+            fields['tags'] = ','.join(fields['tags'])
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，更新论文字段失败")
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                # 单表 UPDATE 按顺序赋值，missing_fields 放在最后才能用上新的字段值
+                assignments = ", ".join(f"{field} = %s" for field in fields)
+                updated = cursor.execute(f"""
+                    UPDATE processed_papers SET {assignments}, missing_fields = {MISSING_FIELDS_SQL}
+                    WHERE doi = %s
+                """, list(fields.values()) + [doi])
+                connection.commit()
+                logger.debug(f"保存论文字段 {', '.join(fields)}，DOI: {doi}")
+                return updated > 0
+        except Exception as e:
+            logger.error(f"更新论文字段失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def record_nlp_journal(run_id, task, status, doi=None, fields=None, attempt=1, detail=None,
+                           prompt_tokens=None, completion_tokens=None):
+        """
+        写入一条NLP处理日志
+        
+        参数:
+            run_id: 运行标识
+            task: 任务类型（模型任务名，或 run 表示运行开始/结束）
+            status: success / failed / cached / start / finish
+            doi: (可选) 论文DOI
+            fields: (可选) 请求的字段列表
+            attempt: 第几次尝试
+            detail: (可选) 错误信息或说明
+            prompt_tokens / completion_tokens: (可选) API响应中的token用量
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO nlp_journal (run_id, doi, task, fields, attempt, status, detail,
+                                             prompt_tokens, completion_tokens)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    run_id, doi, task,
+                    ",".join(fields) if fields else None,
+                    attempt, status,
+                    (detail or '')[:500] or None,
+                    prompt_tokens, completion_tokens
+                ))
+                connection.commit()
+                return True
+        except Exception as e:
+            logger.error(f"写入NLP处理日志失败: {e}")
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def get_nlp_journal_summary(run_id):
+        """按任务和状态统计一次运行的日志条数和token用量，返回 {任务: {状态: 次数, 'prompt_tokens': ..., 'completion_tokens': ...}}"""
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取NLP处理日志失败")
+            return {}
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT task, status, COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0)
+                    FROM nlp_journal
+                    WHERE run_id = %s AND task != 'run'
+                    GROUP BY task, status
+                """, (run_id,))
+                summary = {}
+                for task, status, count, prompt_tokens, completion_tokens in cursor.fetchall():
+                    entry = summary.setdefault(task, {'prompt_tokens': 0, 'completion_tokens': 0})
+                    entry[status] = count
+                    entry['prompt_tokens'] += int(prompt_tokens)
+                    entry['completion_tokens'] += int(completion_tokens)
+                return summary
+        except Exception as e:
+            logger.error(f"获取NLP处理日志失败: {e}")
+            return {}
+        finally:
+            connection.close()
+    
     @staticmethod
     def get_all_raw_papers():
         """获取所有原始论文数据"""
@@ -355,9 +1206,50 @@ class DBHelper:
         finally:
             connection.close()
     
+    @staticmethod
+    def get_incomplete_processed_papers(after_id=0, limit=200):
+        """
+        按主键顺序分批获取缺少NLP字段的处理后论文（走 missing_fields 索引，不扫描全表）
+        
+        跳过仍被工作进程租用的论文：其字段正在生成，补全会重复调用并与逐字段保存冲突。
+        
+        参数:
+            after_id: 只返回 id 大于该值的记录（上一批最后一条的 id）
+            limit: 每批数量
+            
+        返回:
+            list: 论文数据字典列表（包含 id 和 missing_fields）
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取待补全论文失败")
+            return []
+            
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id, title, titleCn, interpretationCn, abstract, publishDate, doi, url,
+                           authors, tags, Subject, journal, source_hash, missing_fields
+                    FROM processed_papers
+                    WHERE missing_fields > 0 AND id > %s
+                      AND doi NOT IN (SELECT doi FROM nlp_leases WHERE lease_until > NOW())
+                    ORDER BY id
+                    LIMIT %s
+                """, (after_id, limit))
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"获取待补全论文失败: {e}")
+            return []
+        finally:
+            connection.close()
+    
     @staticmethod
     def get_unprocessed_raw_papers():
-        """获取未处理的原始论文数据（存在于raw_papers但不在processed_papers中）"""
+        """
+        获取需要（重新）处理的原始论文数据：
+        1. 存在于raw_papers但不在processed_papers中
+        2. 处理后原始内容发生了变化（内容哈希与处理时记录的 source_hash 不同）
+        """
         connection = DBHelper.get_connection()
         if not connection:
             logger.error("无法连接到数据库，获取未处理论文数据失败")
@@ -365,11 +1257,11 @@ class DBHelper:
             
         try:
             with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT r.* 
+                cursor.execute(f"""
+                    SELECT r.*, p.doi IS NOT NULL AS already_processed
                     FROM raw_papers r
                     LEFT JOIN processed_papers p ON r.doi = p.doi COLLATE utf8mb4_unicode_ci
-                    WHERE p.doi IS NULL
+                    WHERE {UNPROCESSED_CONDITION}
                     ORDER BY r.publishDate DESC
                 """)
                 papers = cursor.fetchall()
@@ -396,6 +1288,174 @@ class DBHelper:
         finally:
             connection.close()
     
+    @staticmethod
+    def claim_unprocessed_raw_papers(worker_id, limit=100, lease_seconds=600):
+        """
+        为工作进程领取一批需要（重新）处理的原始论文（租约方式，多个进程/机器可同时领取）
+        
+        待处理的论文包括未处理或原始内容已变化的论文，以及已处理但字段仍不齐全（missing_fields 非0）
+        的论文：后者的字段生成失败或进程中途退出，租约到期后继续生成尚缺的字段。
+        
+        1. 查询未被租用（或租约已过期）的待处理论文
+        2. 逐条写入租约：nlp_leases 的主键保证同一篇论文同时只有一个进程能持有未过期的租约，
+           两个进程同时领取同一篇论文时只有一个成功
+        3. 返回本进程实际领到的论文
+        进程崩溃后其租约到期，论文会被其他进程重新领取。
+        
+        参数:
+            worker_id: 工作进程标识
+            limit: 每次最多领取的论文数
+            lease_seconds: 租约时长（秒），处理期间由 renew_nlp_leases 续期
+            
+        返回:
+            list: 论文数据字典列表，没有可领取的论文时为空列表。already_processed 表示原始内容变化后重新处理；
+                  resume 表示继续生成缺失字段，此时 processed_fields 为已保存的非空NLP字段
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，领取待处理论文失败")
+            return []
+            
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT r.doi
+                    FROM raw_papers r
+                    LEFT JOIN processed_papers p ON r.doi = p.doi COLLATE utf8mb4_unicode_ci
+                    LEFT JOIN nlp_leases l ON r.doi = l.doi COLLATE utf8mb4_unicode_ci
+                    WHERE ({UNPROCESSED_CONDITION} OR p.missing_fields != 0)
+                      AND (l.doi IS NULL OR l.lease_until < NOW())
+                    ORDER BY r.publishDate DESC
+                    LIMIT %s
+                """, (limit,))
+                dois = [row[0] for row in cursor.fetchall()]
+                if not dois:
+                    return []
+                
+                # 租约未过期时保持原持有者不变（lease_until 必须最后赋值，前面的条件才能读到旧值）
+                cursor.executemany("""
+                    INSERT INTO nlp_leases (doi, worker_id, lease_until)
+                    VALUES (%s, %s, NOW() + INTERVAL %s SECOND)
+                    ON DUPLICATE KEY UPDATE
+                        worker_id = IF(lease_until < NOW(), VALUES(worker_id), worker_id),
+                        attempts = IF(lease_until < NOW(), attempts + 1, attempts),
+                        claimed_at = IF(lease_until < NOW(), NOW(), claimed_at),
+                        lease_until = IF(lease_until < NOW(), VALUES(lease_until), lease_until)
+                """, [(doi, worker_id, lease_seconds) for doi in dois])
+                connection.commit()
+            
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                placeholders = ", ".join(["%s"] * len(dois))
+                stored_columns = ", ".join(f"p.{field} AS p_{field}" for field in NLP_FIELDS + NLP_META_FIELDS)
+                cursor.execute(f"""
+                    SELECT r.*, {stored_columns}, l.attempts AS lease_attempts,
+                           p.doi IS NOT NULL AND {UNPROCESSED_CONDITION} AS already_processed,
+                           p.doi IS NOT NULL AND NOT {UNPROCESSED_CONDITION} AS resume
+                    FROM nlp_leases l
+                    JOIN raw_papers r ON r.doi = l.doi COLLATE utf8mb4_unicode_ci
+                    LEFT JOIN processed_papers p ON r.doi = p.doi COLLATE utf8mb4_unicode_ci
+                    WHERE l.worker_id = %s AND l.doi IN ({placeholders})
+                    ORDER BY r.publishDate DESC
+                """, [worker_id] + dois)
+                papers = cursor.fetchall()
+                
+                reclaimed = sum(1 for paper in papers if paper['lease_attempts'] > 1)
+                logger.info(f"工作进程 {worker_id} 领取 {len(papers)} 篇论文"
+                            + (f"（其中 {reclaimed} 篇来自过期的租约）" if reclaimed else ""))
+                
+                # 处理tags字段，将其转换为列表
+                for paper in papers:
+                    if 'tags' in paper and paper['tags']:
+                        paper['tags'] = paper['tags'].split(',')
+                    else:
+                        paper['tags'] = []
+                    
+                    # 移除不需要的字段
+                    for key in ('created_at', 'updated_at', 'id', 'lease_attempts'):
+                        paper.pop(key, None)
+                    
+                    # 继续处理时只保留已保存的非空字段（学科来源随学科一起保留）
+                    stored = {field: paper.pop(f'p_{field}', None) for field in NLP_FIELDS + NLP_META_FIELDS}
+                    if paper['resume']:
+                        fields = {field: stored[field] for field in NLP_FIELDS
+                                  if (stored[field] or '').strip(BLANK_CHARS)}
+                        if 'Subject' in fields:
+                            fields['subject_source'] = stored['subject_source']
+                        paper['processed_fields'] = fields
+                
+                return papers
+        except Exception as e:
+            logger.error(f"领取待处理论文失败: {e}")
+            connection.rollback()
+            return []
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def renew_nlp_leases(worker_id, dois, lease_seconds=600):
+        """为本进程持有的租约续期（处理时间较长时定期调用，避免被其他进程领走）"""
+        if not dois:
+            return 0
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，租约续期失败")
+            return 0
+            
+        try:
+            with connection.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(dois))
+                renewed = cursor.execute(f"""
+                    UPDATE nlp_leases SET lease_until = NOW() + INTERVAL %s SECOND
+                    WHERE worker_id = %s AND doi IN ({placeholders})
+                """, [lease_seconds, worker_id] + list(dois))
+                connection.commit()
+                return renewed
+        except Exception as e:
+            logger.error(f"租约续期失败: {e}")
+            connection.rollback()
+            return 0
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def release_nlp_leases(worker_id, dois):
+        """
+        释放本进程持有的、已经处理完成的论文的租约
+        
+        处理完成指处理后论文记录了当前的原始内容哈希且字段齐全（missing_fields 为0）：新论文的骨架记录
+        一写入就带有内容哈希，只比较哈希会把字段全部生成失败的论文也当作完成。
+        处理失败的论文保留租约直到过期，过期后再由任一工作进程重试（相当于退避），
+        不会在本次领取循环中被立即重复处理。
+        
+        返回:
+            int: 释放的租约数
+        """
+        if not dois:
+            return 0
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，释放租约失败")
+            return 0
+            
+        try:
+            with connection.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(dois))
+                released = cursor.execute(f"""
+                    DELETE l FROM nlp_leases l
+                    JOIN raw_papers r ON r.doi = l.doi COLLATE utf8mb4_unicode_ci
+                    JOIN processed_papers p ON p.doi = l.doi COLLATE utf8mb4_unicode_ci
+                    WHERE l.worker_id = %s AND l.doi IN ({placeholders})
+                      AND p.source_hash <=> r.content_hash AND p.missing_fields = 0
+                """, [worker_id] + list(dois))
+                connection.commit()
+                return released
+        except Exception as e:
+            logger.error(f"释放租约失败: {e}")
+            connection.rollback()
+            return 0
+        finally:
+            connection.close()
+    
     @staticmethod
     def get_processed_papers_by_subject(subject):
         """
@@ -535,6 +1595,14 @@ class DBHelper:
                         del paper['updated_at']
                     if 'id' in paper:
                         del paper['id']
+                    
+                    # 关联的数据集链接
+                    cursor.execute("""
+                        SELECT repository, identifier, url FROM paper_datasets
+                        WHERE doi = %s ORDER BY id
+                    """, (doi,))
+                    paper['datasets'] = list(cursor.fetchall())
+                    paper['dataset_links'] = [dataset['url'] for dataset in paper['datasets']]
                 
                 return paper
         except Exception as e:
@@ -567,6 +1635,36 @@ class DBHelper:
         finally:
             connection.close()
 
+    @staticmethod
+    def get_labelled_papers():
+        """
+        获取已有学科分类的论文（训练本地分类器用）
+        
+        不包含本地分类器自己给出的分类，避免用模型的输出再训练模型。
+        
+        返回:
+            list: 包含 doi、title、abstract、Subject 的字典列表
+        """
+        connection = DBHelper.get_connection()
+        if not connection:
+            logger.error("无法连接到数据库，获取已分类论文失败")
+            return []
+            
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT doi, title, abstract, Subject FROM processed_papers
+                    WHERE Subject IS NOT NULL AND Subject != ''
+                    AND (subject_source IS NULL OR subject_source != 'classifier')
+                    ORDER BY id
+                """)
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"获取已分类论文失败: {e}")
+            return []
+        finally:
+            connection.close()
+
 if __name__ == "__main__":
     # 测试数据库连接和表初始化
     print_db_info()
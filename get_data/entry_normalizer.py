@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+RSS条目规范化模块
+
+将 feedparser 解析出的RSS条目转换为论文数据字典（DOI、摘要清理、发布日期格式化）：
+1. 正则表达式全部预编译
+2. 日期解析优先走 ISO 日期（YYYY-MM-DD 开头）的快速路径，不调用 strptime
+3. 其他日期（RFC 822、嵌在文本中的日期等）按解析方式依次尝试；每个RSS源缓存
+   上一次成功的方式，同一源的后续条目直接使用，不再逐个尝试 strptime 并捕获异常
+4. 逐条目的日志降为 DEBUG 级别，大批量回填时不再被日志输出拖慢
+"""
+
+import re
+import logging
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+
+try:
+    from .html_extract import html_to_text  # 当作为包导入时
+except ImportError:
+    from html_extract import html_to_text  # 当在同一目录下直接运行时
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 字符串开头的 ISO 日期（YYYY-MM-DD，后面可带时间部分）
+ISO_DATE_PREFIX = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+# 字符串中任意位置的 ISO 日期，例如 'Scientific Data, Published online: 2025-04-23; | doi:...'
+EMBEDDED_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+# RFC 822 日期的日期部分，例如 'Wed, 23 Apr 2025 15:46:08 +0200'（取原时区下的日期，不做换算）
+RFC822_DATE = re.compile(r'(?:[A-Za-z]{3}, )?(\d{1,2}) ([A-Za-z]{3}) (\d{4})\b')
+MONTHS = {name: index for index, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+
+# 预编译正则都不匹配时依次尝试的 strptime 格式
+DATE_FORMATS = (
+    "%a, %d %b %Y %H:%M:%S %z",
+    "%a, %d %b %Y %H:%M:%S",
+    "%d %B %Y",
+    "%B %d, %Y",
+)
+
+# 依次尝试的RSS摘要字段
+ABSTRACT_FIELDS = ("description", "summary", "content", "content:encoded", "dc:description")
+
+
+class EntryNormalizer:
+    """RSS条目规范化器（可在多次爬取间复用，日期格式缓存按RSS源保存）"""
+
+    def __init__(self):
+        self._date_formats = {}  # RSS源名称 -> 日期解析方式的尝试顺序（上次成功的在最前）
+
+    @staticmethod
+    def _iso_date(value):
+        """ISO 日期快速路径：字符串以 YYYY-MM-DD 开头时直接构造日期，失败返回None"""
+        match = ISO_DATE_PREFIX.match(value)
+        if not match:
+            return None
+        try:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _rfc822_date(value):
+        """RFC 822 日期：用预编译正则取日期部分"""
+        match = RFC822_DATE.match(value)
+        month = match and MONTHS.get(match.group(2).lower())
+        if not month:
+            return None
+        return date(int(match.group(3)), month, int(match.group(1)))
+
+    @staticmethod
+    def _embedded_date(value):
+        """文本中任意位置的 ISO 日期"""
+        match = EMBEDDED_DATE.search(value)
+        if not match:
+            return None
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    @staticmethod
+    def _strptime_date(value):
+        """依次尝试 DATE_FORMATS 中的格式"""
+        # 末尾可能带 %z 无法处理的时区名称（如 GMT、CEST），先去掉
+        parts = value.split()
+        if len(parts) > 5 and not parts[-1].startswith(('+', '-')):
+            value = " ".join(parts[:-1])
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def _email_date(value):
+        """最后的后备：标准库的 RFC 2822 解析"""
+        return parsedate_to_datetime(value).date()
+
+    # 日期解析方式，按尝试顺序排列（快的在前，逐个捕获异常的 strptime 在后）
+    DATE_PARSERS = ("_rfc822_date", "_embedded_date", "_strptime_date", "_email_date")
+
+    def parse_date(self, value, feed=None):
+        """解析日期字符串，返回 date；无法解析时返回None
+
+        参数:
+            value: 日期字符串（ISO、RFC 822 或包含 ISO 日期的文本）
+            feed: RSS源名称，用于缓存该源的日期解析方式
+        """
+        value = (value or "").strip()
+        if not value:
+            return None
+
+        parsed = self._iso_date(value)
+        if parsed:
+            return parsed
+
+        # 先用该源上次成功的解析方式，失败后再依次尝试其他方式
+        order = self._date_formats.get(feed, self.DATE_PARSERS)
+        for name in order:
+            try:
+                parsed = getattr(self, name)(value)
+            except (TypeError, ValueError, IndexError):
+                continue
+            if parsed:
+                if name != order[0]:
+                    self._date_formats[feed] = (name,) + tuple(n for n in self.DATE_PARSERS if n != name)
+                return parsed
+        return None
+
+    def format_date(self, value, feed=None):
+        """将日期字符串格式化为 YYYY-MM-DD，无法解析时使用当前日期"""
+        parsed = self.parse_date(value, feed)
+        if parsed:
+            return parsed.isoformat()
+        if value:
+            logger.warning(f"无法解析日期 '{value}'，使用当前日期")
+        else:
+            logger.debug("日期字符串为空，使用当前日期")
+        return datetime.now().strftime("%Y-%m-%d")
+
+    @staticmethod
+    def entry_doi(entry):
+        """从RSS条目中提取DOI"""
+        doi = entry.get("dc_identifier", "").replace("doi:", "") if "dc_identifier" in entry else entry.get("guid", "")
+        url = entry.get("link", "")
+        if not doi and url:
+            for marker in ("doi.org/", "nature.com/articles/"):
+                if marker in url:
+                    doi = url.split(marker, 1)[1]
+                    break
+        return doi
+
+    @staticmethod
+    def _is_author_line(line):
+        """启发式判断是否为作者行（多个逗号且每个词首字母大写）"""
+        words = line.replace(',', '').split()
+        return len(line.split()) > 2 and line.count(',') > 1 and all(word[0].isupper() for word in words)
+
+    def clean_abstract(self, raw_abstract, title, journal_name):
+        """清理HTML和冗余标题"""
+        # 移除HTML标签（纯文本描述直接跳过解析），移除常重复的标题
+        text = html_to_text(raw_abstract).replace(title, "").strip()
+        lines = text.split("\n")
+        # 移除元数据（针对不同期刊的元数据格式）
+        if journal_name == "Nature Scientific Data":
+            # Nature的RSS摘要通常很短或没有，主要依赖网页抓取
+            lines = [line for line in lines if not line.startswith("Scientific Data,")]
+        elif journal_name == "Earth System Science Data":
+            # ESSD的RSS摘要可能包含作者和期刊信息，需要清理
+            lines = [line for line in lines if not ("Earth Syst. Sci. Data" in line or "Preprint under review" in line or line.count(',') > 3)]
+        # 进一步清理可能的作者信息
+        return " ".join(line for line in lines if not self._is_author_line(line)).strip()
+
+    @staticmethod
+    def entry_date_string(entry, journal_name):
+        """按期刊选择条目中的发布日期字段"""
+        if journal_name == "Scientific Data":
+            # 优先 updated/published，其次 dc_date，最后从 dc_source 中提取
+            for value in (entry.get("updated", entry.get("published")), entry.get("dc_date")):
+                if value and ISO_DATE_PREFIX.match(value):
+                    return value
+            match = EMBEDDED_DATE.search(entry.get("dc_source") or "")
+            return match.group(0) if match else ""
+        if journal_name == "Earth System Science Data":
+            return entry.get("pubDate", entry.get("dc_date", entry.get("published", "")))
+        return entry.get("published", entry.get("pubDate", entry.get("dc_date", "")))
+
+    def normalize(self, entry, journal_name, doi=None):
+        """将RSS条目转换为论文数据字典（不访问网络）
+
+        参数:
+            entry: feedparser 条目
+            journal_name: 期刊（RSS源）名称
+            doi: (可选) 已提取的DOI，未提供时从条目中提取
+        """
+        title = entry.get("title", "Unknown")
+        raw_abstract = ""
+        for field in ABSTRACT_FIELDS:
+            raw_abstract = entry.get(field, "")
+            if raw_abstract:
+                break
+
+        pub_date_str = self.entry_date_string(entry, journal_name)
+        logger.debug(f"{journal_name} 条目日期字段: {pub_date_str}")
+        # 兼容标签字段
+        tags = entry.get("category", "").split(",") if "category" in entry else []
+
+        return {
+            "journal": journal_name,
+            "title": title,
+            "abstract": self.clean_abstract(raw_abstract, title, journal_name),
+            "publishDate": self.format_date(pub_date_str, journal_name),
+            "doi": doi if doi is not None else self.entry_doi(entry),
+            "url": entry.get("link", ""),
+            "authors": entry.get("author", "Unknown"),
+            "tags": ",".join(tags)
+        }
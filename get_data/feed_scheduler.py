@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+RSS源自适应轮询调度模块
+
+RSS源从配置文件 feeds.json 和数据库表 feed_sources 加载（文件中的配置会同步到数据库），
+调度器根据每个源观察到的发布频率决定下次轮询时间：
+1. 发布频繁的源轮询间隔短，很少更新的源间隔长
+2. 间隔限制在每个源配置的最小/最大间隔之内
+3. 加入随机抖动，避免大量源集中在同一时刻轮询
+每次爬取只处理到期的源，爬取成本不再随源数量线性增长。
+"""
+
+import os
+import json
+import random
+import logging
+from datetime import datetime, timedelta
+
+# 导入数据库工具类
+try:
+    from .db_helper import DBHelper  # 当作为包导入时
+except ImportError:
+    try:
+        from db_helper import DBHelper  # 当在同一目录下直接运行时
+    except ImportError:
+        DBHelper = None
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 默认RSS源配置文件
+FEEDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feeds.json')
+
+# 发布间隔的指数滑动平均系数（新观测值的权重）
+CADENCE_SMOOTHING = 0.3
+# 轮询间隔相对平均发布间隔的比例（每个发布周期轮询约两次）
+POLL_FACTOR = 0.5
+# 随机抖动幅度
+JITTER = 0.15
+
+
+class FeedScheduler:
+    """按发布频率自适应的RSS源调度器"""
+
+    def __init__(self, feeds_file=FEEDS_FILE, persist=True):
+        """初始化调度器
+
+        参数:
+            feeds_file: RSS源配置文件路径（JSON列表，每项包含 name、rss_url 及可选的间隔配置）
+            persist: 是否将RSS源及调度状态同步到数据库（基准测试等离线场景设为False）
+        """
+        self.feeds_file = feeds_file
+        self.persist = persist and DBHelper is not None
+        self.feeds = self.load_feeds()
+
+    def _load_file(self):
+        """读取配置文件中的RSS源"""
+        if not self.feeds_file or not os.path.exists(self.feeds_file):
+            return []
+        try:
+            with open(self.feeds_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"读取RSS源配置文件失败: {e}")
+            return []
+
+    def load_feeds(self):
+        """加载RSS源：配置文件同步到数据库后，以数据库（含调度状态）为准"""
+        file_feeds = self._load_file()
+        if self.persist:
+            DBHelper.upsert_feed_sources(file_feeds)
+            db_feeds = DBHelper.get_feed_sources()
+            if db_feeds:
+                logger.info(f"从数据库加载了 {len(db_feeds)} 个RSS源")
+                return db_feeds
+        # 数据库不可用时只使用配置文件，调度状态仅保存在内存中
+        feeds = [dict(feed) for feed in file_feeds if feed.get('enabled', True)]
+        logger.info(f"从配置文件加载了 {len(feeds)} 个RSS源")
+        return feeds
+
+    def due_feeds(self, now=None, force=False):
+        """返回当前到期需要轮询的RSS源（force=True 时返回全部）"""
+        now = now or datetime.now()
+        if force:
+            return list(self.feeds)
+        due = [feed for feed in self.feeds if not feed.get('next_poll_at') or feed['next_poll_at'] <= now]
+        logger.info(f"共 {len(self.feeds)} 个RSS源，本次到期 {len(due)} 个")
+        return due
+
+    @staticmethod
+    def observed_gap_hours(publish_dates):
+        """根据RSS中条目的发布日期估算平均发布间隔（小时），条目不足时返回None"""
+        dates = []
+        for value in publish_dates:
+            try:
+                dates.append(datetime.strptime(value[:10], "%Y-%m-%d"))
+            except (TypeError, ValueError):
+                continue
+        if len(dates) < 2:
+            return None
+        # 日期只精确到天，同一天的多篇论文按一天均匀分布计算
+        span_hours = max((max(dates) - min(dates)).total_seconds() / 3600, 24.0)
+        return span_hours / (len(dates) - 1)
+
+    def record_poll(self, feed, publish_dates, new_count, now=None):
+        """记录一次轮询结果并安排下次轮询时间
+
+        参数:
+            feed: RSS源字典（原地更新调度状态）
+            publish_dates: 本次RSS中所有条目的发布日期（YYYY-MM-DD）
+            new_count: 本次发现的新条目数
+        """
+        now = now or datetime.now()
+        observed = self.observed_gap_hours(publish_dates)
+        avg_gap = feed.get('avg_gap_hours')
+        if observed is not None:
+            avg_gap = observed if avg_gap is None else (1 - CADENCE_SMOOTHING) * avg_gap + CADENCE_SMOOTHING * observed
+
+        min_minutes = feed.get('min_interval_minutes') or 60
+        max_minutes = feed.get('max_interval_minutes') or 1440
+        if avg_gap is None:
+            interval = min_minutes
+        else:
+            interval = min(max(avg_gap * 60 * POLL_FACTOR, min_minutes), max_minutes)
+        # 随机抖动，分散各源的轮询时刻（仍限制在最小/最大间隔之内）
+        interval = min(max(interval * random.uniform(1 - JITTER, 1 + JITTER), min_minutes), max_minutes)
+        next_poll_at = now + timedelta(minutes=interval)
+
+        feed['avg_gap_hours'] = avg_gap
+        feed['last_polled_at'] = now
+        feed['next_poll_at'] = next_poll_at
+        feed['last_new_count'] = new_count
+        if self.persist:
+            DBHelper.update_feed_schedule(feed['name'], avg_gap, now, next_poll_at, new_count)
+
+        logger.info(f"{feed['name']} 平均发布间隔 {avg_gap or 0:.1f} 小时，下次轮询: {next_poll_at.strftime('%Y-%m-%d %H:%M')}")
+        return next_poll_at
+
+    def record_failure(self, feed, now=None):
+        """记录一次失败的轮询（RSS下载失败）：不更新发布频率和轮询统计，按最小间隔安排重试
+
+        参数:
+            feed: RSS源字典（原地更新下次轮询时间）
+        """
+        now = now or datetime.now()
+        next_poll_at = now + timedelta(minutes=feed.get('min_interval_minutes') or 60)
+        feed['next_poll_at'] = next_poll_at
+        if self.persist:
+            DBHelper.update_feed_schedule(feed['name'], feed.get('avg_gap_hours'), feed.get('last_polled_at'),
+                                          next_poll_at, feed.get('last_new_count') or 0)
+
+        logger.warning(f"{feed['name']} 轮询失败，下次重试: {next_poll_at.strftime('%Y-%m-%d %H:%M')}")
+        return next_poll_at
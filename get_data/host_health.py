@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+主机健康状态跟踪模块
+
+为摘要获取器提供按主机的熔断与退避：
+1. 连续失败达到阈值后熔断，冷却期内不再请求该主机
+2. 每次失败后按指数退避（带随机抖动）推迟下一次请求
+3. 冷却期结束后放行一次试探请求，成功即恢复，失败则加倍冷却
+"""
+
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+class _HostState:
+    """单个主机的健康状态"""
+
+    __slots__ = ("consecutive_failures", "next_allowed_at", "open_until", "open_count", "successes", "failures")
+
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.next_allowed_at = 0.0
+        self.open_until = 0.0
+        self.open_count = 0
+        self.successes = 0
+        self.failures = 0
+
+
+class HostHealth:
+    """按主机的熔断器与退避计时器（线程安全）"""
+
+    def __init__(self, failure_threshold=3, base_backoff=1.0, max_backoff=60.0, cooldown=300.0, max_cooldown=3600.0):
+        """初始化主机健康跟踪器
+
+        参数:
+            failure_threshold: 连续失败多少次后熔断
+            base_backoff: 首次失败后的退避时间（秒），之后每次翻倍
+            max_backoff: 单次退避的上限（秒）
+            cooldown: 熔断后的冷却时间（秒），再次熔断时翻倍
+            max_cooldown: 冷却时间上限（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        """提取URL的主机名"""
+        return urlparse(url).netloc.lower() if url else ""
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def is_open(self, host):
+        """主机是否处于熔断状态"""
+        with self._lock:
+            state = self._hosts.get(host)
+            return bool(state and time.monotonic() < state.open_until)
+
+    def wait_time(self, host):
+        """距离允许再次请求该主机还需等待的秒数（熔断中返回剩余冷却时间）"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state:
+                return 0.0
+            return max(state.open_until - now, state.next_allowed_at - now, 0.0)
+
+    def record_success(self, host):
+        """记录一次成功请求，重置失败计数"""
+        with self._lock:
+            state = self._state(host)
+            if state.open_count:
+                logger.info(f"主机 {host} 已恢复，关闭熔断")
+            state.consecutive_failures = 0
+            state.next_allowed_at = 0.0
+            state.open_until = 0.0
+            state.open_count = 0
+            state.successes += 1
+
+    def record_failure(self, host, reason=""):
+        """记录一次失败请求，计算退避时间，必要时熔断"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(host)
+            state.consecutive_failures += 1
+            state.failures += 1
+
+            # 指数退避 + 全抖动，避免多个请求同时重试
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** (state.consecutive_failures - 1)))
+            state.next_allowed_at = now + random.uniform(backoff / 2, backoff)
+
+            if state.consecutive_failures >= self.failure_threshold:
+                cooldown = min(self.max_cooldown, self.cooldown * (2 ** state.open_count))
+                state.open_until = now + cooldown
+                state.open_count += 1
+                # 冷却结束后进入半开状态：再失败一次即重新熔断
+                state.consecutive_failures = self.failure_threshold - 1
+                logger.warning(f"主机 {host} 连续失败，熔断 {cooldown:.0f} 秒: {reason}")
+
+    def summary(self):
+        """各主机的请求统计"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "open": now < state.open_until,
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTML摘要提取模块
+
+为摘要获取器和RSS爬虫提供可插拔的HTML解析后端：
+1. selectolax（C实现，最快）
+2. lxml + cssselect（C实现）
+3. BeautifulSoup（纯Python，作为兜底）
+
+各期刊的选择器在首次使用时编译并缓存；提取摘要时优先只解析
+摘要所在的局部区域，找不到时再回退到解析整页。
+页面中的数据仓储链接（数据集DOI、登录号）用一个合并的正则一次扫描提取。
+"""
+
+import re
+import html as html_lib
+import logging
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+# 可选的C加速解析器
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    lxml = None
+    CSSSelector = None
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 各期刊的摘要选择器：按顺序尝试每一组，第一组有结果即返回
+JOURNAL_SELECTORS = {
+    "Nature Scientific Data": [
+        'div#Abs1-content, section[data-title="Abstract"] p',
+        'div.c-article-section__content p',
+    ],
+    "Earth System Science Data": [
+        'div.abstract p, div.abstract-content p',
+    ],
+}
+JOURNAL_SELECTORS["Scientific Data"] = JOURNAL_SELECTORS["Nature Scientific Data"]
+
+# 通用选择器（未知期刊）
+GENERIC_SELECTORS = [
+    'div.abstract p',
+    'div#abstract',
+    'section.abstract',
+    'div[class*="abstract"]',
+    'meta[name="description"]',
+]
+
+# 摘要区域的起始标记（字符串查找），用于只解析页面中的局部片段
+REGION_MARKERS = {
+    "Nature Scientific Data": ['data-title="Abstract"', 'id="Abs1'],
+    "Earth System Science Data": ['class="abstract'],
+}
+REGION_MARKERS["Scientific Data"] = REGION_MARKERS["Nature Scientific Data"]
+
+# 流式下载时识别摘要容器的属性规则：(属性名, 属性值需包含的子串)
+STREAM_MARKERS = {
+    "Nature Scientific Data": [("data-title", "Abstract"), ("id", "Abs1")],
+    "Earth System Science Data": [("class", "abstract")],
+}
+STREAM_MARKERS["Scientific Data"] = STREAM_MARKERS["Nature Scientific Data"]
+
+# 局部解析时截取的最大字符数
+REGION_SIZE = 64 * 1024
+
+# 页面 <head> 中的引用元数据（citation_* / dc.*），用正则直接读取，无需解析整页
+META_TAG_PATTERN = re.compile(r'<meta\s+[^>]*>', re.IGNORECASE)
+META_ATTR_PATTERN = re.compile(r'(name|content)\s*=\s*"([^"]*)"', re.IGNORECASE)
+DATE_PREFIX_PATTERN = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})')
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TAG_PATTERN = re.compile(r'<[a-zA-Z/!]')
+
+# 数据仓储的DOI、URL和登录号规则：(分组名, 仓储名称, 正则)
+# 合并为一个正则对整页HTML只扫描一次，每条规则都以固定字符开头、命名分组放在固定字符之后。
+# 不区分大小写匹配（页面中常见 Zenodo.org、10.5061/DRYAD.xxx、小写登录号等写法）
+DATASET_RULES = [
+    ("zenodo_doi", "Zenodo", r'10\.(?P<zenodo_doi>5281/zenodo\.\d+)'),
+    ("figshare_doi", "figshare", r'10\.(?P<figshare_doi>6084/m9\.figshare\.(?:c\.)?\d+(?:\.v\d+)?)'),
+    ("pangaea_doi", "PANGAEA", r'10\.(?P<pangaea_doi>1594/PANGAEA\.\d+)'),
+    ("dryad_doi", "Dryad", r'10\.(?P<dryad_doi>5061/dryad\.[0-9a-z]+)'),
+    ("mendeley_doi", "Mendeley Data", r'10\.(?P<mendeley_doi>17632/[0-9a-z]{10}(?:\.\d+)?)'),
+    ("dataverse_doi", "Dataverse", r'10\.(?P<dataverse_doi>7910/DVN/[0-9A-Z]{6})'),
+    ("zenodo_url", "Zenodo", r'zenodo\.org/records?/(?P<zenodo_url>\d+)'),
+    ("figshare_url", "figshare", r'figshare\.com/(?P<figshare_url>(?:articles|s|collections)/[\w%/.-]+)'),
+    ("osf_url", "OSF", r'osf\.io/(?P<osf_url>[0-9a-z]{5})(?=[/"\'\s<?#])'),
+    ("geo_acc", "GEO", r'GSE(?P<geo_acc>\d{3,8})\b'),
+    ("bioproject_acc", "BioProject", r'PRJ(?P<bioproject_acc>(?:NA|EB|DB)\d{3,9})\b'),
+    ("sra_acc", "SRA", r'SR(?P<sra_acc>[APR]\d{6,9})\b'),
+]
+DATASET_PATTERN = re.compile("|".join(pattern for _, _, pattern in DATASET_RULES), re.IGNORECASE)
+DATASET_REPOSITORIES = {name: repository for name, repository, _ in DATASET_RULES}
+HOST_PREFIX_PATTERN = re.compile(r'([\w-]+\.)$')
+
+# 登录号对应的访问地址
+ACCESSION_URLS = {
+    "GEO": "https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi?acc={}",
+    "BioProject": "https://www.ncbi.nlm.nih.gov/bioproject/{}",
+    "SRA": "https://www.ncbi.nlm.nih.gov/sra/{}",
+}
+
+
+def available_backends():
+    """返回当前环境可用的解析后端（按速度排序）"""
+    backends = []
+    if SelectolaxParser is not None:
+        backends.append("selectolax")
+    if CSSSelector is not None:
+        backends.append("lxml")
+    backends.append("bs4")
+    return backends
+
+
+def html_to_text(fragment):
+    """将HTML片段转换为纯文本（用于RSS描述字段），纯文本输入直接返回"""
+    if not fragment:
+        return ""
+    if not TAG_PATTERN.search(fragment):
+        return html_lib.unescape(fragment) if "&" in fragment else fragment
+    if lxml is not None:
+        try:
+            return lxml.html.fragment_fromstring(fragment, create_parent="div").text_content()
+        except Exception:
+            pass
+    return BeautifulSoup(fragment, "html.parser").get_text()
+
+
+def extract_citation_metadata(html):
+    """从页面的 citation_* / dc.* meta 标签中提取发布日期和作者
+
+    返回:
+        dict，可能包含 publishDate (YYYY-MM-DD)、authors（逗号分隔）、doi、title
+    """
+    head_end = html.find("</head>")
+    head = html[:head_end] if head_end != -1 else html[:REGION_SIZE]
+
+    metadata = {}
+    authors = []
+    for tag in META_TAG_PATTERN.findall(head):
+        attrs = {k.lower(): v for k, v in META_ATTR_PATTERN.findall(tag)}
+        name = attrs.get("name", "").lower()
+        content = html_lib.unescape(attrs.get("content", "")).strip()
+        if not name or not content:
+            continue
+        if name == "citation_author":
+            authors.append(content)
+        elif name in ("citation_publication_date", "citation_online_date", "dc.date", "citation_date"):
+            match = DATE_PREFIX_PATTERN.search(content)
+            if match and "publishDate" not in metadata:
+                metadata["publishDate"] = "-".join(match.groups())
+        elif name in ("citation_doi", "dc.identifier") and "doi" not in metadata:
+            metadata["doi"] = content.replace("doi:", "").strip()
+        elif name == "citation_title" and "title" not in metadata:
+            metadata["title"] = content
+    if authors:
+        metadata["authors"] = ", ".join(authors)
+    return metadata
+
+
+def extract_dataset_links(html):
+    """从页面中提取数据仓储链接和登录号（Zenodo、figshare、PANGAEA、Dryad、GEO 等）
+
+    返回:
+        list，每项为 {"repository", "identifier", "url"}，按首次出现的顺序去重
+    """
+    datasets = {}
+    for match in DATASET_PATTERN.finditer(html):
+        kind = match.lastgroup
+        repository = DATASET_REPOSITORIES[kind]
+        start = match.start()
+        value = match.group(0).rstrip(".,;)/")
+        if kind == "zenodo_url":
+            # Zenodo 记录号与DOI一一对应，统一为DOI以便去重
+            kind, value = "zenodo_doi", f"10.5281/zenodo.{match.group('zenodo_url')}"
+        if kind.endswith("_doi"):
+            identifier = value
+            url = f"https://doi.org/{identifier}"
+        elif kind.endswith("_acc"):
+            # 登录号前面不能紧跟字母或数字（避免匹配到更长单词的一部分）
+            if start > 0 and html[start - 1].isalnum():
+                continue
+            # 登录号统一为大写（GSE12345、PRJNA12345）
+            identifier = value.upper()
+            url = ACCESSION_URLS[repository].format(identifier)
+        else:
+            if kind == "figshare_url":
+                # 补全 figshare 的机构子域名（如 springernature.figshare.com）
+                host = HOST_PREFIX_PATTERN.search(html, max(0, start - 64), start)
+                if host:
+                    value = host.group(1) + value
+            identifier = value.split("?")[0].split("#")[0]
+            url = f"https://{identifier}"
+        datasets.setdefault(url.lower(), {"repository": repository, "identifier": identifier, "url": url})
+    return list(datasets.values())
+
+
+def clean_abstract_text(abstract):
+    """统一清理提取出的摘要文本"""
+    if not abstract:
+        return ""
+    # 移除多余空白
+    abstract = WHITESPACE_PATTERN.sub(' ', abstract)
+    # 移除特殊标记
+    return abstract.replace("Abstract", "").strip()
+
+
+class AbstractSectionDetector(HTMLParser):
+    """增量HTML解析器：检测摘要容器何时结束
+
+    分块喂入页面文本，遇到期刊对应的摘要容器起始标签后跟踪同名标签的
+    嵌套深度，容器闭合时将 closed 置为 True，调用方即可停止读取连接。
+    """
+
+    def __init__(self, journal):
+        super().__init__(convert_charrefs=False)
+        self.markers = STREAM_MARKERS.get(journal, [])
+        self.region_tag = None
+        self.depth = 0
+        self.closed = False
+
+    @property
+    def supported(self):
+        """当前期刊是否有可用的摘要容器规则"""
+        return bool(self.markers)
+
+    def _is_marker(self, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            for marker_name, marker_value in self.markers:
+                if name == marker_name and marker_value in value:
+                    return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if self.closed:
+            return
+        if self.region_tag is None:
+            if self._is_marker(attrs):
+                self.region_tag = tag
+                self.depth = 1
+        elif tag == self.region_tag:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.closed or self.region_tag is None:
+            return
+        if tag == self.region_tag:
+            self.depth -= 1
+            if self.depth <= 0:
+                self.closed = True
+
+
+class AbstractExtractor:
+    """按期刊选择器提取摘要的解析器"""
+
+    def __init__(self, backend="auto", region_only=True):
+        """初始化提取器
+
+        参数:
+            backend: 解析后端，可选 auto/selectolax/lxml/bs4
+            region_only: 是否优先只解析摘要所在的局部区域
+        """
+        backends = available_backends()
+        if backend == "auto":
+            backend = backends[0]
+        elif backend not in backends:
+            logger.warning(f"解析后端 {backend} 不可用，改用 {backends[0]}")
+            backend = backends[0]
+        self.backend = backend
+        self.region_only = region_only
+        self._compiled = {}
+        logger.info(f"摘要提取使用解析后端: {self.backend}")
+
+    def _compile(self, selector):
+        """编译选择器（每个选择器只编译一次）"""
+        compiled = self._compiled.get(selector)
+        if compiled is None:
+            if self.backend == "lxml":
+                compiled = CSSSelector(selector, translator="html")
+            elif self.backend == "bs4":
+                compiled = soupsieve.compile(selector)
+            else:
+                # selectolax 直接使用选择器字符串
+                compiled = selector
+            self._compiled[selector] = compiled
+        return compiled
+
+    def _parse(self, html):
+        """用当前后端解析HTML，返回文档树"""
+        if self.backend == "selectolax":
+            return SelectolaxParser(html)
+        if self.backend == "lxml":
+            try:
+                return lxml.html.document_fromstring(html)
+            except ValueError:
+                # 含编码声明的字符串需以字节形式解析
+                return lxml.html.document_fromstring(html.encode("utf-8"))
+        parser = "lxml" if lxml is not None else "html.parser"
+        return BeautifulSoup(html, parser)
+
+    def _select(self, tree, selector):
+        """执行选择器，返回 (文本列表, meta content)"""
+        compiled = self._compile(selector)
+        if self.backend == "selectolax":
+            nodes = tree.css(compiled)
+            if nodes and selector.startswith("meta"):
+                return None, nodes[0].attributes.get("content") or ""
+            return [node.text(deep=True).strip() for node in nodes], None
+        if self.backend == "lxml":
+            nodes = compiled(tree)
+            if nodes and selector.startswith("meta"):
+                return None, nodes[0].get("content", "")
+            return [node.text_content().strip() for node in nodes], None
+        nodes = compiled.select(tree)
+        if nodes and selector.startswith("meta"):
+            return None, nodes[0].get("content", "")
+        return [node.get_text().strip() for node in nodes], None
+
+    def _extract_from(self, html, selectors):
+        """在HTML中按顺序尝试选择器组"""
+        if not html:
+            return ""
+        try:
+            tree = self._parse(html)
+        except Exception as e:
+            logger.warning(f"HTML解析失败 ({self.backend}): {e}")
+            return ""
+        for selector in selectors:
+            texts, meta_content = self._select(tree, selector)
+            if meta_content is not None:
+                return meta_content
+            if texts:
+                # 嵌套元素同时命中时会产生重复文本，按顺序去重
+                return "\n".join(dict.fromkeys(text for text in texts if text))
+        return ""
+
+    def _region(self, html, journal):
+        """定位摘要所在的局部片段，找不到标记时返回None"""
+        for marker in REGION_MARKERS.get(journal, []):
+            pos = html.find(marker)
+            if pos != -1:
+                # 回退到标记所在标签的起始位置
+                start = html.rfind("<", 0, pos)
+                start = start if start != -1 else pos
+                return html[start:start + REGION_SIZE]
+        return None
+
+    def extract(self, html, journal):
+        """从页面HTML中提取并清理摘要文本"""
+        selectors = JOURNAL_SELECTORS.get(journal, GENERIC_SELECTORS)
+
+        abstract = ""
+        if self.region_only:
+            region = self._region(html, journal)
+            if region:
+                abstract = self._extract_from(region, selectors)
+        if not abstract:
+            abstract = self._extract_from(html, selectors)
+        return clean_abstract_text(abstract)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LLM调用结果缓存模块
+
+在 NLPProcessor.call_ai_api 之前按内容哈希缓存模型的原始回复：
+1. 键为 hash(任务, 提示词模板版本, 模型, 输入文本)，相同输入不会重复付费
+2. 修改某个任务的提示词模板时提升其版本号，旧条目自然失效（不再被命中，随淘汰清除）
+3. 条目数超过上限时按最近访问时间淘汰
+4. 记录命中/未命中次数，便于评估缓存效果
+缓存保存在本地 SQLite 文件中，中断后重新运行、全量更新和字段补全都能复用。
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 缓存根目录（与页面缓存相同）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# 默认最多保存的条目数
+DEFAULT_MAX_ENTRIES = 200000
+
+
+class LLMCache:
+    """按内容哈希寻址的LLM回复缓存（线程安全）"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """初始化缓存
+
+        参数:
+            path: SQLite 文件路径，默认为 cache/llm_cache.sqlite
+            max_entries: 最多保存的条目数，超出时按最近访问时间淘汰
+        """
+        self.path = path or os.path.join(CACHE_DIR, 'llm_cache.sqlite')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                task TEXT,
+                model TEXT,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(task, version, model, text):
+        """缓存键：任务、模板版本、模型与输入文本的 SHA-256"""
+        payload = json.dumps([task, version, model, text], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key):
+        """读取缓存的回复，未命中时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM llm_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, cache_key, content, task=None, model=None):
+        """写入一条回复"""
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (cache_key, task, model, content, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache_key, task, model, content, now, now)
+                )
+                self._evict()
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"写入LLM缓存失败: {e}")
+
+    def _evict(self):
+        """条目数超出上限时，删除最久未访问的条目（额外多删10%，避免每次写入都触发淘汰）"""
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries + self.max_entries // 10
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE cache_key IN (SELECT cache_key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+            (excess,)
+        )
+        logger.info(f"LLM缓存超出上限，已淘汰 {excess} 条记录")
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": entries,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
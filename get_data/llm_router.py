@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LLM多端点路由模块
+
+把 chat.completions 请求分发到多个 OpenAI 兼容端点（可以是不同的服务商、模型或本地模拟端点）：
+1. 按权重随机选择端点，近期错误率高或正在限流冷却的端点降低权重或暂时跳过
+2. 对冲请求：请求耗时超过该端点同类请求的延迟分位数（默认P95）仍未返回时，
+   向另一个端点（只有一个端点时向同一端点）再发一份相同的请求，先返回的结果生效
+3. 故障切换：请求出错或返回429时立即改用其他端点，所有端点都失败时才向调用方抛出异常
+4. 按端点统计请求数、错误率、限流次数、对冲次数和延迟分位数
+
+端点配置来自环境变量 NLP_ENDPOINTS（JSON字符串或JSON文件路径），例如：
+[{"name": "deepseek", "base_url": "https://api.deepseek.com", "model": "deepseek-chat", "api_key_env": "DEEPSEEK_API_KEY", "weight": 3},
+ {"name": "mock", "base_url": "http://127.0.0.1:8800/v1", "model": "mock", "api_key": "mock", "weight": 1}]
+未设置时只使用 DeepSeek 官方端点。
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from openai import OpenAI
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 对冲请求的延迟分位数（0表示不发送对冲请求）
+NLP_HEDGE_PERCENTILE = float(os.environ.get("NLP_HEDGE_PERCENTILE", 95))
+# 计算分位数所需的最少样本数，样本不足时不对冲
+HEDGE_MIN_SAMPLES = 20
+# 每个端点、每类请求保留的最近延迟样本数
+LATENCY_WINDOW = 200
+# 计算近期错误率的最近请求数
+ERROR_WINDOW = 50
+# 429 响应未给出 Retry-After 时的冷却时间（秒）
+THROTTLE_COOLDOWN = 5.0
+# 单次请求的默认超时时间（秒）
+DEFAULT_TIMEOUT = 120.0
+
+
+def percentile(values, p):
+    """values 的第 p 百分位数（最近秩法），values 为空时返回None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Endpoint:
+    """一个 OpenAI 兼容端点及其统计信息（线程安全）"""
+
+    def __init__(self, name, base_url, model, api_key, weight=1.0, timeout=DEFAULT_TIMEOUT):
+        """
+        参数:
+            name: 端点名称（用于日志和统计）
+            base_url: API地址
+            model: 该端点使用的模型名称
+            api_key: API密钥
+            weight: 路由权重
+            timeout: 单次请求的超时时间（秒）
+        """
+        self.name = name
+        self.model = model
+        self.weight = float(weight)
+        # 重试由路由器的故障切换和调用方负责，客户端自身不再重试
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self._latencies = {}  # 请求类型 -> 最近的延迟样本
+        self._outcomes = deque(maxlen=ERROR_WINDOW)  # 最近请求是否出错
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.hedges = 0  # 作为对冲请求发出的次数
+        self.hedge_wins = 0  # 对冲请求先于原请求返回的次数
+
+    def create(self, messages, kind, **options):
+        """发送一次请求并记录延迟与结果"""
+        started = time.monotonic()
+        with self._lock:
+            self.requests += 1
+        try:
+            response = self.client.chat.completions.create(model=self.model, messages=messages, stream=False, **options)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._outcomes.append(True)
+                if getattr(e, "status_code", None) == 429:
+                    self.throttled += 1
+                    self._cooldown_until = time.monotonic() + self._retry_after(e)
+            raise
+        with self._lock:
+            self._outcomes.append(False)
+            self._latencies.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _retry_after(error):
+        """429 响应的 Retry-After（秒），没有时使用默认冷却时间"""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after", THROTTLE_COOLDOWN))
+        except (TypeError, ValueError):
+            return THROTTLE_COOLDOWN
+
+    def available(self):
+        """是否不在限流冷却中"""
+        return time.monotonic() >= self._cooldown_until
+
+    def effective_weight(self):
+        """按近期错误率降低的权重（最低保留原权重的10%，端点恢复后可重新获得流量）"""
+        with self._lock:
+            error_rate = sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+        return self.weight * max(0.1, 1.0 - error_rate)
+
+    def hedge_delay(self, kind, p):
+        """该类请求的延迟第 p 百分位数，样本不足时返回None（不对冲）"""
+        with self._lock:
+            samples = list(self._latencies.get(kind, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(samples, p)
+
+    def stats(self):
+        """端点统计"""
+        with self._lock:
+            samples = [value for values in self._latencies.values() for value in values]
+            return {
+                "model": self.model,
+                "requests": self.requests,
+                "errors": self.errors,
+                "error_rate": round(self.errors / self.requests, 3) if self.requests else 0.0,
+                "throttled": self.throttled,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "p50": round(percentile(samples, 50), 3) if samples else None,
+                "p95": round(percentile(samples, 95), 3) if samples else None,
+                "p99": round(percentile(samples, 99), 3) if samples else None,
+            }
+
+
+class LLMRouter:
+    """多端点路由器：加权选择、对冲请求与故障切换"""
+
+    def __init__(self, endpoints, hedge_percentile=NLP_HEDGE_PERCENTILE, max_workers=32):
+        """
+        参数:
+            endpoints: Endpoint 列表
+            hedge_percentile: 对冲请求的延迟分位数（0表示不对冲）
+            max_workers: 发送请求的线程数（应不少于调用方并发数的2倍，对冲请求需要额外线程）
+        """
+        self.endpoints = list(endpoints)
+        self.hedge_percentile = hedge_percentile
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @classmethod
+    def from_env(cls, default_model, **kwargs):
+        """按 NLP_ENDPOINTS 创建路由器，未设置时只使用 DeepSeek 官方端点（缺少API密钥的端点被跳过）"""
+        config = os.environ.get("NLP_ENDPOINTS", "").strip()
+        if not config:
+            specs = [{"name": "deepseek", "base_url": "https://api.deepseek.com",
+                      "model": default_model, "api_key_env": "DEEPSEEK_API_KEY"}]
+        else:
+            try:
+                if os.path.isfile(config):
+                    with open(config, 'r', encoding='utf-8') as f:
+                        specs = json.load(f)
+                else:
+                    specs = json.loads(config)
+            except ValueError as e:
+                logger.error(f"NLP_ENDPOINTS 配置无效: {e}")
+                specs = []
+
+        endpoints = []
+        for spec in specs:
+            name = spec.get("name") or spec.get("base_url")
+            api_key = spec.get("api_key") or os.environ.get(spec.get("api_key_env", "DEEPSEEK_API_KEY"))
+            if not api_key:
+                logger.error(f"未找到环境变量 {spec.get('api_key_env', 'DEEPSEEK_API_KEY')}，跳过端点 {name}")
+                continue
+            try:
+                endpoints.append(Endpoint(name, spec["base_url"], spec.get("model", default_model), api_key,
+                                          weight=spec.get("weight", 1.0), timeout=spec.get("timeout", DEFAULT_TIMEOUT)))
+            except Exception as e:
+                logger.error(f"初始化LLM端点 {name} 失败: {e}")
+        if len(endpoints) > 1:
+            logger.info(f"LLM路由端点: {', '.join(f'{e.name}({e.model}, 权重{e.weight:g})' for e in endpoints)}")
+        return cls(endpoints, **kwargs)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    @property
+    def models(self):
+        """各端点使用的模型（去重，保持顺序）"""
+        return list(dict.fromkeys(endpoint.model for endpoint in self.endpoints))
+
+    def choose(self, exclude=()):
+        """按有效权重随机选择一个端点；限流冷却中的端点只在没有其他选择时使用"""
+        candidates = [e for e in self.endpoints if e not in exclude and e.available()]
+        if not candidates:
+            candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[e.effective_weight() for e in candidates])[0]
+
+    def complete(self, messages, kind="default", rate_limiter=None, estimated_tokens=0, **options):
+        """发送 chat.completions 请求，返回 (响应, 返回该响应的端点)
+
+        参数:
+            messages: 消息列表
+            kind: 请求类型（如任务名），不同类型的请求分别统计延迟分位数
+            rate_limiter: (可选) 共享的限流器。首个请求的额度由调用方获取；故障切换的请求
+                等待额度后再发送，对冲请求只在额度充足时发送（不足时放弃对冲，继续等待原请求）。
+                返回的响应由调用方按实际用量修正额度，其余请求由路由器修正：失败的请求归还
+                预留的token额度，被丢弃的响应（对冲中落败的一方）按实际用量修正
+            estimated_tokens: 每个请求预估的token数（用于限流器的token桶）
+            options: 传给 chat.completions.create 的其他参数
+
+        异常:
+            所有端点都失败时抛出最后一个异常
+        """
+        if not self.endpoints:
+            raise RuntimeError("没有可用的LLM端点")
+        tried = []
+        pending = {}
+        hedged = False
+        last_error = None
+
+        def settle(future):
+            if rate_limiter is None:
+                return
+            try:
+                response = future.result()
+            except Exception:
+                rate_limiter.release(estimated_tokens)
+                return
+            usage = getattr(response, "usage", None)
+            rate_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", 0) or 0)
+
+        def submit(endpoint, hedge=False):
+            tried.append(endpoint)
+            if hedge:
+                with endpoint._lock:
+                    endpoint.hedges += 1
+            future = self._executor.submit(endpoint.create, messages, kind, **options)
+            pending[future] = (endpoint, hedge)
+
+        primary = self.choose()
+        submit(primary)
+        started = time.monotonic()
+        while pending:
+            timeout = None
+            if not hedged and self.hedge_percentile and len(pending) == 1:
+                delay = primary.hedge_delay(kind, self.hedge_percentile)
+                if delay is not None:
+                    timeout = max(0.0, delay - (time.monotonic() - started))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 超过延迟分位数仍未返回：向另一个端点（没有时向同一端点）发送对冲请求
+                hedged = True
+                if rate_limiter is not None and not rate_limiter.try_acquire(estimated_tokens):
+                    logger.debug(f"限流额度不足，{primary.name} 的慢请求不发送对冲请求")
+                    continue
+                endpoint = self.choose(exclude=tried) or primary
+                logger.debug(f"{primary.name} 请求超过P{self.hedge_percentile:g}延迟，向 {endpoint.name} 发送对冲请求")
+                submit(endpoint, hedge=True)
+                continue
+            for future in done:
+                endpoint, hedge = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"LLM端点 {endpoint.name} 请求失败: {e}")
+                    settle(future)
+                    continue
+                if hedge:
+                    with endpoint._lock:
+                        endpoint.hedge_wins += 1
+                # 另一份请求继续在后台完成（只计入统计和限流额度），结果丢弃
+                for other in pending:
+                    other.add_done_callback(settle)
+                return response, endpoint
+            if not pending:
+                # 出错或限流时切换到尚未尝试的端点
+                endpoint = self.choose(exclude=tried)
+                if endpoint is None:
+                    break
+                logger.info(f"切换到LLM端点 {endpoint.name}")
+                if rate_limiter is not None:
+                    rate_limiter.acquire(estimated_tokens)
+                primary, hedged, started = endpoint, False, time.monotonic()
+                submit(endpoint)
+        raise last_error
+
+    def summary(self):
+        """各端点的统计"""
+        return {endpoint.name: endpoint.stats() for endpoint in self.endpoints}
+
+    def close(self):
+        """关闭请求线程池（不等待后台的对冲请求）"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟LLM端点
+
+提供 OpenAI 兼容的 /v1/chat/completions 接口，不调用真实模型，用于测试多端点路由、
+对冲请求和故障切换（可作为 NLP_ENDPOINTS 中的一个路由）：
+1. 按提示词生成格式正确的回复：单项任务返回文本，分类任务返回预定义分类之一，
+   合并任务返回包含所需字段的JSON，批量任务按输入的DOI返回结果数组
+2. 响应延迟可配置，并可按比例注入长尾延迟、500错误和429限流
+3. 返回 usage（按字符数估算的token数）
+
+使用方法:
+python -m get_data.mock_llm --port 8800 --latency 0.3 --slow-rate 0.05 --slow-latency 5
+然后在 NLP_ENDPOINTS 中加入 {"name": "mock", "base_url": "http://127.0.0.1:8800/v1", "api_key": "mock", "model": "mock"}
+"""
+
+import re
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from .token_budget import estimate_tokens
+except ImportError:
+    from token_budget import estimate_tokens
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 提示词中的字段要求行（"- titleCn: ..."）、预定义分类列表、批量任务中的DOI
+FIELD_LINE = re.compile(r'^- (titleCn|interpretationCn|tags|Subject): ', re.MULTILINE)
+SUBJECT_LIST = re.compile(r'分类[^\[]*\[([^\]]+)\]')
+DOI_LINE = re.compile(r'^DOI: (.+)$', re.MULTILINE)
+
+# 各字段的模拟值（Subject 取提示词中预定义分类的第一个）
+MOCK_VALUES = {
+    "titleCn": "模拟的中文标题",
+    "interpretationCn": "模拟的中文解读：该数据集提供了可用于相关研究的长期观测数据。",
+    "tags": "模拟标签,数据集,观测",
+}
+
+
+def mock_reply(prompt, json_mode=False):
+    """按提示词生成模拟回复"""
+    subjects = SUBJECT_LIST.search(prompt)
+    subject = subjects.group(1).split(",")[0].strip() if subjects else "其他"
+    if not json_mode:
+        return subject if "预定义的分类" in prompt else MOCK_VALUES["interpretationCn"]
+
+    values = dict(MOCK_VALUES, Subject=subject)
+    fields = {field: values[field] for field in FIELD_LINE.findall(prompt)}
+    dois = DOI_LINE.findall(prompt)
+    if dois:
+        return json.dumps({"papers": [dict(fields, doi=doi.strip()) for doi in dois]}, ensure_ascii=False)
+    return json.dumps(fields, ensure_ascii=False)
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 chat.completions 接口"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"未知路径: {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        roll = random.random()
+        if roll < server.throttle_rate:
+            self._send(429, {"error": {"message": "模拟限流", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+            return
+        if roll < server.throttle_rate + server.error_rate:
+            self._send(500, {"error": {"message": "模拟服务端错误"}})
+            return
+
+        slow = random.random() < server.slow_rate
+        time.sleep(server.slow_latency if slow else max(0.0, random.gauss(server.latency, server.latency / 5)))
+
+        messages = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        content = mock_reply(prompt, json_mode)
+        prompt_tokens = sum(estimate_tokens(message.get("content", "")) for message in messages)
+        completion_tokens = estimate_tokens(content)
+        self._send(200, {
+            "id": f"mock-{random.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 对冲请求的另一方已返回，客户端提前关闭连接
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockLLMServer:
+    """本地模拟LLM服务器（在后台线程中运行）"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, slow_rate=0.0, slow_latency=5.0,
+                 error_rate=0.0, throttle_rate=0.0):
+        """
+        参数:
+            host: 监听地址
+            port: 监听端口，0 表示自动选择
+            latency: 正常响应的平均延迟（秒）
+            slow_rate: 长尾响应的比例
+            slow_latency: 长尾响应的延迟（秒）
+            error_rate: 返回500错误的比例
+            throttle_rate: 返回429限流的比例
+        """
+        self.host = host
+        self.port = port
+        self.options = dict(latency=latency, slow_rate=slow_rate, slow_latency=slow_latency,
+                            error_rate=error_rate, throttle_rate=throttle_rate)
+        self.base_url = None
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _MockHandler)
+        self._server.daemon_threads = True
+        for name, value in self.options.items():
+            setattr(self._server, name, value)
+        self.port = self._server.server_address[1]
+        self.base_url = f"http://{self.host}:{self.port}/v1"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info(f"模拟LLM端点已启动: {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地模拟LLM端点（OpenAI 兼容接口）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8800, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.2, help="正常响应的平均延迟（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="长尾响应的比例")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="长尾响应的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500错误的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回429限流的比例")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, latency=args.latency, slow_rate=args.slow_rate,
+                           slow_latency=args.slow_latency, error_rate=args.error_rate,
+                           throttle_rate=args.throttle_rate).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+论文页面磁盘缓存模块
+
+将抓取到的论文网页以压缩形式保存在本地，供摘要获取器优先读取。
+正文按内容哈希存储（相同内容只保存一份），索引按最终URL记录
+状态码、响应头、抓取时间等元数据，并按总大小进行LRU淘汰。
+选择器调整后可基于缓存重新解析全部页面，无需再次访问网络。
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 缓存根目录
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# 默认缓存上限：512MB（按压缩后大小计算）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 流式下载提前结束（页面不完整）时抓取器在响应头中加入的标记
+TRUNCATED_HEADER = 'X-Page-Cache-Truncated'
+
+CachedPage = namedtuple(
+    "CachedPage",
+    ["url", "final_url", "doi", "status", "headers", "encoding", "fetched_at", "content_hash", "content"]
+)
+
+
+class PageCache:
+    """内容寻址的论文页面缓存"""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """初始化页面缓存
+
+        参数:
+            cache_dir: 缓存目录，默认为 cache/pages
+            max_bytes: 压缩后正文的总大小上限，超出时按最近访问时间淘汰
+        """
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'pages')
+        self.objects_dir = os.path.join(self.cache_dir, 'objects')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                final_url TEXT PRIMARY KEY,
+                request_url TEXT,
+                doi TEXT,
+                status INTEGER,
+                headers TEXT,
+                encoding TEXT,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_request_url ON pages (request_url)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_doi ON pages (doi)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages (content_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages (last_access)")
+        self._conn.commit()
+
+    def _object_path(self, content_hash):
+        """正文对象的存储路径（按哈希前两位分目录）"""
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.z")
+
+    def _read_object(self, content_hash):
+        """读取并解压正文对象"""
+        try:
+            with open(self._object_path(content_hash), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            logger.warning(f"读取缓存页面失败 ({content_hash[:12]}): {e}")
+            return None
+
+    def _row_to_page(self, row, content):
+        final_url, request_url, doi, status, headers, encoding, content_hash, _size, fetched_at, _last_access = row
+        return CachedPage(
+            url=request_url,
+            final_url=final_url,
+            doi=doi,
+            status=status,
+            headers=json.loads(headers) if headers else {},
+            encoding=encoding,
+            fetched_at=fetched_at,
+            content_hash=content_hash,
+            content=content
+        )
+
+    @staticmethod
+    def _is_truncated(row):
+        """索引记录是否为不完整的页面（旧版本写入的截断页面）"""
+        return bool(row[4]) and bool(json.loads(row[4]).get(TRUNCATED_HEADER))
+
+    def get(self, url=None, doi=None):
+        """按URL（原始或最终URL）或DOI查找缓存页面，未命中或页面不完整时返回None"""
+        with self._lock:
+            row = None
+            if url:
+                row = self._conn.execute(
+                    "SELECT * FROM pages WHERE final_url = ? OR request_url = ? ORDER BY fetched_at DESC LIMIT 1",
+                    (url, url)
+                ).fetchone()
+            if row is None and doi:
+                row = self._conn.execute(
+                    "SELECT * FROM pages WHERE doi = ? ORDER BY fetched_at DESC LIMIT 1",
+                    (doi.lower(),)
+                ).fetchone()
+            if row is None or self._is_truncated(row):
+                return None
+
+            content = self._read_object(row[6])
+            if content is None:
+                # 正文文件丢失，删除失效的索引记录
+                self._conn.execute("DELETE FROM pages WHERE final_url = ?", (row[0],))
+                self._conn.commit()
+                return None
+
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE final_url = ?", (time.time(), row[0]))
+            self._conn.commit()
+            return self._row_to_page(row, content)
+
+    def put(self, url, final_url, content, status=200, headers=None, encoding=None, doi=None):
+        """写入页面缓存
+
+        参数:
+            url: 请求时使用的URL
+            final_url: 重定向后的最终URL（索引主键）
+            content: 页面原始字节
+            status: HTTP状态码
+            headers: 响应头字典
+            encoding: 文本编码
+            doi: (可选) 论文DOI
+
+        返回:
+            str: 正文的内容哈希；不写入时返回None
+        """
+        if content is None:
+            return None
+        if headers and headers.get(TRUNCATED_HEADER):
+            # 不完整的页面不进入共享缓存，否则后续的完整抓取、重新解析和数据集提取都会读到截断的正文
+            logger.debug(f"页面不完整，不写入缓存: {final_url}")
+            return None
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._object_path(content_hash)
+        now = time.time()
+
+        with self._lock:
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(zlib.compress(content, 6))
+                    os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+
+                old = self._conn.execute("SELECT content_hash FROM pages WHERE final_url = ?", (final_url,)).fetchone()
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO pages (
+                        final_url, request_url, doi, status, headers, encoding,
+                        content_hash, size, fetched_at, last_access
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    final_url,
+                    url,
+                    doi.lower() if doi else None,
+                    status,
+                    json.dumps(dict(headers or {}), ensure_ascii=False),
+                    encoding,
+                    content_hash,
+                    size,
+                    now,
+                    now
+                ))
+                self._conn.commit()
+                if old and old[0] != content_hash:
+                    self._remove_orphan(old[0])
+                self._evict(keep=final_url)
+            except Exception as e:
+                logger.error(f"写入页面缓存失败: {final_url}, 错误: {e}")
+                return None
+        return content_hash
+
+    def _remove_orphan(self, content_hash):
+        """删除不再被任何索引引用的正文对象"""
+        still_used = self._conn.execute(
+            "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone()
+        if not still_used:
+            try:
+                os.remove(self._object_path(content_hash))
+            except OSError:
+                pass
+
+    def _evict(self, keep=None):
+        """按最近访问时间淘汰，直到总大小不超过上限（刚写入的记录 keep 不参与淘汰）"""
+        total = self.total_bytes(_locked=True)
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute(
+            "SELECT final_url, content_hash FROM pages ORDER BY last_access ASC"
+        ).fetchall()
+        for final_url, content_hash in rows:
+            if total <= self.max_bytes:
+                break
+            if final_url == keep:
+                continue
+            self._conn.execute("DELETE FROM pages WHERE final_url = ?", (final_url,))
+            # 同一正文可能被多个URL引用，只有最后一个引用删除后才释放空间
+            still_used = self._conn.execute(
+                "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            if not still_used:
+                path = self._object_path(content_hash)
+                try:
+                    total -= os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+            evicted += 1
+        self._conn.commit()
+        logger.info(f"页面缓存超出上限，已淘汰 {evicted} 条记录")
+
+    def total_bytes(self, _locked=False):
+        """缓存正文的总大小（每个内容哈希只计算一次）"""
+        query = "SELECT COALESCE(SUM(size), 0) FROM (SELECT content_hash, MAX(size) AS size FROM pages GROUP BY content_hash)"
+        if _locked:
+            return self._conn.execute(query).fetchone()[0]
+        with self._lock:
+            return self._conn.execute(query).fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def iter_pages(self):
+        """遍历所有缓存页面（不更新访问时间），用于离线重新解析"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM pages ORDER BY fetched_at ASC").fetchall()
+        for row in rows:
+            if self._is_truncated(row):
+                continue
+            content = self._read_object(row[6])
+            if content is not None:
+                yield self._row_to_page(row, content)
+
+    def close(self):
+        """关闭索引数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -14,12 +14,16 @@ NLP处理模块
 """
 
 import os
+import json
+import argparse
 import logging
 from dotenv import load_dotenv
-from openai import OpenAI
 from tqdm import tqdm
 import time
 import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # 加载 .env 文件中的环境变量
@@ -35,6 +39,19 @@ except ImportError:
         print("错误：无法导入数据库工具类，请确保 db_helper.py 文件存在")
         DBHelper = None
 
+try:
+    from .rate_limiter import RateLimiter
+    from .llm_cache import LLMCache
+    from .subject_classifier import SubjectClassifier
+    from .token_budget import TokenLedger, estimate_tokens, load_budgets, truncate_text
+    from .llm_router import LLMRouter
+except ImportError:
+    from rate_limiter import RateLimiter
+    from llm_cache import LLMCache
+    from subject_classifier import SubjectClassifier
+    from token_budget import TokenLedger, estimate_tokens, load_budgets, truncate_text
+    from llm_router import LLMRouter
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO, 
@@ -68,41 +85,240 @@ PREDEFINED_SUBJECTS = [
     "其他"  # 添加一个"其他"类别以防万一
 ]
 
+# 使用的模型
+DEEPSEEK_MODEL = "deepseek-chat"
+
+# 各任务提示词模板的版本号：修改模板时加1，LLM缓存中的旧结果随之失效
+PROMPT_VERSIONS = {
+    "translate": 1,
+    "interpret": 1,
+    "generate_tags": 1,
+    "classify": 1,
+    "combined": 1,
+    "batch": 1,
+}
+# 是否启用LLM结果缓存（设为0时禁用）
+NLP_CACHE = os.environ.get("NLP_CACHE", "1") != "0"
+
+# 是否先用本地学科分类器分类（模型由 subject_classifier train 生成，设为0时禁用）
+NLP_LOCAL_CLASSIFIER = os.environ.get("NLP_LOCAL_CLASSIFIER", "1") != "0"
+# 本地分类的置信度阈值，不设置时使用训练时校准的阈值
+NLP_CLASSIFIER_THRESHOLD = os.environ.get("NLP_CLASSIFIER_THRESHOLD")
+
+# 并发处理的论文数（同时进行的API调用数）
+NLP_CONCURRENCY = int(os.environ.get("NLP_CONCURRENCY", 8))
+# DeepSeek API 每分钟请求数和token数上限（token数为0表示不限制）
+DEEPSEEK_RPM = int(os.environ.get("DEEPSEEK_RPM", 300))
+DEEPSEEK_TPM = int(os.environ.get("DEEPSEEK_TPM", 0))
+# 预估token数时每个任务预留的输出token数
+COMPLETION_TOKEN_ESTIMATE = 200
+# 是否用一次合并请求（JSON输出）生成全部字段，设为0时每个字段单独请求
+NLP_COMBINED = os.environ.get("NLP_COMBINED", "1") != "0"
+
+# 批量模式：每个请求最多包含的论文数、预估的输入+输出token预算
+NLP_BATCH_SIZE = int(os.environ.get("NLP_BATCH_SIZE", 10))
+NLP_BATCH_TOKENS = int(os.environ.get("NLP_BATCH_TOKENS", 12000))
+# 待处理论文达到该数量时自动使用批量模式
+NLP_BATCH_THRESHOLD = int(os.environ.get("NLP_BATCH_THRESHOLD", 30))
+# 批量请求中每篇论文预估的输出token数，以及单次请求的输出上限
+BATCH_COMPLETION_TOKENS_PER_PAPER = 300
+BATCH_MAX_COMPLETION_TOKENS = 8192
+# 批量结果中遗漏的论文重新排队的轮数，之后逐篇处理
+BATCH_REQUEUE_ROUNDS = 1
+
+# 字段补全每批读取的论文数
+REPAIR_BATCH_SIZE = 200
+
+# 工作进程每次领取的论文数、租约时长（秒，处理期间按三分之一时长定期续期）
+NLP_CLAIM_SIZE = int(os.environ.get("NLP_CLAIM_SIZE", 100))
+NLP_LEASE_SECONDS = int(os.environ.get("NLP_LEASE_SECONDS", 600))
+# 常驻工作进程在没有待处理论文时的轮询间隔（秒）
+NLP_WORKER_POLL = int(os.environ.get("NLP_WORKER_POLL", 60))
+
+# 需要生成的字段及其对应的单独任务
+FIELD_TASKS = {
+    "titleCn": "translate",
+    "interpretationCn": "interpret",
+    "tags": "generate_tags",
+    "Subject": "classify",
+}
+
+
 class NLPProcessor:
     """科研论文NLP处理类"""
     
-    def __init__(self):
-        """初始化NLP处理器"""
-        self.api_client = self._init_deepseek_client()
+    def __init__(self, concurrency=NLP_CONCURRENCY, rate_limiter=None, combined=NLP_COMBINED,
+                 batch_size=NLP_BATCH_SIZE, batch_token_budget=NLP_BATCH_TOKENS, cache=None, classifier=None,
+                 input_budgets=None, router=None, use_db=True):
+        """初始化NLP处理器
+        
+        参数:
+            concurrency: 同时处理的论文数（1为逐篇处理）
+            rate_limiter: (可选) 共享的限流器，默认按 DEEPSEEK_RPM / DEEPSEEK_TPM 创建
+            combined: 是否用一次合并请求生成标题翻译、解读、标签和分类
+            batch_size: 批量模式下每个请求最多包含的论文数
+            batch_token_budget: 批量模式下每个请求预估的输入+输出token上限
+            cache: (可选) LLM结果缓存，默认在 NLP_CACHE 启用时使用本地缓存文件
+            classifier: (可选) 本地学科分类器，默认在 NLP_LOCAL_CLASSIFIER 启用时加载已训练的模型
+            input_budgets: (可选) 各任务输入文本的token预算 {任务: token数}，默认见 token_budget.TASK_INPUT_BUDGETS
+            router: (可选) LLM多端点路由器，默认按 NLP_ENDPOINTS 创建（未设置时只使用DeepSeek官方端点）
+            use_db: 是否使用数据库（为False时不初始化表、不写处理日志，用于基准测试）
+        """
+        self.router = router if router is not None else LLMRouter.from_env(DEEPSEEK_MODEL)
         self.subjects = PREDEFINED_SUBJECTS
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter(DEEPSEEK_RPM, DEEPSEEK_TPM)
+        self.combined = combined
+        self.batch_size = batch_size
+        self.batch_token_budget = batch_token_budget
+        self.cache = cache if cache is not None else (LLMCache() if NLP_CACHE else None)
+        self.classifier = classifier if classifier is not None else (SubjectClassifier.load() if NLP_LOCAL_CLASSIFIER else None)
+        if self.classifier is not None:
+            if NLP_CLASSIFIER_THRESHOLD:
+                self.classifier.threshold = float(NLP_CLASSIFIER_THRESHOLD)
+            logger.info(f"使用本地学科分类器（置信度阈值 {self.classifier.threshold:.2f}）")
+        self.local_subject_count = 0  # 本地分类器完成的分类数
+        self._count_lock = threading.Lock()
+        self.input_budgets = input_budgets or load_budgets()
+        self.ledger = TokenLedger()  # 本次运行按任务累计的token用量
+        # 本次运行的标识，用于 nlp_journal 中的处理日志
+        self.run_id = f"{datetime.now():%Y%m%d%H%M%S}-{socket.gethostname()}-{os.getpid()}"
         
         # 确保数据库表已初始化
-        if DBHelper:
+        self.use_db = use_db and DBHelper is not None
+        if self.use_db:
             DBHelper.initialize_tables()
 
-    def _init_deepseek_client(self):
-        """初始化DeepSeek API客户端"""
+    def close(self):
+        """关闭LLM路由器的请求线程池"""
+        if self.router is not None:
+            self.router.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def normalize_subject(self, result, default="其他"):
+        """将LLM返回的分类校正为预定义分类，无法匹配时返回 default"""
+        # 移除可能的标点符号
+        result = result.replace("，", "").replace(",", "").replace("。", "").strip()
+        if result in self.subjects:
+            return result
+        logger.warning(f"LLM返回的分类 '{result}' 不在预定义列表中，将尝试查找最接近的")
+        # 尝试查找包含关系的匹配
+        for subj in self.subjects:
+            if result and (subj in result or result in subj): # 简单包含关系检查
+                logger.info(f"修正分类为: {subj}")
+                return subj
+        logger.warning(f"无法匹配分类 '{result}'" + (f"，标记为 '{default}'" if default else ""))
+        return default
+    
+    def _field_specs(self, fields):
+        """合并/批量任务中各字段的要求说明"""
+        specs = {
+            "titleCn": "英文标题的简洁学术中文翻译，保持专业术语准确性，不要添加书名号",
+            "interpretationCn": "一段70-90字的简洁学术性中文总结，聚焦数据集的制作过程和潜在应用价值，采用适合研究人员的正式语气",
+            "tags": "3-5个简洁的中文标签，适合学术分类，使用逗号分隔的字符串",
+            "Subject": f"从预定义分类 [{', '.join(self.subjects)}] 中选择一个最相关的中文类别名称（优先参考摘要，其次是标题）",
+        }
+        return "\n".join(f"- {field}: {specs[field]}" for field in fields)
+    
+    def _combined_prompt(self, text, fields):
+        """合并任务的提示词：一次请求返回多个字段的JSON对象"""
+        return (f"请根据以下论文信息完成多项任务，仅返回一个JSON对象，不要添加任何说明或注释。JSON对象包含以下字段：\n"
+                f"{self._field_specs(fields)}\n\n论文信息：\n{text}")
+    
+    def _batch_prompt(self, text, fields):
+        """批量任务的提示词：一次请求处理多篇论文，按DOI返回结果数组"""
+        return ("以下是多篇科研数据论文。请对每篇论文分别完成多项任务，仅返回一个JSON对象，不要添加任何说明或注释。"
+                '格式为 {"papers": [{"doi": "论文DOI", ...}]}，每篇论文一项，doi 必须与输入完全一致。每项还包含以下字段：\n'
+                f"{self._field_specs(fields)}\n\n论文列表：\n{text}")
+    
+    @staticmethod
+    def _load_json(content):
+        """解析LLM返回的JSON（兼容 Markdown 代码块），无效时返回None"""
+        content = content.strip()
+        if content.startswith("```"):
+            # 去掉可能的 Markdown 代码块标记
+            content = content.strip("`").strip()
+            if content.startswith("json"):
+                content = content[4:]
         try:
-            api_key = os.environ.get("DEEPSEEK_API_KEY")
-            if not api_key:
-                logger.error("未找到环境变量 DEEPSEEK_API_KEY")
-                return None
-            return OpenAI(
-                api_key=api_key,
-                base_url="https://api.deepseek.com"
-            )
-        except Exception as e:
-            logger.error(f"初始化DeepSeek API客户端失败: {e}")
+            return json.loads(content)
+        except ValueError:
+            logger.warning(f"LLM返回的内容不是有效JSON: {content[:100]}")
             return None
     
-    def call_ai_api(self, text, task, retries=3):
-        """调用DeepSeek API，支持重试机制"""
-        if not self.api_client:
-            logger.error("API客户端未初始化")
-            return ""
-            
+    def validate_fields(self, data, fields):
+        """校验JSON对象中的各字段，只返回通过校验的字段（缺失或无效的字段由调用方单独补全）"""
+        results = {}
+        for field in fields:
+            value = data.get(field)
+            if field == "tags" and isinstance(value, list):
+                value = ",".join(str(tag).strip() for tag in value if str(tag).strip())
+            if not isinstance(value, str) or not value.strip():
+                continue
+            value = value.strip()
+            if field == "tags":
+                value = value.replace("，", ",")
+            elif field == "Subject":
+                value = self.normalize_subject(value, default=None)
+                if not value:
+                    continue
+            results[field] = value
+        return results
+    
+    def parse_combined(self, content, fields):
+        """解析并校验合并任务返回的JSON对象"""
+        data = self._load_json(content)
+        if not isinstance(data, dict):
+            return {}
+        return self.validate_fields(data, fields)
+    
+    def parse_batch(self, content, fields):
+        """解析并校验批量任务返回的结果，返回 {小写DOI: {字段: 值}}"""
+        data = self._load_json(content)
+        if isinstance(data, dict) and isinstance(data.get("papers"), list):
+            items = data["papers"]
+        elif isinstance(data, list):
+            items = data
+        elif isinstance(data, dict):
+            # 兼容以DOI为键的对象
+            items = [dict(value, doi=key) for key, value in data.items() if isinstance(value, dict)]
+        else:
+            return {}
+        
+        results = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("doi"), str):
+                continue
+            validated = self.validate_fields(item, fields)
+            if validated:
+                results[item["doi"].strip().lower()] = validated
+        return results
+    
+    def _postprocess(self, task, content, fields):
+        """校验并整理模型回复"""
+        # 对分类结果进行校验
+        if task == "classify":
+            return self.normalize_subject(content)
+        if task == "combined":
+            return self.parse_combined(content, fields)
+        if task == "batch":
+            return self.parse_batch(content, fields)
+        return content
+    
+    def build_prompt(self, task, text, fields=None):
+        """生成任务的提示词
+        
+        返回:
+            (system 提示词, user 提示词, 额外的请求参数)；未知任务时 user 提示词为空字符串
+        """
         prompt = ""
         system_content = "你是一位专业的科研文献翻译与解读助手" # 默认 System Prompt
+        request_options = {}
         if task == "translate":
             prompt = f"将以下英文论文标题翻译成简洁的学术中文，保持专业术语准确性，仅返回翻译结果，不要添加任何说明或注释，不要添加书名号：\n{text}"
         elif task == "interpret":
@@ -113,193 +329,528 @@ class NLPProcessor:
             subject_list_str = ", ".join(self.subjects)
             prompt = f"请根据以下论文信息（优先参考摘要，其次是标题），从下列预定义的分类 (Subject) 中选择一个最相关的类别：[{subject_list_str}]。请仅返回最合适的中文类别名称，不要添加任何说明、标点或注释。\n\n论文信息：\n{text}"
             system_content = "你是一位专业的科研文献分类助手。" # 针对分类任务调整 System Prompt
-
+        elif task == "combined" and fields:
+            prompt = self._combined_prompt(text, fields)
+            system_content = "你是一位专业的科研文献翻译、解读与分类助手，只输出JSON。"
+            request_options["response_format"] = {"type": "json_object"}
+        elif task == "batch" and fields:
+            prompt = self._batch_prompt(text, fields)
+            system_content = "你是一位专业的科研文献翻译、解读与分类助手，只输出JSON。"
+            request_options["response_format"] = {"type": "json_object"}
+            request_options["max_tokens"] = BATCH_MAX_COMPLETION_TOKENS
+        return system_content, prompt, request_options
+    
+    def _journal(self, task, status, doi=None, fields=None, attempt=1, detail=None, prompt_tokens=None, completion_tokens=None):
+        """写入一条处理日志（记录每次调用的尝试、失败、缓存命中和token用量）"""
+        if self.use_db:
+            DBHelper.record_nlp_journal(self.run_id, task, status, doi=doi, fields=fields, attempt=attempt, detail=detail,
+                                        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    
+    def call_ai_api(self, text, task, retries=3, fields=None, items=1, doi=None):
+        """调用DeepSeek API，支持重试机制
+        
+        参数:
+            text: 输入文本
+            task: 任务类型（translate、interpret、generate_tags、classify，合并任务 combined 或批量任务 batch）
+            retries: 最大尝试次数
+            fields: 合并/批量任务需要返回的字段列表
+            items: 批量任务中的论文数（用于预估输出token数）
+            doi: (可选) 论文DOI，用于处理日志
+        
+        返回:
+            单项任务返回字符串；合并任务返回通过校验的 {字段: 值} 字典；
+            批量任务返回 {小写DOI: {字段: 值}}；失败时返回空值
+        """
+        empty = {} if task in ("combined", "batch") else ""
+        if not self.router:
+            logger.error("没有可用的LLM端点")
+            return empty
+            
+        # 输入超出该任务的token预算时在句子边界截断（批量任务在 _batch_entry 中逐篇截断）
+        truncated = False
+        if task != "batch":
+            text, truncated = truncate_text(text, self.input_budgets.get(task))
+        system_content, prompt, request_options = self.build_prompt(task, text, fields)
         if not prompt:
              logger.error(f"未知的 AI 任务类型: {task}")
-             return ""
+             return empty
+
+        # 相同任务、模板版本、模型和输入的结果直接从缓存读取（任一路由端点的模型的结果均可使用）
+        cache_input = f"{fields or ''}\n{text}"
+        if self.cache is not None:
+            for model in self.router.models:
+                content = self.cache.get(self.cache.key(task, PROMPT_VERSIONS[task], model, cache_input))
+                if content is None:
+                    continue
+                result = self._postprocess(task, content, fields)
+                if result:
+                    self._journal(task, "cached", doi=doi, fields=fields)
+                    return result
 
+        if task == "batch":
+            completion_estimate = BATCH_COMPLETION_TOKENS_PER_PAPER * items
+        else:
+            completion_estimate = COMPLETION_TOKEN_ESTIMATE * (len(fields) if task == "combined" else 1)
+        prompt_estimate = estimate_tokens(system_content + prompt)
+        estimated_tokens = prompt_estimate + completion_estimate
         for attempt in range(retries):
             try:
-                response = self.api_client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[
+                # 等待共享的请求/token额度（取代固定的 sleep）
+                self.rate_limiter.acquire(estimated_tokens)
+                started = time.monotonic()
+                # 由路由器选择端点；慢请求自动对冲，出错或限流时切换到其他端点
+                response, endpoint = self.router.complete(
+                    [
                         {"role": "system", "content": system_content},
                         {"role": "user", "content": prompt}
                     ],
-                    stream=False
+                    kind=task,
+                    rate_limiter=self.rate_limiter,
+                    estimated_tokens=estimated_tokens,
+                    **request_options
                 )
-                result = response.choices[0].message.content.strip()
-                
-                # 对分类结果进行校验
-                if task == "classify":
-                    # 移除可能的标点符号
-                    result = result.replace("，", "").replace(",", "").replace("。", "").strip()
-                    if result not in self.subjects:
-                        logger.warning(f"LLM返回的分类 '{result}' 不在预定义列表中，将尝试查找最接近的或标记为'其他'")
-                        # 尝试查找包含关系的匹配
-                        found = False
-                        for subj in self.subjects:
-                            if subj in result or result in subj: # 简单包含关系检查
-                                result = subj
-                                found = True
-                                logger.info(f"修正分类为: {result}")
-                                break
-                        if not found:
-                            logger.warning(f"无法匹配分类 '{result}'，标记为 '其他'")
-                            result = "其他" # 默认归类为"其他"
+                usage = getattr(response, "usage", None)
+                prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+                completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+                self.rate_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", 0))
+                self.ledger.record(task, prompt_tokens, completion_tokens, estimated_tokens=prompt_estimate,
+                                   seconds=time.monotonic() - started, truncated=truncated)
+                content = response.choices[0].message.content.strip()
+                result = self._postprocess(task, content, fields)
+                # 只缓存有效的结果，无效回复下次仍会重新请求
+                if self.cache is not None and result:
+                    self.cache.put(self.cache.key(task, PROMPT_VERSIONS[task], endpoint.model, cache_input), content,
+                                   task=task, model=endpoint.model)
+                self._journal(task, "success" if result else "invalid", doi=doi, fields=fields, attempt=attempt + 1,
+                              detail=endpoint.name if result else content[:200],
+                              prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
                 return result
             except Exception as e:
                 logger.error(f"API调用失败 (尝试 {attempt+1}/{retries}): {e}")
+                self._journal(task, "failed", doi=doi, fields=fields, attempt=attempt + 1, detail=str(e))
                 if attempt < retries - 1:
                     # 等待时间递增，添加随机因素避免同时重试
                     sleep_time = (2 ** attempt) + random.uniform(0, 1)
+                    if getattr(e, "status_code", None) == 429:
+                        # 服务端限流时所有线程一起暂停
+                        self.rate_limiter.backoff(sleep_time)
+                        continue
                     logger.info(f"等待 {sleep_time:.1f} 秒后重试...")
                     time.sleep(sleep_time)
                 else:
                     logger.error("达到最大重试次数，放弃处理")
-                    return ""
+                    return empty
+    
+    def generate_fields(self, title, abstract, fields, doi=None, on_result=None):
+        """生成论文的多个NLP字段
+        
+        需要两个及以上字段且启用合并模式时，先用一次合并请求生成全部字段；
+        合并结果中缺失或未通过校验的字段再逐项调用单独任务补全。
+        
+        参数:
+            title: 英文标题
+            abstract: 摘要（为空时使用标题）
+            fields: 需要生成的字段列表（titleCn、interpretationCn、tags、Subject）
+            doi: (可选) 论文DOI，用于处理日志
+            on_result: (可选) 每次得到有效字段后立即调用，参数为 {字段: 值}（用于逐字段保存）
+        
+        返回:
+            dict: {字段: 值}，生成失败的字段值为空字符串；得到 Subject 时附带 subject_source（llm 或 classifier）
+        """
+        text_for_nlp = abstract if abstract else title
+        results = {}
+        
+        def done(values, subject_source="llm"):
+            if values.get("Subject"):
+                values = dict(values, subject_source=subject_source)
+            results.update(values)
+            values = {field: value for field, value in values.items() if value}
+            if values and on_result:
+                on_result(values)
+        
+        if "Subject" in fields:
+            subject = self.local_subject(title, abstract)
+            if subject:
+                done({"Subject": subject}, subject_source="classifier")
+                fields = [field for field in fields if field != "Subject"]
+        if self.combined and len(fields) > 1:
+            done(self.call_ai_api(f"标题：{title}\n摘要：{abstract or '（无）'}", "combined", fields=fields, doi=doi))
+        for field in fields:
+            if field in results:
+                continue
+            if self.combined and len(fields) > 1:
+                logger.info(f"合并结果缺少字段 {field}，单独调用补全")
+            # 标题翻译只需要标题，其余任务使用摘要（无摘要则使用标题）
+            done({field: self.call_ai_api(title if field == "titleCn" else text_for_nlp, FIELD_TASKS[field], doi=doi)})
+        return results
+    
+    def local_subject(self, title, abstract):
+        """用本地分类器分类，置信度不足或没有模型时返回None（交给LLM）"""
+        if self.classifier is None:
+            return None
+        subject = self.classifier.classify(title, abstract)
+        if subject:
+            with self._count_lock:
+                self.local_subject_count += 1
+        return subject
+    
+    @staticmethod
+    def _new_processed_paper(paper):
+        """由原始论文创建待填充的处理后论文数据对象（继续处理的论文带上已保存的字段，只生成尚缺的字段）"""
+        processed_paper = {
+            'title': paper.get('title', ''),
+            'publishDate': paper.get('publishDate', ''),
+            'doi': paper.get('doi', ''),
+            'url': paper.get('url', ''),
+            'authors': paper.get('authors', ''),
+            'abstract': paper.get('abstract', ''),
+            'journal': paper.get('journal', ''),
+            'titleCn': '',
+            'interpretationCn': '',
+            'tags': paper.get('tags', ''),
+            'Subject': '',
+            'subject_source': None,  # 学科分类的来源：llm 或 classifier
+            'source_hash': paper.get('content_hash')  # 记录处理时的原始内容哈希
+        }
+        processed_paper.update(paper.get('processed_fields') or {})
+        return processed_paper
+    
+    @staticmethod
+    def _needed_fields(processed_paper):
+        """新论文需要生成的字段（原始数据已有的标签、本地分类得到的学科不再生成）"""
+        return [field for field in FIELD_TASKS if not processed_paper.get(field)]
+    
+    def _save_fields(self, doi):
+        """返回逐字段保存的回调：生成的字段立即写入已有的处理后论文记录"""
+        return lambda values: DBHelper.update_processed_fields(doi, values)
     
-    def process_papers(self):
-        """处理论文数据，包括处理新论文和补全旧论文的缺失信息，使用数据库作为数据源和目标"""
+    @staticmethod
+    def _start_paper(paper, processed_paper):
+        """开始处理一篇论文时写入数据库，返回是否可以继续逐字段保存
+        
+        新论文先写入骨架记录（记录原始内容哈希，缺失字段由 missing_fields 标记），字段生成失败或
+        进程中途退出时，论文在租约到期后被重新领取，只生成尚缺的字段。已有记录的论文不再插入：
+        继续处理的论文只写入本次得到、记录中还缺的字段（如原始标签、本地分类结果）；原始内容变化后
+        重新处理的论文保留旧记录，旧字段在对应的新值写入前不会被清空，记录的内容哈希也暂不更新，
+        中途退出时论文仍是待处理状态（已生成的字段会命中LLM缓存）。
+        """
+        if paper.get('already_processed') or paper.get('resume'):
+            stored = paper.get('processed_fields') or {}
+            values = {field: processed_paper[field] for field in FIELD_TASKS
+                      if processed_paper.get(field) and not stored.get(field)}
+            if values.get('Subject'):
+                values['subject_source'] = processed_paper.get('subject_source')
+            if values:
+                DBHelper.update_processed_fields(processed_paper['doi'], values)
+            return True
+        return DBHelper.insert_processed_paper(processed_paper)
+    
+    @staticmethod
+    def _finish_paper(paper, processed_paper, needed):
+        """字段生成结束后的收尾，返回是否至少保存了一个生成的字段
+        
+        重新处理的论文只有在全部字段都已替换后才写入完整记录（同时更新内容哈希），
+        否则保持待处理状态，下次运行重试。
+        """
+        if paper.get('already_processed') and all(processed_paper.get(field) for field in FIELD_TASKS):
+            DBHelper.insert_processed_paper(processed_paper)
+        return any(processed_paper.get(field) for field in needed)
+    
+    def process_new_paper(self, paper):
+        """对一篇未处理的原始论文执行NLP处理，每个字段生成后立即保存
+        
+        返回:
+            bool: 是否至少保存了一个生成的字段
+        """
+        processed_paper = self._new_processed_paper(paper)
+        title = processed_paper['title']
+        doi = processed_paper['doi']
+        
+        # 如果有内容，进行NLP处理
+        if not title:
+            return False
+        logger.info(f"处理新论文 DOI {doi}: {title[:30]}...")
+        if not self._start_paper(paper, processed_paper):
+            return False
+        needed = self._needed_fields(processed_paper)
+        processed_paper.update(self.generate_fields(title, processed_paper['abstract'], needed,
+                                                    doi=doi, on_result=self._save_fields(doi)))
+        return self._finish_paper(paper, processed_paper, needed)
+    
+    def pack_batches(self, papers):
+        """按论文数上限和token预算将论文打包成批"""
+        batches = []
+        batch, batch_tokens = [], 0
+        for paper in papers:
+            tokens = estimate_tokens(self._batch_entry(paper)) + BATCH_COMPLETION_TOKENS_PER_PAPER
+            if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.batch_token_budget):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(paper)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _batch_entry(self, paper):
+        """批量提示词中的单篇论文（摘要按每篇论文的token预算截断）"""
+        abstract, _ = truncate_text(paper.get('abstract') or '', self.input_budgets.get('batch'))
+        return f"DOI: {paper.get('doi', '')}\n标题: {paper.get('title', '')}\n摘要: {abstract or '（无）'}\n"
+    
+    def process_batch(self, papers):
+        """用一次批量请求处理多篇新论文并保存
+        
+        返回:
+            (保存成功的数量, 批量结果中遗漏的论文列表)
+        """
+        logger.info(f"批量处理 {len(papers)} 篇新论文...")
+        # 先用本地分类器为还没有学科的论文分类；批量请求只要求至少一篇论文还缺的字段
+        processed_papers = []
+        for paper in papers:
+            processed_paper = self._new_processed_paper(paper)
+            if not processed_paper['Subject']:
+                processed_paper['Subject'] = self.local_subject(processed_paper['title'], processed_paper['abstract']) or ''
+                if processed_paper['Subject']:
+                    processed_paper['subject_source'] = 'classifier'
+            processed_papers.append(processed_paper)
+        fields = [field for field in FIELD_TASKS if not all(p.get(field) for p in processed_papers)]
+        results = {}
+        if fields:
+            results = self.call_ai_api("\n".join(self._batch_entry(paper) for paper in papers), "batch",
+                                       fields=fields, items=len(papers))
+        saved = 0
+        missing = []
+        for paper, processed_paper in zip(papers, processed_papers):
+            result = results.get(paper.get('doi', '').strip().lower()) if fields else {}
+            if fields and not result:
+                missing.append(paper)
+                continue
+            needed = self._needed_fields(processed_paper)
+            processed_paper.update({field: value for field, value in result.items() if field in needed})
+            if 'Subject' in needed and processed_paper.get('Subject'):
+                processed_paper['subject_source'] = 'llm'
+            # 先保存批量结果，单个字段缺失或无效时再逐项补全并逐字段保存
+            if not self._start_paper(paper, processed_paper):
+                continue
+            rest = [field for field in needed if field not in result]
+            if rest:
+                processed_paper.update(self.generate_fields(
+                    processed_paper['title'], processed_paper['abstract'], rest,
+                    doi=processed_paper['doi'], on_result=self._save_fields(processed_paper['doi'])))
+            if self._finish_paper(paper, processed_paper, needed):
+                saved += 1
+        if missing:
+            logger.warning(f"批量结果中遗漏了 {len(missing)} 篇论文，将重新排队")
+        return saved, missing
+    
+    def process_in_batches(self, papers):
+        """批量模式处理新论文：遗漏的论文重新打包排队，仍遗漏的最后逐篇处理，返回保存成功的数量"""
+        pending = [paper for paper in papers if paper.get('title')]
+        count = 0
+        for _ in range(1 + BATCH_REQUEUE_ROUNDS):
+            if not pending:
+                break
+            batches = self.pack_batches(pending)
+            pending = []
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = [executor.submit(self.process_batch, batch) for batch in batches]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="批量处理新论文"):
+                    try:
+                        saved, missing = future.result()
+                    except Exception as e:
+                        logger.error(f"批量处理时发生错误: {e}")
+                        continue
+                    count += saved
+                    pending.extend(missing)
+        if pending:
+            logger.info(f"{len(pending)} 篇论文批量处理未成功，改为逐篇处理")
+            count += self._run_concurrently(self.process_new_paper, pending, "逐篇处理遗漏论文")
+        return count
+    
+    def repair_paper(self, paper):
+        """补全一篇已处理论文中缺失的字段，返回是否有更新并保存成功"""
+        doi = paper.get('doi', '')
+        title = paper.get('title', '')
+        abstract = paper.get('abstract', '')
+        
+        # 确定用于解读、分类和标签生成的文本 (优先摘要)
+        text_for_nlp = abstract if abstract else title
+        
+        # 检查缺失的字段（中文标题需要英文标题，其余字段需要摘要或标题）
+        missing = [field for field in FIELD_TASKS
+                   if not paper.get(field) and (title if field == 'titleCn' else text_for_nlp)]
+        if not missing:
+            return False
+        logger.info(f"为 DOI {doi} 补全字段: {', '.join(missing)}...")
+        
+        # 每个字段生成后立即保存，返回是否补全了至少一个字段
+        results = self.generate_fields(title, abstract, missing, doi=doi, on_result=self._save_fields(doi))
+        return any(results.values())
+    
+    def repair_missing_fields(self, skip_dois=(), batch_size=REPAIR_BATCH_SIZE):
+        """字段补全任务：按 missing_fields 索引分批读取缺少字段的论文并补全
+        
+        每次运行的工作量只与缺失字段的论文数有关，与表大小无关；
+        本次运行中补全失败的论文不会被重复读取（按主键递增分批）。
+        
+        参数:
+            skip_dois: 跳过的DOI（原始内容已变化、等待重新处理的论文）
+            batch_size: 每批读取的论文数
+        
+        返回:
+            int: 成功补全的论文数
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            papers = DBHelper.get_incomplete_processed_papers(after_id=last_id, limit=batch_size)
+            if not papers:
+                break
+            last_id = papers[-1]['id']
+            papers = [paper for paper in papers if paper.get('doi') not in skip_dois]
+            if papers:
+                logger.info(f"补全 {len(papers)} 篇论文的缺失字段...")
+                updated += self._run_concurrently(self.repair_paper, papers, "补全缺失字段")
+        return updated
+    
+    def _run_concurrently(self, func, papers, desc):
+        """用线程池并发处理论文（API调用速率由共享限流器控制），返回成功的数量"""
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(func, paper): paper for paper in papers}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                try:
+                    if future.result():
+                        count += 1
+                except Exception as e:
+                    logger.error(f"处理 DOI {futures[future].get('doi', '')} 时发生错误: {e}")
+        return count
+    
+    def _process_claimed(self, papers, batch):
+        """处理一批已领取的论文，返回保存成功的数量"""
+        if batch is None:
+            batch = len(papers) >= NLP_BATCH_THRESHOLD
+        if batch and self.batch_size > 1:
+            logger.info(f"批量处理 {len(papers)} 篇论文（每批最多 {self.batch_size} 篇，并发数 {self.concurrency}）...")
+            return self.process_in_batches(papers)
+        logger.info(f"处理 {len(papers)} 篇论文（并发数 {self.concurrency}）...")
+        return self._run_concurrently(self.process_new_paper, papers, "处理新论文")
+    
+    def process_pending(self, batch=None, worker_id=None, claim_size=NLP_CLAIM_SIZE, lease_seconds=NLP_LEASE_SECONDS):
+        """领取并处理待处理的原始论文，直到没有可领取的论文
+        
+        论文通过数据库租约领取（见 DBHelper.claim_unprocessed_raw_papers），多个进程或机器
+        同时运行时不会重复处理同一篇论文；处理期间后台线程定期续期，进程崩溃后租约到期，
+        论文由其他进程重新领取。字段没有全部生成的论文保留租约，到期后重新领取并继续生成缺失的字段。
+        
+        参数:
+            batch: 是否用批量模式（为None时每次领取的论文达到 NLP_BATCH_THRESHOLD 篇自动启用）
+            worker_id: 工作进程标识，默认为 主机名-进程号
+            claim_size: 每次领取的论文数
+            lease_seconds: 租约时长（秒）
+        
+        返回:
+            (保存成功的数量, 原始内容变化后重新处理的DOI集合)
+        """
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        count = 0
+        reprocessed = set()
+        while True:
+            papers = DBHelper.claim_unprocessed_raw_papers(worker_id, claim_size, lease_seconds)
+            if not papers:
+                break
+            dois = [paper['doi'] for paper in papers]
+            reprocessed.update(paper['doi'] for paper in papers if paper.get('already_processed'))
+            
+            # 处理期间定期续期，避免处理时间超过租约时长后被其他进程领走
+            stop = threading.Event()
+            def renew():
+                while not stop.wait(lease_seconds / 3):
+                    DBHelper.renew_nlp_leases(worker_id, dois, lease_seconds)
+            heartbeat = threading.Thread(target=renew, daemon=True)
+            heartbeat.start()
+            try:
+                count += self._process_claimed(papers, batch)
+            finally:
+                stop.set()
+                heartbeat.join()
+            
+            released = DBHelper.release_nlp_leases(worker_id, dois)
+            if released < len(dois):
+                logger.warning(f"{len(dois) - released} 篇论文处理失败，租约到期后重试")
+        return count, reprocessed
+    
+    def run_worker(self, batch=None, once=False, poll_interval=NLP_WORKER_POLL):
+        """工作进程模式：持续领取并处理待处理论文，可在多个进程或机器上同时运行
+        
+        字段生成失败的论文保留租约，到期后作为字段不全的论文被重新领取并只生成缺失的字段，
+        因此只运行工作进程（不运行 process_papers 的字段补全）时论文最终也会补全。
+        
+        参数:
+            batch: 是否用批量模式（同 process_pending）
+            once: 为True时处理完当前可领取的论文后退出，否则每隔 poll_interval 秒轮询
+            poll_interval: 没有可领取论文时的轮询间隔（秒）
+        
+        返回:
+            int: 保存成功的论文数
+        """
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        logger.info(f"NLP工作进程 {worker_id} 启动（每次领取 {NLP_CLAIM_SIZE} 篇，租约 {NLP_LEASE_SECONDS} 秒）")
+        self._journal("run", "start", detail=f"worker {worker_id}")
+        total = 0
+        try:
+            while True:
+                count, _ = self.process_pending(batch=batch, worker_id=worker_id)
+                total += count
+                if once:
+                    break
+                if not count:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            logger.info("工作进程被中断，未完成论文的租约到期后由其他进程重新领取")
+        logger.info(f"工作进程 {worker_id} 共处理 {total} 篇论文，限流统计: {self.rate_limiter.summary()}")
+        self._finish_run(f"处理 {total} 篇", total)
+        return total
+    
+    def process_papers(self, batch=None):
+        """处理论文数据，包括处理新论文和补全旧论文的缺失信息，使用数据库作为数据源和目标
+        
+        参数:
+            batch: 是否用批量模式处理新论文（多篇论文合并为一个请求）；
+                   为None时待处理论文达到 NLP_BATCH_THRESHOLD 篇自动启用
+        """
         # 确保数据库连接正常
         if not DBHelper:
             logger.error("数据库工具类未正确初始化，无法处理数据")
             return 0
         
-        # 1. 从数据库获取已处理的论文数据
-        processed_papers = DBHelper.get_all_processed_papers()
-        processed_doi_set = set()
-        for paper in processed_papers:
-            if paper.get('doi'):
-                processed_doi_set.add(paper.get('doi'))
-        logger.info(f"从数据库中获取到 {len(processed_papers)} 条已处理的论文数据")
-        
-        # 2. 获取未处理的原始论文数据（在 raw_papers 中但不在 processed_papers 中）
-        unprocessed_papers = DBHelper.get_unprocessed_raw_papers()
-        logger.info(f"发现 {len(unprocessed_papers)} 条未处理的论文数据")
-        
-        # 3. 处理未处理的论文数据
-        new_papers_processed_count = 0
-        if unprocessed_papers:
-            logger.info("开始处理新论文数据...")
-            for paper in tqdm(unprocessed_papers, desc="处理新论文"):
-                doi = paper.get('doi', '')
-                title = paper.get('title', '')
-                abstract = paper.get('abstract', '')
-                
-                # 创建处理后的论文数据对象
-                processed_paper = {
-                    'title': title,
-                    'publishDate': paper.get('publishDate', ''),
-                    'doi': doi,
-                    'url': paper.get('url', ''),
-                    'authors': paper.get('authors', ''),
-                    'abstract': abstract,
-                    'journal': paper.get('journal', ''),
-                    'titleCn': '',
-                    'interpretationCn': '',
-                    'tags': paper.get('tags', ''),
-                    'Subject': ''
-                }
-                
-                # 如果有内容，进行NLP处理
-                if title:
-                    logger.info(f"处理新论文 DOI {doi}: {title[:30]}...")
-                    # 翻译标题
-                    title_cn = self.call_ai_api(title, "translate")
-                    processed_paper['titleCn'] = title_cn
-                    time.sleep(1)
-                    
-                    # 为确保有内容可处理，使用摘要优先，无摘要则使用标题
-                    text_for_nlp = abstract if abstract else title
-                    
-                    # 生成解读
-                    interpretation_cn = self.call_ai_api(text_for_nlp, "interpret")
-                    processed_paper['interpretationCn'] = interpretation_cn
-                    time.sleep(1)
-                    
-                    # 生成标签（如果原始数据没有标签）
-                    if not processed_paper['tags']:
-                        tags = self.call_ai_api(text_for_nlp, "generate_tags")
-                        processed_paper['tags'] = tags
-                        time.sleep(1)
-
-                    # 生成 Subject 分类
-                    subject = self.call_ai_api(text_for_nlp, "classify")
-                    processed_paper['Subject'] = subject
-                    time.sleep(1)
-                    
-                    # 保存到数据库
-                    if DBHelper.insert_processed_paper(processed_paper):
-                        new_papers_processed_count += 1
-                    
-                    # 每处理5篇新文章等待一下
-                    if new_papers_processed_count > 0 and new_papers_processed_count % 5 == 0:
-                        logger.info("API调用间歇等待...")
-                        time.sleep(2)
-        
-        # 4. 检查并更新已处理数据中可能缺失的字段
-        updated_papers_count = 0
-        if processed_papers:
-            logger.info("开始检查并补全已处理论文数据中缺失的字段...")
-            for paper in tqdm(processed_papers, desc="检查已处理数据"):
-                doi = paper.get('doi', '')
-                title = paper.get('title', '')
-                abstract = paper.get('abstract', '')
-                
-                needs_update = False
-                
-                # 检查中文标题
-                if title and not paper.get('titleCn'): 
-                    logger.info(f"为 DOI {doi} 补全中文标题...")
-                    title_cn = self.call_ai_api(title, "translate")
-                    if title_cn:
-                        paper['titleCn'] = title_cn
-                        needs_update = True
-                        time.sleep(1)
-                
-                # 确定用于解读、分类和标签生成的文本 (优先摘要)
-                text_for_nlp = abstract if abstract else title
-
-                # 检查中文解读
-                if text_for_nlp and not paper.get('interpretationCn'):
-                    logger.info(f"为 DOI {doi} 补全中文解读...")
-                    interpretation_cn = self.call_ai_api(text_for_nlp, "interpret")
-                    if interpretation_cn:
-                        paper['interpretationCn'] = interpretation_cn
-                        needs_update = True
-                        time.sleep(1)
-
-                # 检查标签
-                if text_for_nlp and not paper.get('tags'):
-                    logger.info(f"为 DOI {doi} 补全标签...")
-                    tags = self.call_ai_api(text_for_nlp, "generate_tags")
-                    if tags:
-                        paper['tags'] = tags
-                        needs_update = True
-                        time.sleep(1)
-
-                # 检查 Subject 分类
-                if text_for_nlp and not paper.get('Subject'):
-                    logger.info(f"为 DOI {doi} 补全 Subject 分类...")
-                    subject = self.call_ai_api(text_for_nlp, "classify")
-                    if subject:
-                        paper['Subject'] = subject
-                        needs_update = True
-                        time.sleep(1)
-
-                # 如果需要更新，将更新后的数据保存回数据库
-                if needs_update:
-                    if DBHelper.insert_processed_paper(paper):  # 使用 insert_processed_paper 同时支持插入和更新
-                        updated_papers_count += 1
-                    
-                    # 每更新5篇等待一下
-                    if updated_papers_count > 0 and updated_papers_count % 5 == 0:
-                        logger.info("API调用间歇等待...")
-                        time.sleep(2)
-        
-        logger.info(f"论文处理完成，新处理 {new_papers_processed_count} 篇，更新 {updated_papers_count} 篇")
+        self._journal("run", "start", detail="process_papers")
+        
+        # 1-3. 领取并处理未处理的论文（不在 processed_papers 中，或处理后原始内容发生了变化）；
+        #      与同时运行的工作进程通过租约分配论文，不会重复处理
+        new_papers_processed_count, reprocessed_doi_set = self.process_pending(batch=batch)
+        if reprocessed_doi_set:
+            logger.info(f"其中 {len(reprocessed_doi_set)} 条论文因原始内容变化而重新处理")
+        
+        # 4. 补全已处理数据中缺失的字段（只查询 missing_fields 非0的行）
+        updated_papers_count = self.repair_missing_fields(skip_dois=reprocessed_doi_set)
+        
+        logger.info(f"论文处理完成，新处理 {new_papers_processed_count} 篇，更新 {updated_papers_count} 篇，限流统计: {self.rate_limiter.summary()}")
+        if self.cache is not None:
+            logger.info(f"LLM缓存统计: {self.cache.stats()}")
+        if self.classifier is not None:
+            logger.info(f"本地学科分类器完成 {self.local_subject_count} 篇分类")
+        self._finish_run(f"新处理 {new_papers_processed_count} 篇，更新 {updated_papers_count} 篇",
+                         new_papers_processed_count + updated_papers_count)
         return new_papers_processed_count + updated_papers_count
+    
+    def _finish_run(self, detail, papers=0):
+        """记录运行结束，并输出本次运行各任务的调用结果与token用量统计"""
+        self._journal("run", "finish", detail=detail)
+        logger.info(f"本次运行的token用量: {self.ledger.summary(papers)}")
+        logger.info(f"LLM端点统计: {self.router.summary()}")
+        if self.use_db:
+            logger.info(f"本次运行 {self.run_id} 的调用统计: {DBHelper.get_nlp_journal_summary(self.run_id)}")
 
 
 def main():
@@ -311,8 +862,19 @@ def main():
         logger.error("无法初始化数据库，请确保数据库配置正确")
         return
 
-    processor = NLPProcessor()
-    count = processor.process_papers()
+    parser = argparse.ArgumentParser(description="论文NLP处理")
+    parser.add_argument("--repair-only", action="store_true", help="只运行字段补全任务（补全已处理论文中缺失的字段）")
+    parser.add_argument("--worker", action="store_true", help="工作进程模式：持续领取并处理待处理论文（可多进程/多机同时运行）")
+    parser.add_argument("--once", action="store_true", help="工作进程处理完当前可领取的论文后退出")
+    args = parser.parse_args()
+
+    with NLPProcessor() as processor:
+        if args.worker:
+            count = processor.run_worker(once=args.once)
+        elif args.repair_only:
+            count = processor.repair_missing_fields()
+        else:
+            count = processor.process_papers()
     
     if count > 0:
         print(f"论文数据处理完成！共处理 {count} 篇论文")
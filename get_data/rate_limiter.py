@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+令牌桶限流模块
+
+为并发的LLM调用提供共享的速率限制（线程安全）：
+1. 每分钟请求数（RPM）与每分钟token数（TPM）各用一个令牌桶
+2. 请求前按预估token数扣减，响应返回实际用量后再补差
+3. 服务端返回429时暂停所有线程一段时间，而不是各自重试造成更多拥塞
+取代原来每次调用后固定 sleep 的做法：额度充足时不等待，额度不足时只等待必要的时间。
+"""
+
+import time
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，容量即允许的突发量（线程安全）"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        """初始化令牌桶
+
+        参数:
+            rate_per_minute: 每分钟补充的令牌数
+            capacity: 桶容量（默认等于每分钟速率，即最多允许一分钟额度的突发）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1.0):
+        """预留 amount 个令牌（允许透支），返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # 单次请求超过桶容量时按容量计算，避免永远等待
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def try_reserve(self, amount=1.0):
+        """令牌充足时预留 amount 个令牌并返回True，不足时不预留、不等待并返回False"""
+        with self._lock:
+            self._refill(time.monotonic())
+            amount = min(amount, self.capacity)
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def adjust(self, amount):
+        """补差：amount 为正时归还令牌，为负时追加扣减"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def acquire(self, amount=1.0):
+        """获取 amount 个令牌，不足时阻塞等待，返回等待的秒数"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """请求数 + token数 双令牌桶限流器，供多个工作线程共享"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=None):
+        """初始化限流器
+
+        参数:
+            requests_per_minute: 每分钟最多请求数（为0或None时不限制）
+            tokens_per_minute: 每分钟最多token数（为0或None时不限制）
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0  # 累计等待时间（秒）
+        self.throttled = 0  # 收到429的次数
+
+    def acquire(self, estimated_tokens=0):
+        """发起请求前调用：等待请求额度和预估token额度，返回等待的秒数"""
+        waited = 0.0
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+            waited += pause
+        # 两个桶同时预留，等待时间取较长者，而不是先后累加
+        wait = 0.0
+        if self.requests:
+            wait = self.requests.reserve(1)
+        if self.tokens and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            with self._lock:
+                self.waited += waited
+        return waited
+
+    def try_acquire(self, estimated_tokens=0):
+        """不等待地获取一次请求的额度：暂停中或任一令牌桶额度不足时返回False（不扣减），否则扣减并返回True
+
+        用于可有可无的额外请求（如对冲请求），额度紧张时直接放弃，不挤占正常请求的额度。
+        """
+        with self._lock:
+            if self._paused_until > time.monotonic():
+                return False
+        if self.requests and not self.requests.try_reserve(1):
+            return False
+        if self.tokens and estimated_tokens and not self.tokens.try_reserve(estimated_tokens):
+            if self.requests:
+                self.requests.adjust(1)
+            return False
+        return True
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """响应返回后，按实际token用量修正预留的额度"""
+        if self.tokens and actual_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def release(self, estimated_tokens):
+        """请求失败、没有消耗token时，归还预留的token额度"""
+        if self.tokens and estimated_tokens:
+            self.tokens.adjust(estimated_tokens)
+
+    def backoff(self, seconds):
+        """服务端限流（429）时调用：所有线程暂停 seconds 秒"""
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"API返回限流，所有请求暂停 {seconds:.1f} 秒")
+
+    def summary(self):
+        """限流统计"""
+        with self._lock:
+            return {"waited_seconds": round(self.waited, 2), "throttled": self.throttled}
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP录制/回放模块
+
+在不访问 nature.com、copernicus.org 的情况下复现爬虫的网络行为：
+1. 录制：在会话上挂载响应钩子，把RSS源和文章页面（含重定向）保存为本地夹具文件
+2. 回放：本地HTTP服务器按原始URL返回夹具内容，ReplayAdapter 把会话的所有请求
+   改写到该服务器，爬虫和摘要获取器的代码无需任何修改
+3. 合成站点：按指定条目数生成RSS和文章页面，用于基准测试
+
+使用方法:
+python -m get_data.replay record --output fixtures/live     # 真实爬取一次并录制
+python -m get_data.replay serve fixtures/live --port 8765    # 单独启动回放服务器
+"""
+
+import os
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+import threading
+import multiprocessing
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 小于该大小的响应不压缩
+GZIP_MIN_BYTES = 1024
+
+
+def fixture_key(url):
+    """夹具索引的键：去掉片段标识的完整URL"""
+    return url.split("#", 1)[0]
+
+
+class FixtureStore:
+    """录制的HTTP响应（URL -> 状态码、内容类型、重定向地址、正文）
+
+    正文按内容哈希保存在 bodies/ 下，索引保存在 index.json。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.bodies_dir = os.path.join(directory, 'bodies')
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def add(self, url, status, content_type="", body=b"", location=None):
+        """保存一个响应"""
+        digest = hashlib.sha1(body).hexdigest() if body else None
+        if digest:
+            path = os.path.join(self.bodies_dir, digest)
+            if not os.path.exists(path):
+                os.makedirs(self.bodies_dir, exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(body)
+        self.index[fixture_key(url)] = {
+            "status": status,
+            "content_type": content_type,
+            "location": location,
+            "body": digest,
+        }
+
+    def save(self):
+        """写入索引文件"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+        logger.info(f"已保存 {len(self.index)} 个录制响应到 {self.directory}")
+
+    def __call__(self, url):
+        """按原始URL查找响应，返回 (状态码, 响应头字典, 正文)，未录制时返回None"""
+        entry = self.index.get(fixture_key(url))
+        if entry is None:
+            return None
+        headers = {}
+        if entry.get("content_type"):
+            headers["Content-Type"] = entry["content_type"]
+        if entry.get("location"):
+            headers["Location"] = entry["location"]
+        body = b""
+        if entry.get("body"):
+            with open(os.path.join(self.bodies_dir, entry["body"]), 'rb') as f:
+                body = f.read()
+        return entry["status"], headers, body
+
+
+class FixtureRecorder:
+    """在会话上挂载响应钩子，录制经过会话的全部响应（包括重定向）"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+    def attach(self, session):
+        session.hooks.setdefault("response", []).append(self._record)
+
+    def _record(self, response, *args, **kwargs):
+        location = None
+        if response.is_redirect:
+            location = urljoin(response.url, response.headers.get("Location", ""))
+            body = b""
+        else:
+            # 读取完整正文（录制时不使用流式下载）
+            body = response.content
+        with self._lock:
+            self.store.add(response.url, response.status_code, response.headers.get("Content-Type", ""), body, location)
+        return response
+
+
+class SyntheticSite:
+    """合成的期刊站点：一个包含 entries 条目的RSS源及对应的文章页面
+
+    页面结构模仿 Nature Scientific Data（citation_* meta、Abs1-content 摘要容器），
+    摘要之后填充正文使每页约 page_kb KB，用于测量流式下载和区域解析的效果。
+    """
+
+    feed_name = "Scientific Data"
+    feed_url = "https://www.nature.com/sdata.rss"
+    article_prefix = "https://www.nature.com/articles/s41597-bench-"
+
+    def __init__(self, entries, page_kb=100):
+        self.entries = entries
+        self.page_kb = page_kb
+
+    def feeds(self):
+        """与 feeds.json 格式相同的RSS源列表"""
+        return [{"name": self.feed_name, "rss_url": self.feed_url}]
+
+    @staticmethod
+    def _published(index):
+        return (date(2025, 1, 1) + timedelta(days=index // 4)).isoformat()
+
+    def feed_xml(self):
+        items = []
+        for i in range(self.entries):
+            doi = f"10.1038/s41597-bench-{i:05d}"
+            published = self._published(i)
+            items.append(
+                f"<item rdf:about=\"{self.article_prefix}{i:05d}\">"
+                f"<title>Synthetic benchmark dataset number {i}</title>"
+                f"<link>{self.article_prefix}{i:05d}</link>"
+                f"<description>Scientific Data, Published online: {published}; doi:{doi}</description>"
+                f"<dc:identifier>doi:{doi}</dc:identifier>"
+                f"<dc:date>{published}</dc:date>"
+                f"<dc:source>Scientific Data, Published online: {published}; doi:{doi}</dc:source>"
+                f"</item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns="http://purl.org/rss/1.0/">'
+            '<channel><title>Scientific Data</title><link>https://www.nature.com/sdata</link>'
+            '<description>Synthetic feed</description></channel>'
+            + "".join(items) +
+            '</rdf:RDF>'
+        ).encode("utf-8")
+
+    def article_html(self, index):
+        doi = f"10.1038/s41597-bench-{index:05d}"
+        filler = "<p>" + "Dataset description paragraph with methods and validation details. " * 12 + "</p>\n"
+        target = self.page_kb * 1024
+        before = filler * max(1, target // (5 * len(filler)))
+        after = filler * max(1, (target * 4) // (5 * len(filler)))
+        abstract = " ".join(
+            f"Sentence {n} of the abstract describes the synthetic dataset {index} and its coverage." for n in range(8)
+        )
+        return (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+            f"<title>Synthetic benchmark dataset number {index}</title>"
+            f"<meta name=\"citation_title\" content=\"Synthetic benchmark dataset number {index}\">"
+            f"<meta name=\"citation_doi\" content=\"{doi}\">"
+            f"<meta name=\"citation_publication_date\" content=\"{self._published(index).replace('-', '/')}\">"
+            "<meta name=\"citation_author\" content=\"Zhang, San\">"
+            "<meta name=\"citation_author\" content=\"Li, Si\">"
+            "</head><body><header><nav>Navigation</nav></header><main>"
+            f"{before}"
+            "<section data-title=\"Abstract\"><div class=\"c-article-section\" id=\"Abs1-section\">"
+            f"<h2>Abstract</h2><div id=\"Abs1-content\"><p>{abstract}</p></div></div></section>"
+            f"{after}"
+            "<section data-title=\"Data availability\"><p>The dataset is available at "
+            f"<a href=\"https://doi.org/10.6084/m9.figshare.{20000000 + index}\">figshare</a>.</p></section>"
+            "</main></body></html>"
+        ).encode("utf-8")
+
+    def __call__(self, url):
+        url = fixture_key(url)
+        if url == self.feed_url:
+            return 200, {"Content-Type": "application/rss+xml; charset=utf-8"}, self.feed_xml()
+        if url.startswith(self.article_prefix):
+            try:
+                index = int(url[len(self.article_prefix):])
+            except ValueError:
+                return None
+            if 0 <= index < self.entries:
+                return 200, {"Content-Type": "text/html; charset=utf-8"}, self.article_html(index)
+        return None
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """把 /<scheme>/<host>/<path> 形式的请求还原为原始URL并返回夹具内容"""
+
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文分两次写入，关闭 Nagle 算法避免与延迟确认叠加产生 40ms 等待
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = self.path.lstrip("/").split("/", 2)
+        if len(parts) < 2:
+            self.send_error(404)
+            return
+        scheme, netloc = parts[0], parts[1]
+        rest = parts[2] if len(parts) > 2 else ""
+        url = f"{scheme}://{netloc}/{rest}"
+
+        result = self.server.resolver(url)
+        if result is None:
+            self.send_error(404, f"未录制: {url}")
+            return
+        status, headers, body = result
+        if body and len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers = dict(headers, **{"Content-Encoding": "gzip"})
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 流式下载提前关闭连接
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(resolver, host, port, port_queue):
+    server = ThreadingHTTPServer((host, port), _ReplayHandler)
+    server.daemon_threads = True
+    server.resolver = resolver
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class ReplayServer:
+    """本地回放服务器（运行在独立进程中，不与被测代码争用GIL）"""
+
+    def __init__(self, resolver, host="127.0.0.1", port=0):
+        """
+        参数:
+            resolver: 可调用对象 url -> (状态码, 响应头, 正文) 或 None，如 FixtureStore、SyntheticSite
+            host: 监听地址
+            port: 监听端口，0 表示自动选择
+        """
+        self.resolver = resolver
+        self.host = host
+        self.port = port
+        self.base_url = None
+        self._process = None
+
+    def start(self):
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.resolver, self.host, self.port, port_queue), daemon=True
+        )
+        self._process.start()
+        self.port = port_queue.get(timeout=30)
+        self.base_url = f"http://{self.host}:{self.port}"
+        logger.info(f"回放服务器已启动: {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """把请求改写到回放服务器，响应的URL仍为原始URL（期刊识别、重定向不受影响）"""
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url.rstrip("/")
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parts = urlsplit(original_url)
+        request.url = f"{self.base_url}/{parts.scheme}/{parts.netloc}{parts.path or '/'}"
+        if parts.query:
+            request.url += f"?{parts.query}"
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            request.url = original_url
+        response.url = original_url
+        return response
+
+
+def install_replay(session, base_url, pool_maxsize=10):
+    """让会话的全部 http/https 请求都由回放服务器响应"""
+    adapter = ReplayAdapter(base_url, pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def record(output_dir):
+    """真实爬取一次全部RSS源，录制RSS与文章页面到 output_dir（不读写数据库）"""
+    import tempfile
+    try:
+        from .crawler import RSSCrawler
+        from .feed_scheduler import FeedScheduler
+        from .abstract_fetcher import AbstractFetcher, ResolvedURLCache
+    except ImportError:
+        from crawler import RSSCrawler
+        from feed_scheduler import FeedScheduler
+        from abstract_fetcher import AbstractFetcher, ResolvedURLCache
+
+    store = FixtureStore(output_dir)
+    scheduler = FeedScheduler(persist=False)
+    with tempfile.TemporaryDirectory() as workdir:
+        # 不使用页面缓存和已有的DOI解析缓存，保证每个页面都真实请求一次
+        fetcher = AbstractFetcher(
+            url_cache=ResolvedURLCache(os.path.join(workdir, 'resolved_urls.json')),
+            use_page_cache=False,
+            stream=False
+        )
+        FixtureRecorder(store).attach(fetcher.session)
+        crawler = RSSCrawler(abstract_fetcher=fetcher, scheduler=scheduler, use_db=False)
+        try:
+            crawler.crawl(force_all=True)
+        finally:
+            crawler.close()
+
+    store.save()
+    with open(os.path.join(output_dir, 'feeds.json'), 'w', encoding='utf-8') as f:
+        json.dump([{"name": feed["name"], "rss_url": feed["rss_url"]} for feed in scheduler.feeds], f, ensure_ascii=False, indent=4)
+    return store
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="爬虫HTTP录制/回放工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="真实爬取一次并录制RSS与文章页面")
+    record_parser.add_argument("--output", required=True, help="夹具输出目录")
+
+    serve_parser = subparsers.add_parser("serve", help="启动回放服务器")
+    serve_parser.add_argument("fixtures", help="夹具目录")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.output)
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), _ReplayHandler)
+    server.resolver = FixtureStore(args.fixtures)
+    print(f"回放服务器: http://{args.host}:{args.port}/<scheme>/<host>/<path>（Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地学科分类器
+
+学科分类是在 PREDEFINED_SUBJECTS 上的封闭集合分类，大部分论文无需调用LLM：
+1. 特征：标题与摘要的词/二元词组，哈希到固定维度（标题词加权），对数词频并做L2归一化
+2. 模型：多分类逻辑回归（softmax），用 NumPy 实现的全批量梯度下降（Adam + L2正则）训练
+3. 训练数据来自 processed_papers 中已有分类的论文，可通过命令行随时重新训练
+4. 预测置信度（最大类别概率）达到阈值时直接使用，否则仍由LLM分类
+训练时按留出集上的准确率自动校准阈值，保存在模型文件中。
+
+使用方法:
+python -m get_data.subject_classifier train
+python -m get_data.subject_classifier train --target-accuracy 0.97 --output model.npz
+python -m get_data.subject_classifier predict --title "..." --abstract "..."
+"""
+
+import os
+import re
+import zlib
+import random
+import logging
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 导入数据库工具类
+try:
+    from .db_helper import DBHelper  # 当作为包导入时
+except ImportError:
+    try:
+        from db_helper import DBHelper  # 当在同一目录下直接运行时
+    except ImportError:
+        DBHelper = None
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 默认模型文件（与其他本地缓存放在一起）
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'subject_model.npz')
+
+# 哈希特征维度
+N_FEATURES = 2 ** 16
+# 标题中的词重复计入的次数（标题信息密度更高）
+TITLE_WEIGHT = 2
+# 未校准时的默认置信度阈值
+DEFAULT_THRESHOLD = 0.8
+# 阈值校准的目标准确率：留出集上置信度不低于阈值的预测应达到该准确率
+TARGET_ACCURACY = 0.95
+# 每个类别至少需要的训练样本数，样本过少的类别不参与训练（由LLM分类）
+MIN_CLASS_SAMPLES = 5
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their this to was were "
+    "which with we our these those using used based data dataset datasets".split()
+)
+
+
+def tokenize(text):
+    """小写分词并去除停用词"""
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+def featurize(title, abstract):
+    """提取哈希特征，返回 (特征下标数组, 特征值数组)"""
+    counts = {}
+    for text, weight in ((title, TITLE_WEIGHT), (abstract, 1)):
+        tokens = tokenize(text)
+        grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % N_FEATURES
+            counts[index] = counts.get(index, 0) + weight
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+
+def _stack(features):
+    """将多篇论文的稀疏特征拼接为 (论文下标, 特征下标, 特征值) 三个数组"""
+    doc_ids = np.concatenate([np.full(len(indices), i, dtype=np.int64) for i, (indices, _) in enumerate(features)])
+    indices = np.concatenate([indices for indices, _ in features])
+    values = np.concatenate([values for _, values in features])
+    return doc_ids, indices, values
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class SubjectClassifier:
+    """哈希特征 + 多分类逻辑回归的学科分类器"""
+
+    def __init__(self, labels, weights, bias, threshold=DEFAULT_THRESHOLD):
+        """
+        参数:
+            labels: 类别名称列表
+            weights: (N_FEATURES, 类别数) 权重矩阵
+            bias: (类别数,) 偏置
+            threshold: 置信度阈值，低于该值的预测交给LLM
+        """
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+
+    @classmethod
+    def train(cls, papers, iterations=300, learning_rate=0.05, l2=1e-5):
+        """用已分类的论文训练模型
+
+        参数:
+            papers: 包含 title、abstract、Subject 的字典列表
+            iterations: 全批量梯度下降的迭代次数
+            learning_rate: Adam 学习率
+            l2: L2正则系数
+        """
+        counts = {}
+        for paper in papers:
+            counts[paper["Subject"]] = counts.get(paper["Subject"], 0) + 1
+        labels = sorted(label for label, count in counts.items() if count >= MIN_CLASS_SAMPLES)
+        if len(labels) < 2:
+            raise ValueError("已分类的论文太少，至少需要两个类别且每类不少于 %d 篇" % MIN_CLASS_SAMPLES)
+        label_index = {label: i for i, label in enumerate(labels)}
+        papers = [paper for paper in papers if paper["Subject"] in label_index]
+
+        doc_ids, indices, values = _stack([featurize(paper.get("title"), paper.get("abstract")) for paper in papers])
+        targets = np.zeros((len(papers), len(labels)), dtype=np.float32)
+        targets[np.arange(len(papers)), [label_index[paper["Subject"]] for paper in papers]] = 1.0
+
+        # 只训练出现过的特征，压缩到紧凑下标上计算
+        used, compact = np.unique(indices, return_inverse=True)
+        weights = np.zeros((len(used), len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, iterations + 1):
+            logits = np.stack([
+                np.bincount(doc_ids, weights=values * weights[compact, k], minlength=len(papers))
+                for k in range(len(labels))
+            ], axis=1) + bias
+            error = (_softmax(logits) - targets) / len(papers)
+            grad_w = np.stack([
+                np.bincount(compact, weights=values * error[doc_ids, k], minlength=len(used))
+                for k in range(len(labels))
+            ], axis=1) + l2 * weights
+            grad_b = error.sum(axis=0)
+            for param, grad, m, v in ((weights, grad_w, moments[0], moments[1]), (bias, grad_b, moments[2], moments[3])):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        full_weights = np.zeros((N_FEATURES, len(labels)), dtype=np.float32)
+        full_weights[used] = weights
+        return cls(labels, full_weights, bias)
+
+    def predict_many(self, papers):
+        """批量预测，返回 [(类别, 置信度), ...]"""
+        if not papers:
+            return []
+        doc_ids, indices, values = _stack([featurize(paper.get("title"), paper.get("abstract")) for paper in papers])
+        logits = np.stack([
+            np.bincount(doc_ids, weights=values * self.weights[indices, k], minlength=len(papers))
+            for k in range(len(self.labels))
+        ], axis=1) + self.bias
+        probs = _softmax(logits)
+        best = probs.argmax(axis=1)
+        return [(self.labels[i], float(probs[row, i])) for row, i in enumerate(best)]
+
+    def predict(self, title, abstract):
+        """预测一篇论文的学科，返回 (类别, 置信度)"""
+        return self.predict_many([{"title": title, "abstract": abstract}])[0]
+
+    def classify(self, title, abstract):
+        """置信度达到阈值时返回类别，否则返回None（交给LLM）"""
+        label, confidence = self.predict(title, abstract)
+        return label if confidence >= self.threshold else None
+
+    def calibrate(self, papers, target_accuracy=TARGET_ACCURACY):
+        """在留出集上选择满足目标准确率的最低阈值，返回各阈值的 (阈值, 覆盖率, 准确率)"""
+        predictions = self.predict_many(papers)
+        report = []
+        chosen = None
+        for threshold in [round(0.3 + 0.05 * i, 2) for i in range(14)]:
+            accepted = [(label, paper["Subject"]) for (label, confidence), paper in zip(predictions, papers) if confidence >= threshold]
+            coverage = len(accepted) / len(papers) if papers else 0.0
+            accuracy = sum(label == truth for label, truth in accepted) / len(accepted) if accepted else 0.0
+            report.append((threshold, coverage, accuracy))
+            if chosen is None and accepted and accuracy >= target_accuracy:
+                chosen = threshold
+        self.threshold = chosen if chosen is not None else 1.01  # 达不到目标准确率时不使用本地分类
+        return report
+
+    def save(self, path=MODEL_FILE):
+        """保存模型（只保存非零权重行）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = np.flatnonzero(np.any(self.weights != 0, axis=1))
+        np.savez_compressed(
+            path, labels=np.array(self.labels), rows=rows, weights=self.weights[rows],
+            bias=self.bias, threshold=np.float32(self.threshold), n_features=N_FEATURES
+        )
+        logger.info(f"学科分类模型已保存: {path}")
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        """加载模型，文件不存在、NumPy不可用或特征维度不一致时返回None"""
+        if np is None or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data["n_features"]) != N_FEATURES:
+                    logger.warning("学科分类模型的特征维度与当前代码不一致，请重新训练")
+                    return None
+                weights = np.zeros((N_FEATURES, len(data["labels"])), dtype=np.float32)
+                weights[data["rows"]] = data["weights"]
+                return cls([str(label) for label in data["labels"]], weights, data["bias"], float(data["threshold"]))
+        except Exception as e:
+            logger.error(f"加载学科分类模型失败: {e}")
+            return None
+
+
+def train_from_db(output=MODEL_FILE, holdout=0.2, target_accuracy=TARGET_ACCURACY, seed=42):
+    """从 processed_papers 训练模型并校准阈值，返回模型"""
+    papers = [paper for paper in DBHelper.get_labelled_papers() if paper.get("title")]
+    logger.info(f"共 {len(papers)} 篇已分类论文")
+    random.Random(seed).shuffle(papers)
+    split = int(len(papers) * (1 - holdout))
+
+    # 先在训练集上训练、在留出集上校准阈值，再用全部数据重新训练
+    model = SubjectClassifier.train(papers[:split])
+    report = model.calibrate([paper for paper in papers[split:] if paper["Subject"] in model.labels], target_accuracy)
+    print("阈值    覆盖率    准确率")
+    for threshold, coverage, accuracy in report:
+        print(f"{threshold:<8.2f}{coverage:<10.1%}{accuracy:.1%}")
+
+    final = SubjectClassifier.train(papers)
+    final.threshold = model.threshold
+    final.save(output)
+    print(f"置信度阈值: {final.threshold:.2f}，类别数: {len(final.labels)}，模型文件: {output}")
+    return final
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地学科分类器")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="用 processed_papers 中已分类的论文重新训练")
+    train_parser.add_argument("--output", default=MODEL_FILE, help="模型文件路径")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="用于校准阈值的留出比例")
+    train_parser.add_argument("--target-accuracy", type=float, default=TARGET_ACCURACY, help="阈值校准的目标准确率")
+
+    predict_parser = subparsers.add_parser("predict", help="预测一篇论文的学科")
+    predict_parser.add_argument("--title", required=True, help="英文标题")
+    predict_parser.add_argument("--abstract", default="", help="摘要")
+    predict_parser.add_argument("--model", default=MODEL_FILE, help="模型文件路径")
+    args = parser.parse_args()
+
+    if np is None:
+        print("错误：本地学科分类器需要 numpy，请先安装")
+        return
+
+    if args.command == "train":
+        if not DBHelper:
+            print("错误：无法导入数据库工具类")
+            return
+        train_from_db(args.output, args.holdout, args.target_accuracy)
+    else:
+        model = SubjectClassifier.load(args.model)
+        if model is None:
+            print("错误：模型不存在，请先运行 train")
+            return
+        label, confidence = model.predict(args.title, args.abstract)
+        decision = "使用本地分类" if confidence >= model.threshold else "交给LLM分类"
+        print(f"{label}（置信度 {confidence:.2f}，阈值 {model.threshold:.2f}，{decision}）")
+
+
+if __name__ == "__main__":
+    main()
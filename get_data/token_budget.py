@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提示词token预算与用量统计模块
+
+1. 粗略估算文本的token数（不依赖分词器）
+2. 按任务限制输入文本的token数：超出预算时在句子边界截断，整句都放不下时才按字符截断
+3. 按任务累计API响应中的实际 prompt/completion token数和耗时，输出每次运行、每个任务、
+   每篇论文的平均用量与费用（设置单价时）
+"""
+
+import os
+import re
+import logging
+import threading
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# 各任务输入文本（标题/摘要，不含提示词模板）的token预算；batch 为批量请求中每篇论文的预算
+TASK_INPUT_BUDGETS = {
+    "translate": 150,
+    "interpret": 1000,
+    "generate_tags": 600,
+    "classify": 500,
+    "combined": 1200,
+    "batch": 600,
+}
+
+# 句子边界：中英文句末标点之后，或换行处
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;])\s+|(?<=[。！？；])|\n+')
+
+# 每百万token的单价（输入/输出），用于估算费用，未设置时不计算费用
+PRICE_PER_M_INPUT = float(os.environ.get("NLP_PRICE_PER_M_INPUT", 0) or 0)
+PRICE_PER_M_OUTPUT = float(os.environ.get("NLP_PRICE_PER_M_OUTPUT", 0) or 0)
+
+
+def estimate_tokens(text):
+    """粗略估算文本的token数：英文约4个字符一个token，中文约每字一个token"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def load_budgets(spec=None):
+    """读取各任务的输入预算，环境变量 NLP_INPUT_BUDGETS 可覆盖默认值，格式如 'interpret=800,classify=400'"""
+    budgets = dict(TASK_INPUT_BUDGETS)
+    spec = spec if spec is not None else os.environ.get("NLP_INPUT_BUDGETS", "")
+    for item in spec.split(","):
+        task, _, value = item.partition("=")
+        if task.strip() and value.strip().isdigit():
+            budgets[task.strip()] = int(value)
+    return budgets
+
+
+def truncate_text(text, budget):
+    """将文本截断到约 budget 个token以内，尽量保留完整句子
+
+    返回:
+        (截断后的文本, 是否发生了截断)
+    """
+    if not text or not budget or estimate_tokens(text) <= budget:
+        return text, False
+
+    # 在不超出预算的最后一个句子边界处截断（保留原文中的标点和空白）
+    cut = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        if estimate_tokens(text[:match.start()]) > budget:
+            break
+        cut = match.start()
+    if cut:
+        return text[:cut].rstrip(), True
+
+    # 第一句就超出预算时按字符截断（按文本的平均每token字符数折算）
+    chars = max(1, len(text) * budget // estimate_tokens(text))
+    return text[:chars].rstrip() + "…", True
+
+
+class TokenLedger:
+    """按任务累计调用次数、token用量和耗时（线程安全）"""
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def record(self, task, prompt_tokens=0, completion_tokens=0, estimated_tokens=0, seconds=0.0, truncated=False):
+        """记录一次API调用的用量
+
+        参数:
+            task: 任务类型
+            prompt_tokens / completion_tokens: API响应中的实际用量
+            estimated_tokens: 请求前预估的输入token数（用于检验预估的准确度）
+            seconds: 请求耗时
+            truncated: 输入是否被截断
+        """
+        with self._lock:
+            entry = self._tasks.setdefault(task, {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "estimated_tokens": 0, "seconds": 0.0, "truncated": 0,
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens or 0
+            entry["completion_tokens"] += completion_tokens or 0
+            entry["estimated_tokens"] += estimated_tokens
+            entry["seconds"] += seconds
+            entry["truncated"] += int(bool(truncated))
+
+    @staticmethod
+    def cost(prompt_tokens, completion_tokens):
+        """按单价估算费用，未设置单价时返回None"""
+        if not (PRICE_PER_M_INPUT or PRICE_PER_M_OUTPUT):
+            return None
+        return round((prompt_tokens * PRICE_PER_M_INPUT + completion_tokens * PRICE_PER_M_OUTPUT) / 1e6, 4)
+
+    def summary(self, papers=0):
+        """用量统计
+
+        参数:
+            papers: 本次运行处理的论文数，大于0时给出每篇论文的平均用量
+
+        返回:
+            dict: {"tasks": {任务: 统计}, "total": 合计, "per_paper": 每篇平均（papers>0时）}
+        """
+        with self._lock:
+            tasks = {task: dict(entry) for task, entry in self._tasks.items()}
+        total = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+        for entry in tasks.values():
+            for key in total:
+                total[key] += entry[key]
+            entry["seconds"] = round(entry["seconds"], 2)
+            entry["cost"] = self.cost(entry["prompt_tokens"], entry["completion_tokens"])
+        total["seconds"] = round(total["seconds"], 2)
+        total["cost"] = self.cost(total["prompt_tokens"], total["completion_tokens"])
+        summary = {"tasks": tasks, "total": total}
+        if papers:
+            summary["per_paper"] = {
+                key: round(value / papers, 4) for key, value in total.items() if value is not None
+            }
+        return summary
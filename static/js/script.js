@@ -475,27 +475,21 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
-        // 数据集链接
+        // 数据集链接（列表接口不包含，按DOI从详情接口获取）
         const datasetsElement = document.getElementById('modalDatasets');
         if (datasetsElement) {
-            const datasetsList = datasetsElement.querySelector('ul');
-            datasetsList.innerHTML = '';
-            
-            if (article.dataset_links && article.dataset_links.length > 0) {
-                article.dataset_links.forEach(link => {
-                    const li = document.createElement('li');
-                    li.className = 'list-group-item';
-                    const a = document.createElement('a');
-                    a.href = link;
-                    a.textContent = link;
-                    a.target = '_blank';
-                    li.appendChild(a);
-                    datasetsList.appendChild(li);
-                });
-                datasetsElement.style.display = 'block';
-            } else {
-                datasetsList.innerHTML = '<li class="list-group-item">暂无相关数据集链接</li>';
-                datasetsElement.style.display = 'block';
+            renderDatasetLinks(datasetsElement, article.dataset_links);
+            if (!article.dataset_links && article.doi) {
+                fetch(`/article/doi/${encodeURI(article.doi)}`)
+                    .then(response => response.json())
+                    .then(detail => {
+                        article.dataset_links = (detail && detail.dataset_links) || [];
+                        // 请求返回前用户可能已打开其他文章
+                        if (document.getElementById('modalDoi').querySelector('span').textContent === article.doi) {
+                            renderDatasetLinks(datasetsElement, article.dataset_links);
+                        }
+                    })
+                    .catch(error => console.error('获取数据集链接失败:', error));
             }
         }
         
@@ -509,6 +503,28 @@ document.addEventListener('DOMContentLoaded', function() {
         modal.style.display = 'block';
     }
 
+    // 渲染数据集链接列表
+    function renderDatasetLinks(datasetsElement, links) {
+        const datasetsList = datasetsElement.querySelector('ul');
+        datasetsList.innerHTML = '';
+        
+        if (links && links.length > 0) {
+            links.forEach(link => {
+                const li = document.createElement('li');
+                li.className = 'list-group-item';
+                const a = document.createElement('a');
+                a.href = link;
+                a.textContent = link;
+                a.target = '_blank';
+                li.appendChild(a);
+                datasetsList.appendChild(li);
+            });
+        } else {
+            datasetsList.innerHTML = '<li class="list-group-item">暂无相关数据集链接</li>';
+        }
+        datasetsElement.style.display = 'block';
+    }
+
     // 关闭模态框
     function closeModal() {
         if (modal) {
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""测试公共配置
+
+1. 把仓库根目录加入导入路径，以 get_data.xxx 的方式导入被测模块
+2. fake_db：不需要 MySQL 的假数据库连接，DBHelper 发出的每条语句交给测试提供的处理函数
+3. nlp_processor：不连数据库、不读缓存和分类器模型的 NLPProcessor（测试自行替换 call_ai_api）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from get_data import process  # noqa: E402
+from get_data.db_helper import DBHelper  # noqa: E402
+from get_data.rate_limiter import RateLimiter  # noqa: E402
+
+
+class FakeDatabase:
+    """假数据库：语句（空白已规整为单个空格）交给 handler(sql, args) 处理
+
+    handler 返回行列表（查询结果）或整数（影响的行数），抛出异常模拟数据库错误。
+    """
+
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda sql, args: [])
+        self.executed = []  # 执行过的全部 (sql, args)
+        self.committed = []  # 已提交的 (sql, args)
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.db.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        sql = " ".join(sql.split())
+        args = list(args or ())
+        self.connection.db.executed.append((sql, args))
+        result = self.connection.db.handler(sql, args)
+        self.connection.pending.append((sql, args))
+        if isinstance(result, int):
+            self.rows = []
+            return result
+        self.rows = list(result or [])
+        return len(self.rows)
+
+    def executemany(self, sql, rows):
+        for row in rows:
+            self.execute(sql, row)
+
+    def fetchall(self):
+        return [dict(row) if isinstance(row, dict) else row for row in self.rows]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """返回 install(handler)：让 DBHelper.get_connection 返回执行 handler 的假连接，并返回 FakeDatabase"""
+    def install(handler=None):
+        db = FakeDatabase(handler)
+        monkeypatch.setattr(DBHelper, "get_connection", staticmethod(db.connect))
+        return db
+    return install
+
+
+@pytest.fixture
+def nlp_processor(monkeypatch):
+    monkeypatch.setattr(process, "NLP_CACHE", False)
+    monkeypatch.setattr(process, "NLP_LOCAL_CLASSIFIER", False)
+    processor = process.NLPProcessor(rate_limiter=RateLimiter(0), router=process.LLMRouter([]),
+                                     combined=False, use_db=False)
+    yield processor
+    processor.close()
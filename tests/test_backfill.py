@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""回填断点：只有断点覆盖了本次日期范围时才跳过该年份"""
+
+import pytest
+
+from get_data import backfill
+from get_data.backfill import BackfillCrawler
+
+# 模拟的年度文章列表：第 n 页只有一篇 (13-n) 月发布的论文，第13页起为空
+PAGES = {n: [{"doi": f"10.1/{n}", "title": "t", "url": "u", "publishDate": f"2023-{13 - n:02d}-15"}]
+         for n in range(1, 13)}
+
+
+class FakeCheckpoints:
+    """内存中的 crawl_checkpoint"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get_crawl_checkpoint(self, source, period):
+        row = self.rows.get((source, period))
+        return dict(row) if row else None
+
+    def save_crawl_checkpoint(self, source, period, next_page, status="in_progress", items_seen=0, items_saved=0,
+                              covered_from=None, covered_to=None):
+        old = self.rows.get((source, period), {})
+        self.rows[(source, period)] = {
+            "next_page": next_page,
+            "status": status,
+            "covered_from": covered_from or old.get("covered_from"),
+            "covered_to": covered_to or old.get("covered_to"),
+        }
+
+
+class FakeListingResponse:
+    status_code = 200
+    url = "listing"
+
+    def __init__(self, page):
+        self.text = page
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.pages = []
+
+    def fetch_page(self, url):
+        page = int(url.rsplit("=", 1)[1])
+        self.pages.append(page)
+        return FakeListingResponse(page)
+
+    def remaining_time(self):
+        return None
+
+
+@pytest.fixture
+def crawler(monkeypatch):
+    checkpoints = FakeCheckpoints()
+    monkeypatch.setattr(backfill, "DBHelper", checkpoints)
+    monkeypatch.setitem(backfill.ARCHIVE_SOURCES, "Test Journal", {
+        "listing_url": "listing?page={page}",
+        "parser": lambda page, url: PAGES.get(page, []),
+        "paged": True,
+    })
+    crawler = BackfillCrawler.__new__(BackfillCrawler)
+    crawler.fetcher = FakeFetcher()
+    crawler.throttle = 0
+    crawler.max_pages = 50
+    crawler._last_request = 0.0
+    crawler._process_items = lambda journal, items, start, end: (len(items), len(items))
+    crawler.checkpoints = checkpoints
+    return crawler
+
+
+def pages_read(crawler, start, end):
+    crawler.fetcher.pages = []
+    assert crawler.backfill_period("Test Journal", 2023, start, end)
+    return crawler.fetcher.pages
+
+
+def test_stops_at_start_date_and_records_coverage(crawler):
+    assert pages_read(crawler, "2023-10-01", "2023-12-31") == [1, 2, 3, 4]
+    row = crawler.checkpoints.rows[("Test Journal", "2023")]
+    assert row["status"] == "done"
+    assert row["covered_from"] == "2023-09-15"
+    assert row["covered_to"] == "2023-12-31"
+
+
+def test_covered_range_is_skipped(crawler):
+    pages_read(crawler, "2023-10-01", "2023-12-31")
+    assert pages_read(crawler, "2023-11-01", "2023-12-31") == []
+
+
+def test_earlier_start_resumes_from_checkpoint(crawler):
+    pages_read(crawler, "2023-10-01", "2023-12-31")
+    assert pages_read(crawler, "2023-01-01", "2023-12-31") == list(range(5, 14))
+    assert crawler.checkpoints.rows[("Test Journal", "2023")]["covered_from"] == "2023-01-01"
+    assert pages_read(crawler, "2023-01-01", "2023-12-31") == []
+
+
+def test_later_end_restarts_from_first_page(crawler):
+    pages_read(crawler, "2023-10-01", "2023-11-30")
+    assert pages_read(crawler, "2023-10-01", "2023-12-31") == [1, 2, 3, 4]
+
+
+def test_legacy_checkpoint_without_range_is_not_trusted(crawler):
+    crawler.checkpoints.rows[("Test Journal", "2023")] = {"next_page": 5, "status": "done",
+                                                          "covered_from": None, "covered_to": None}
+    assert pages_read(crawler, "2023-01-01", "2023-12-31") == list(range(5, 14))
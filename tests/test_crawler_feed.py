@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""RSSCrawler.fetch_feed：通过共享会话下载并解析，下载失败时不再重新请求，也不记为一次成功的轮询"""
+
+import pytest
+import requests
+
+from get_data import crawler
+from get_data.crawler import RSSCrawler
+from get_data.feed_scheduler import FeedScheduler
+from get_data.host_health import HostHealth
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>ESSD</title>
+<item><title>Hourly rainfall records</title><link>https://doi.org/10.5194/essd-16-1-2024</link></item>
+</channel></rss>"""
+
+
+class FakeResponse:
+    def __init__(self, content, status=200):
+        self.content = content
+        self.status_code = status
+        self.headers = {"Content-Type": "application/rss+xml", "Content-Length": str(len(content))}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+
+class FakeSession:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.calls = []
+
+    def get(self, url, timeout=None):
+        self.calls.append(url)
+        if self.error:
+            raise self.error
+        return self.response
+
+
+class FakeFetcher:
+    def __init__(self, session):
+        self.session = session
+        self.host_health = HostHealth()
+
+    def set_deadline(self, seconds):
+        pass
+
+
+def make_crawler(session):
+    return RSSCrawler(abstract_fetcher=FakeFetcher(session), use_db=False, parse_processes=0)
+
+
+def test_parses_downloaded_bytes():
+    session = FakeSession(FakeResponse(RSS))
+    rss_crawler = make_crawler(session)
+    feed = rss_crawler.fetch_feed("https://essd.example/rss")
+    assert [entry.title for entry in feed.entries] == ["Hourly rainfall records"]
+    assert rss_crawler.feed_bytes == len(RSS)
+    assert session.calls == ["https://essd.example/rss"]
+
+
+@pytest.mark.parametrize("session", [
+    FakeSession(error=requests.ConnectionError("connection reset")),
+    FakeSession(FakeResponse(b"", status=503)),
+])
+def test_failed_download_is_not_refetched(session, monkeypatch):
+    parsed = []
+    monkeypatch.setattr(crawler.feedparser, "parse", lambda *args, **kwargs: parsed.append(args))
+    feed = make_crawler(session).fetch_feed("https://essd.example/rss")
+    assert feed.entries == []
+    assert feed.bozo
+    assert parsed == []
+    assert len(session.calls) == 1
+
+
+class RecordingScheduler(FeedScheduler):
+    def __init__(self, feeds):
+        super().__init__(feeds_file=None, persist=False)
+        self.feeds = feeds
+        self.polls = []
+        self.failures = []
+
+    def record_poll(self, feed, publish_dates, new_count, now=None):
+        self.polls.append(feed["name"])
+
+    def record_failure(self, feed, now=None):
+        self.failures.append(feed["name"])
+
+
+def test_failed_feed_is_not_recorded_as_a_poll():
+    scheduler = RecordingScheduler([{"name": "ESSD", "rss_url": "https://essd.example/rss"}])
+    session = FakeSession(error=requests.ConnectionError("connection reset"))
+    rss_crawler = RSSCrawler(abstract_fetcher=FakeFetcher(session), use_db=False, parse_processes=0,
+                             scheduler=scheduler)
+    assert rss_crawler.crawl() == 0
+    assert scheduler.polls == []
+    assert scheduler.failures == ["ESSD"]
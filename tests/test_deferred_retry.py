@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""RSSCrawler.retry_deferred_papers：预算用完或主机熔断时不发请求，也不计入重试次数"""
+
+import pytest
+
+from get_data.crawler import RSSCrawler
+from get_data.db_helper import DBHelper
+from get_data.host_health import HostHealth
+
+
+class FakeFetcher:
+    def __init__(self, remaining=None):
+        self.session = None
+        self.host_health = HostHealth(failure_threshold=1)
+        self.remaining = remaining
+        self.requested = []
+
+    def remaining_time(self):
+        return self.remaining
+
+    def request_url(self, doi_or_url):
+        return doi_or_url
+
+    def fetch_abstract(self, url, journal_name=None):
+        self.requested.append(url)
+        if "down.example" in url:
+            return {"abstract": "", "deferred": True, "error": "状态码 503", "sent": True}
+        if "slow.example" in url:
+            return {"abstract": "", "deferred": True, "error": "退避中", "sent": False}
+        return {"abstract": "web abstract", "deferred": False}
+
+
+@pytest.fixture
+def deferred(monkeypatch):
+    """内存中的 deferred_papers，记录重试写回与入库"""
+    db = {"due": [], "saved": [], "inserted": []}
+    monkeypatch.setattr(DBHelper, "get_due_deferred_papers", staticmethod(lambda: db["due"]))
+    monkeypatch.setattr(DBHelper, "save_deferred_paper",
+                        staticmethod(lambda paper, error="": db["saved"].append(paper["doi"]) or True))
+    monkeypatch.setattr(DBHelper, "insert_raw_paper", staticmethod(lambda paper: db["inserted"].append(paper["doi"]) or True))
+    monkeypatch.setattr(DBHelper, "delete_deferred_paper", staticmethod(lambda doi: True))
+    monkeypatch.setattr(DBHelper, "save_paper_datasets", staticmethod(lambda rows: True))
+    return db
+
+
+def make_crawler(fetcher):
+    crawler = RSSCrawler(abstract_fetcher=fetcher, use_db=False, parse_processes=0)
+    crawler.use_db = True
+    return crawler
+
+
+def item(doi, url, attempts=1):
+    return {"doi": doi, "attempts": attempts, "paper_data": {"doi": doi, "url": url, "abstract": ""}}
+
+
+def test_spent_budget_sends_nothing(deferred):
+    deferred["due"] = [item("10.1/a", "https://ok.example/a")]
+    fetcher = FakeFetcher(remaining=0)
+    assert make_crawler(fetcher).retry_deferred_papers() == 0
+    assert fetcher.requested == []
+    assert deferred["saved"] == []
+
+
+def test_open_circuit_is_skipped_without_counting(deferred):
+    deferred["due"] = [item("10.1/a", "https://open.example/a"), item("10.1/b", "https://ok.example/b")]
+    fetcher = FakeFetcher()
+    fetcher.host_health.record_failure("open.example", "503")
+    assert make_crawler(fetcher).retry_deferred_papers() == 1
+    assert fetcher.requested == ["https://ok.example/b"]
+    assert deferred["inserted"] == ["10.1/b"]
+    assert deferred["saved"] == []
+
+
+def test_only_sent_requests_count_as_attempts(deferred):
+    deferred["due"] = [item("10.1/a", "https://slow.example/a"), item("10.1/b", "https://down.example/b")]
+    fetcher = FakeFetcher()
+    assert make_crawler(fetcher).retry_deferred_papers() == 0
+    assert len(fetcher.requested) == 2
+    assert deferred["saved"] == ["10.1/b"]
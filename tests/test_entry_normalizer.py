@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""EntryNormalizer 的日期解析、DOI提取、摘要清理与条目转换"""
+
+from datetime import date
+
+import feedparser
+import pytest
+
+from get_data.entry_normalizer import EntryNormalizer
+
+
+@pytest.fixture
+def normalizer():
+    return EntryNormalizer()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-03-05", date(2024, 3, 5)),
+    ("2024-03-05T10:00:00Z", date(2024, 3, 5)),
+    ("Tue, 05 Mar 2024 10:00:00 GMT", date(2024, 3, 5)),
+    ("Tue, 5 Mar 2024 10:00:00 +0000", date(2024, 3, 5)),
+    ("Scientific Data, Published online: 2024-03-05; doi:10.1038/s41597", date(2024, 3, 5)),
+    ("05 March 2024", date(2024, 3, 5)),
+])
+def test_parse_date_formats(normalizer, value, expected):
+    assert normalizer.parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "   ", None, "not a date", "2024-13-45"])
+def test_parse_date_invalid(normalizer, value):
+    assert normalizer.parse_date(value) is None
+
+
+def test_parse_date_remembers_format_per_feed(normalizer):
+    assert normalizer.parse_date("05 March 2024", feed="ESSD") == date(2024, 3, 5)
+    assert normalizer._date_formats["ESSD"][0] == "_strptime_date"
+    # 缓存的解析方式失败时仍会尝试其他方式
+    assert normalizer.parse_date("Tue, 05 Mar 2024 10:00:00 GMT", feed="ESSD") == date(2024, 3, 5)
+
+
+def test_format_date_falls_back_to_today(normalizer):
+    assert normalizer.format_date("Tue, 05 Mar 2024 10:00:00 GMT") == "2024-03-05"
+    assert normalizer.format_date("garbage") == date.today().isoformat()
+
+
+@pytest.mark.parametrize("entry, expected", [
+    ({"dc_identifier": "doi:10.1038/s41597-024-0001-x"}, "10.1038/s41597-024-0001-x"),
+    ({"guid": "10.5194/essd-16-1-2024"}, "10.5194/essd-16-1-2024"),
+    ({"link": "https://doi.org/10.5194/essd-16-1-2024"}, "10.5194/essd-16-1-2024"),
+    ({"link": "https://www.nature.com/articles/s41597-024-0001-x"}, "s41597-024-0001-x"),
+    ({"link": "https://example.org/paper"}, ""),
+])
+def test_entry_doi(entry, expected):
+    assert EntryNormalizer.entry_doi(entry) == expected
+
+
+def test_clean_abstract_removes_title_markup_and_metadata(normalizer):
+    raw = ("<p>A Global Dataset</p>\n<p>We present a global dataset of soil moisture.</p>\n"
+           "Earth Syst. Sci. Data, 16, 1-20, 2024")
+    cleaned = normalizer.clean_abstract(raw, "A Global Dataset", "Earth System Science Data")
+    assert cleaned == "We present a global dataset of soil moisture."
+
+
+def test_clean_abstract_removes_author_lines(normalizer):
+    raw = "Alice Smith, Bob Jones, Carol White\nWe release hourly rainfall records."
+    assert normalizer.clean_abstract(raw, "Title", "Other") == "We release hourly rainfall records."
+
+
+def test_normalize_feedparser_entry(normalizer):
+    feed = feedparser.parse("""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>ESSD</title>
+<item>
+  <title>Hourly rainfall records</title>
+  <link>https://doi.org/10.5194/essd-16-1-2024</link>
+  <guid>10.5194/essd-16-1-2024</guid>
+  <description>&lt;p&gt;We release hourly rainfall records.&lt;/p&gt;</description>
+  <pubDate>Tue, 05 Mar 2024 10:00:00 GMT</pubDate>
+  <category>hydrology</category>
+  <author>Alice Smith</author>
+</item></channel></rss>""")
+    paper = normalizer.normalize(feed.entries[0], "Earth System Science Data")
+    assert paper == {
+        "journal": "Earth System Science Data",
+        "title": "Hourly rainfall records",
+        "abstract": "We release hourly rainfall records.",
+        "publishDate": "2024-03-05",
+        "doi": "10.5194/essd-16-1-2024",
+        "url": "https://doi.org/10.5194/essd-16-1-2024",
+        "authors": "Alice Smith",
+        "tags": "hydrology",
+    }
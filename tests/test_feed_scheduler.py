@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""FeedScheduler：成功的轮询按发布频率安排，失败的轮询按最小间隔重试且不改变频率估计"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from get_data import feed_scheduler
+from get_data.feed_scheduler import FeedScheduler
+
+NOW = datetime(2024, 5, 1, 12, 0)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(feed_scheduler, "JITTER", 0)
+    return FeedScheduler(feeds_file=None, persist=False)
+
+
+def make_feed():
+    return {"name": "ESSD", "rss_url": "https://essd.example/rss", "min_interval_minutes": 30,
+            "max_interval_minutes": 1440, "avg_gap_hours": 12.0, "last_polled_at": NOW - timedelta(hours=6),
+            "next_poll_at": NOW, "last_new_count": 3}
+
+
+def test_successful_poll_follows_publish_cadence(scheduler):
+    feed = make_feed()
+    assert scheduler.record_poll(feed, [], 0, now=NOW) == NOW + timedelta(hours=6)
+    assert feed["last_polled_at"] == NOW
+    assert feed["last_new_count"] == 0
+
+
+def test_failed_poll_retries_after_min_interval(scheduler):
+    feed = make_feed()
+    assert scheduler.record_failure(feed, now=NOW) == NOW + timedelta(minutes=30)
+    assert feed["avg_gap_hours"] == 12.0
+    assert feed["last_polled_at"] == NOW - timedelta(hours=6)
+    assert feed["last_new_count"] == 3
+    assert scheduler.due_feeds(now=NOW + timedelta(minutes=29)) == []
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""HostHealth 的退避、熔断、半开与恢复"""
+
+import pytest
+
+from get_data import host_health
+from get_data.host_health import HostHealth
+
+HOST = "www.nature.com"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的单调时钟；退避抖动固定取上限"""
+    now = [100.0]
+    monkeypatch.setattr(host_health.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(host_health.random, "uniform", lambda low, high: high)
+    return now
+
+
+def test_host_of():
+    assert HostHealth.host_of("https://WWW.Nature.com/articles/s41597") == HOST
+    assert HostHealth.host_of("") == ""
+
+
+def test_unknown_host_is_closed(clock):
+    health = HostHealth()
+    assert not health.is_open(HOST)
+    assert health.wait_time(HOST) == 0.0
+
+
+def test_failures_back_off_exponentially(clock):
+    health = HostHealth(failure_threshold=5, base_backoff=1.0, max_backoff=3.0)
+    waits = []
+    for _ in range(4):
+        health.record_failure(HOST)
+        waits.append(health.wait_time(HOST))
+    assert waits == [1.0, 2.0, 3.0, 3.0]
+    assert not health.is_open(HOST)
+
+
+def test_opens_after_threshold_and_recovers(clock):
+    health = HostHealth(failure_threshold=3, cooldown=60.0)
+    for _ in range(3):
+        health.record_failure(HOST)
+    assert health.is_open(HOST)
+    assert health.wait_time(HOST) == 60.0
+
+    # 冷却结束进入半开状态，试探请求成功即恢复
+    clock[0] += 61
+    assert not health.is_open(HOST)
+    health.record_success(HOST)
+    assert health.wait_time(HOST) == 0.0
+    assert health.summary()[HOST] == {"successes": 1, "failures": 3, "open": False}
+
+
+def test_half_open_failure_reopens_with_doubled_cooldown(clock):
+    health = HostHealth(failure_threshold=3, cooldown=60.0, max_cooldown=100.0)
+    for _ in range(3):
+        health.record_failure(HOST)
+    clock[0] += 61
+
+    health.record_failure(HOST)
+    assert health.is_open(HOST)
+    assert health.wait_time(HOST) == 100.0  # 翻倍后受上限约束
+
+    # 恢复后重新从首次冷却时间开始计算
+    clock[0] += 101
+    health.record_success(HOST)
+    for _ in range(3):
+        health.record_failure(HOST)
+    assert health.wait_time(HOST) == 60.0
+
+
+def test_hosts_are_independent(clock):
+    health = HostHealth(failure_threshold=1)
+    health.record_failure(HOST)
+    assert health.is_open(HOST)
+    assert not health.is_open("essd.copernicus.org")
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""extract_dataset_links 的仓储识别、大小写与去重"""
+
+from get_data.html_extract import extract_dataset_links
+
+
+def identifiers(html):
+    return [(item["repository"], item["identifier"]) for item in extract_dataset_links(html)]
+
+
+def test_repository_dois_and_urls():
+    html = ('<a href="https://doi.org/10.5281/zenodo.1234">data</a> '
+            '<a href="https://zenodo.org/records/1234">same record</a> '
+            '<a href="https://doi.org/10.1594/PANGAEA.5678">PANGAEA</a>')
+    assert identifiers(html) == [("Zenodo", "10.5281/zenodo.1234"), ("PANGAEA", "10.1594/PANGAEA.5678")]
+
+
+def test_matching_is_case_insensitive():
+    html = 'https://Zenodo.org/records/99 doi:10.5061/DRYAD.abc12 GEO: gse12345'
+    assert identifiers(html) == [
+        ("Zenodo", "10.5281/zenodo.99"),
+        ("Dryad", "10.5061/DRYAD.abc12"),
+        ("GEO", "GSE12345"),
+    ]
+
+
+def test_accessions_dedupe_across_case_and_skip_words():
+    html = "GSE12345 and gse12345; BioProject PRJNA123456; not an accession: XGSE999"
+    assert identifiers(html) == [("GEO", "GSE12345"), ("BioProject", "PRJNA123456")]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""LLMRouter 在本地模拟端点上的故障切换、限流冷却、对冲请求与限流器额度"""
+
+from collections import deque
+
+import pytest
+
+from get_data import process
+from get_data.llm_router import Endpoint, LLMRouter
+from get_data.mock_llm import MockLLMServer, mock_reply
+from get_data.rate_limiter import RateLimiter
+
+MESSAGES = [{"role": "user", "content": "请将以下英文标题翻译成中文：Hourly rainfall records"}]
+
+
+@pytest.fixture
+def servers():
+    """启动模拟端点的工厂，测试结束后全部关闭"""
+    started = []
+
+    def start(**options):
+        server = MockLLMServer(**options).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def endpoint(name, server, weight=1.0):
+    return Endpoint(name, server.base_url, "mock", "mock", weight=weight, timeout=10)
+
+
+def seed_latency(endpoint, kind, seconds):
+    """写入足够的延迟样本，使该端点对 kind 类请求启用对冲"""
+    endpoint._latencies[kind] = deque([seconds] * 20)
+
+
+def test_mock_reply_formats():
+    assert mock_reply("请从下列预定义的分类 (Subject) 中选择：[地球科学, 生态学]") == "地球科学"
+    assert '"titleCn"' in mock_reply("- titleCn: 中文标题\n", json_mode=True)
+
+
+def test_fails_over_to_healthy_endpoint(servers):
+    bad = endpoint("bad", servers(error_rate=1.0), weight=1e6)
+    good = endpoint("good", servers(latency=0.01))
+    router = LLMRouter([bad, good], hedge_percentile=0)
+    try:
+        response, used = router.complete(MESSAGES)
+    finally:
+        router.close()
+    assert used is good
+    assert response.choices[0].message.content
+    assert bad.stats()["errors"] == 1
+    assert good.stats()["requests"] == 1
+
+
+def test_raises_when_all_endpoints_fail(servers):
+    router = LLMRouter([endpoint("a", servers(error_rate=1.0)), endpoint("b", servers(error_rate=1.0))],
+                       hedge_percentile=0)
+    try:
+        with pytest.raises(Exception):
+            router.complete(MESSAGES)
+    finally:
+        router.close()
+    assert all(stats["errors"] == 1 for stats in router.summary().values())
+
+
+def test_throttled_endpoint_cools_down(servers):
+    throttled = endpoint("throttled", servers(throttle_rate=1.0), weight=1e6)
+    good = endpoint("good", servers(latency=0.01))
+    router = LLMRouter([throttled, good], hedge_percentile=0)
+    try:
+        router.complete(MESSAGES)
+        assert throttled.stats()["throttled"] == 1
+        assert not throttled.available()
+        # 冷却期内即使权重更高也不会被选中
+        assert all(router.choose() is good for _ in range(20))
+    finally:
+        router.close()
+
+
+def test_slow_request_is_hedged(servers):
+    slow = endpoint("slow", servers(latency=2.0), weight=1e6)
+    fast = endpoint("fast", servers(latency=0.01))
+    seed_latency(slow, "translate", 0.05)
+    router = LLMRouter([slow, fast], hedge_percentile=95)
+    try:
+        _, used = router.complete(MESSAGES, kind="translate")
+    finally:
+        router.close()
+    assert used is fast
+    assert fast.stats()["hedges"] == 1
+    assert fast.stats()["hedge_wins"] == 1
+
+
+def test_hedge_skipped_without_rate_limiter_quota(servers):
+    slow = endpoint("slow", servers(latency=0.3), weight=1e6)
+    fast = endpoint("fast", servers(latency=0.01))
+    seed_latency(slow, "translate", 0.05)
+    router = LLMRouter([slow, fast], hedge_percentile=95)
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire()  # 调用方为首个请求取走了唯一的额度
+    try:
+        _, used = router.complete(MESSAGES, kind="translate", rate_limiter=limiter)
+    finally:
+        router.close()
+    assert used is slow
+    assert fast.stats()["requests"] == 0
+
+
+def test_failover_takes_rate_limiter_quota(servers):
+    bad = endpoint("bad", servers(error_rate=1.0), weight=1e6)
+    good = endpoint("good", servers(latency=0.01))
+    router = LLMRouter([bad, good], hedge_percentile=0)
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.acquire(100)  # 调用方为首个请求预留的额度
+    try:
+        router.complete(MESSAGES, rate_limiter=limiter, estimated_tokens=100)
+    finally:
+        router.close()
+    # 两个请求都占用请求额度；失败请求的token额度归还，只剩返回的响应由调用方按实际用量修正
+    assert limiter.requests._tokens == pytest.approx(58, abs=0.1)
+    assert limiter.tokens._tokens == pytest.approx(5900, abs=10)
+
+
+def test_losing_hedge_is_charged_actual_usage(servers):
+    slow = endpoint("slow", servers(latency=0.3), weight=1e6)
+    fast = endpoint("fast", servers(latency=0.01))
+    seed_latency(slow, "translate", 0.05)
+    router = LLMRouter([slow, fast], hedge_percentile=95)
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(200)
+    try:
+        response, used = router.complete(MESSAGES, kind="translate", rate_limiter=limiter, estimated_tokens=200)
+        limiter.record_usage(200, response.usage.total_tokens)
+    finally:
+        router._executor.shutdown(wait=True)  # 等待落败的慢请求完成并修正额度
+    assert used is fast
+    # 两个请求的回复相同，都按实际用量而不是预估用量扣减
+    assert limiter.tokens._tokens == pytest.approx(600 - 2 * response.usage.total_tokens, abs=10)
+
+
+def test_processor_closes_router(servers, monkeypatch):
+    monkeypatch.setattr(process, "NLP_CACHE", False)
+    monkeypatch.setattr(process, "NLP_LOCAL_CLASSIFIER", False)
+    router = LLMRouter([endpoint("mock", servers(latency=0.01))])
+    with process.NLPProcessor(rate_limiter=RateLimiter(0), router=router, use_db=False) as processor:
+        assert processor.call_ai_api("Hourly rainfall records", "translate")
+    assert router._executor._shutdown
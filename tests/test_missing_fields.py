@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""missing_fields：SQL 表达式与 Python 计算结果一致"""
+
+import itertools
+import re
+import sqlite3
+
+import pytest
+
+from get_data.db_helper import MISSING_FIELDS_SQL, NLP_FIELDS, missing_fields_mask
+
+# 各字段的取值：NULL、空串、各种空白、正常文本、两端带空白的文本
+VALUES = [None, "", " ", "  \t", "\n", " \r\n ", "地球科学", " 数据 ", "a\tb"]
+
+# CHAR(n USING utf8mb4) 换成 SQLite 的 char(n)，其余语法两者相同
+SQLITE_MISSING_FIELDS_SQL = re.sub(r"CHAR\((\d+) USING utf8mb4\)", r"char(\1)", MISSING_FIELDS_SQL)
+
+
+@pytest.fixture
+def conn():
+    """用 SQLite 计算 MISSING_FIELDS_SQL"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE processed_papers (id INTEGER PRIMARY KEY, {', '.join(NLP_FIELDS)})")
+    yield conn
+    conn.close()
+
+
+def sql_mask(conn, paper):
+    conn.execute("DELETE FROM processed_papers")
+    conn.execute(f"INSERT INTO processed_papers ({', '.join(NLP_FIELDS)}) VALUES ({', '.join('?' * len(NLP_FIELDS))})",
+                 [paper.get(field) for field in NLP_FIELDS])
+    return conn.execute(f"SELECT {SQLITE_MISSING_FIELDS_SQL} FROM processed_papers").fetchone()[0]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_single_field_parity(conn, value):
+    for field in NLP_FIELDS:
+        paper = dict.fromkeys(NLP_FIELDS, "ok")
+        paper[field] = value
+        assert sql_mask(conn, paper) == missing_fields_mask(paper)
+
+
+def test_whitespace_only_is_missing(conn):
+    paper = {"titleCn": " \t", "interpretationCn": "\r\n", "tags": "标签", "Subject": None}
+    assert missing_fields_mask(paper) == 0b1011
+    assert sql_mask(conn, paper) == 0b1011
+
+
+def test_combinations_parity(conn):
+    for combo in itertools.product([None, " ", "x"], repeat=len(NLP_FIELDS)):
+        paper = dict(zip(NLP_FIELDS, combo))
+        assert sql_mask(conn, paper) == missing_fields_mask(paper)
+
+
+def test_tag_list_is_joined():
+    assert missing_fields_mask({"titleCn": "t", "interpretationCn": "i", "tags": ["a", "b"], "Subject": "s"}) == 0
+    assert missing_fields_mask({"titleCn": "t", "interpretationCn": "i", "tags": [], "Subject": "s"}) == 0b0100
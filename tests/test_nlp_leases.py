@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""claim_unprocessed_raw_papers / renew_nlp_leases / release_nlp_leases 的租约领取、过期接管与释放
+
+测试不需要 MySQL：LeaseDatabase 按 DBHelper 发出的语句维护内存中的 raw_papers、processed_papers
+与 nlp_leases，NOW() 由测试控制。
+"""
+
+import pytest
+
+from get_data import process
+from get_data.db_helper import DBHelper, missing_fields_mask
+
+
+class LeaseDatabase:
+    """只实现租约相关语句的内存数据库（作为 fake_db 的语句处理函数）"""
+
+    def __init__(self, dois):
+        self.now = 0
+        self.raw = {doi: {"doi": doi, "title": doi, "tags": "a,b", "content_hash": f"hash-{doi}", "id": 1,
+                          "created_at": None, "updated_at": None} for doi in dois}
+        self.processed = {}  # doi -> 处理后论文
+        self.leases = {}  # doi -> {"worker_id", "lease_until", "attempts"}
+
+    def use_for_processed_papers(self, monkeypatch):
+        """处理后论文的写入也落到本数据库（代替 insert_processed_paper / update_processed_fields）"""
+        def insert(paper):
+            self.processed[paper["doi"]] = dict(paper)
+            return True
+
+        def update(doi, fields):
+            self.processed[doi].update(fields)
+            return True
+
+        monkeypatch.setattr(DBHelper, "insert_processed_paper", staticmethod(insert))
+        monkeypatch.setattr(DBHelper, "update_processed_fields", staticmethod(update))
+
+    def unprocessed(self, doi):
+        paper = self.processed.get(doi)
+        return paper is None or paper["source_hash"] != self.raw[doi]["content_hash"]
+
+    def incomplete(self, doi):
+        return doi in self.processed and missing_fields_mask(self.processed[doi]) != 0
+
+    def stored_fields(self, doi):
+        paper = self.processed.get(doi, {})
+        fields = {f"p_{field}": paper.get(field) for field in ("titleCn", "interpretationCn", "Subject", "subject_source")}
+        fields["p_tags"] = ",".join(paper["tags"]) if isinstance(paper.get("tags"), list) else paper.get("tags")
+        return fields
+
+    def active(self, doi):
+        lease = self.leases.get(doi)
+        return lease is not None and lease["lease_until"] >= self.now
+
+    def __call__(self, sql, args):
+        if sql.startswith("SELECT r.doi FROM raw_papers r"):
+            assert "OR p.missing_fields != 0)" in sql and "(l.doi IS NULL OR l.lease_until < NOW())" in sql
+            limit = args[0]
+            return [(doi,) for doi in self.raw
+                    if (self.unprocessed(doi) or self.incomplete(doi)) and not self.active(doi)][:limit]
+        if sql.startswith("INSERT INTO nlp_leases"):
+            assert "worker_id = IF(lease_until < NOW()" in sql
+            doi, worker_id, seconds = args
+            lease = self.leases.get(doi)
+            if lease is None:
+                self.leases[doi] = {"worker_id": worker_id, "lease_until": self.now + seconds, "attempts": 1}
+            elif lease["lease_until"] < self.now:
+                lease.update(worker_id=worker_id, lease_until=self.now + seconds, attempts=lease["attempts"] + 1)
+            return []
+        if sql.startswith("SELECT r.*"):
+            worker_id, dois = args[0], args[1:]
+            return [dict(self.raw[doi], **self.stored_fields(doi), lease_attempts=self.leases[doi]["attempts"],
+                         already_processed=int(doi in self.processed and self.unprocessed(doi)),
+                         resume=int(doi in self.processed and not self.unprocessed(doi)))
+                    for doi in dois if self.leases[doi]["worker_id"] == worker_id]
+        if sql.startswith("UPDATE nlp_leases SET lease_until"):
+            seconds, worker_id, dois = args[0], args[1], args[2:]
+            renewed = 0
+            for doi in dois:
+                lease = self.leases.get(doi)
+                if lease and lease["worker_id"] == worker_id:
+                    lease["lease_until"] = self.now + seconds
+                    renewed += 1
+            return renewed
+        if sql.startswith("DELETE l FROM nlp_leases l"):
+            assert "p.source_hash <=> r.content_hash AND p.missing_fields = 0" in sql
+            worker_id, dois = args[0], args[1:]
+            released = 0
+            for doi in dois:
+                lease, paper = self.leases.get(doi), self.processed.get(doi)
+                if (lease and lease["worker_id"] == worker_id and paper and not self.unprocessed(doi)
+                        and missing_fields_mask(paper) == 0):
+                    del self.leases[doi]
+                    released += 1
+            return released
+        raise AssertionError(f"未模拟的语句: {sql[:80]}")
+
+
+@pytest.fixture
+def db(fake_db):
+    db = LeaseDatabase([f"10.1/{i}" for i in range(5)])
+    fake_db(db)
+    return db
+
+
+def dois(papers):
+    return sorted(paper["doi"] for paper in papers)
+
+
+def test_claim_returns_papers_and_cleans_fields(db):
+    papers = DBHelper.claim_unprocessed_raw_papers("w1", limit=2)
+    assert dois(papers) == ["10.1/0", "10.1/1"]
+    assert papers[0]["tags"] == ["a", "b"]
+    for key in ("id", "created_at", "updated_at", "lease_attempts", "p_titleCn", "processed_fields"):
+        assert key not in papers[0]
+
+
+def test_active_leases_are_not_claimed_twice(db):
+    first = DBHelper.claim_unprocessed_raw_papers("w1", limit=3)
+    second = DBHelper.claim_unprocessed_raw_papers("w2", limit=10)
+    assert not set(dois(first)) & set(dois(second))
+    assert len(first) + len(second) == 5
+    assert DBHelper.claim_unprocessed_raw_papers("w3") == []
+
+
+def test_expired_lease_is_taken_over(db):
+    DBHelper.claim_unprocessed_raw_papers("w1", limit=5, lease_seconds=600)
+    db.now = 599
+    assert DBHelper.claim_unprocessed_raw_papers("w2") == []
+
+    # w1 崩溃，租约过期后由 w2 接管
+    db.now = 601
+    papers = DBHelper.claim_unprocessed_raw_papers("w2", limit=5)
+    assert len(papers) == 5
+    assert all(lease["worker_id"] == "w2" and lease["attempts"] == 2 for lease in db.leases.values())
+
+
+def test_renewed_lease_is_not_taken_over(db):
+    claimed = DBHelper.claim_unprocessed_raw_papers("w1", limit=2, lease_seconds=600)
+    db.now = 500
+    assert DBHelper.renew_nlp_leases("w1", dois(claimed), lease_seconds=600) == 2
+    # 只有另一个进程的租约不能续期
+    assert DBHelper.renew_nlp_leases("w2", dois(claimed)) == 0
+
+    db.now = 700
+    papers = DBHelper.claim_unprocessed_raw_papers("w2", limit=5)
+    assert not set(dois(papers)) & set(dois(claimed))
+
+
+def test_claim_without_connection(monkeypatch):
+    monkeypatch.setattr(DBHelper, "get_connection", staticmethod(lambda: None))
+    assert DBHelper.claim_unprocessed_raw_papers("w1") == []
+
+
+def test_failed_paper_keeps_lease(db, nlp_processor, monkeypatch):
+    db.use_for_processed_papers(monkeypatch)
+    # 10.1/0 的所有字段都生成失败：骨架记录已带有内容哈希，但字段不全，租约不能释放
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: "" if text == "10.1/0" else "结果"
+    count, reprocessed = nlp_processor.process_pending(batch=False, worker_id="w1", claim_size=5)
+    assert count == 4
+    assert reprocessed == set()
+    assert db.processed["10.1/0"]["source_hash"] == "hash-10.1/0"
+    assert list(db.leases) == ["10.1/0"]
+
+
+def test_incomplete_paper_resumes_outstanding_fields(db, nlp_processor, monkeypatch):
+    db.use_for_processed_papers(monkeypatch)
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: "" if task == "translate" else "结果"
+    nlp_processor.process_pending(batch=False, worker_id="w1", claim_size=5, lease_seconds=600)
+    assert len(db.leases) == 5
+
+    # 租约到期后重新领取，只生成缺失的中文标题（标签来自原始数据，其余字段已保存）
+    db.now = 601
+    tasks = []
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: tasks.append(task) or "译文"
+    count, reprocessed = nlp_processor.process_pending(batch=False, worker_id="w2", claim_size=5)
+    assert (count, reprocessed) == (5, set())
+    assert tasks == ["translate"] * 5
+    assert db.leases == {}
+    paper = db.processed["10.1/0"]
+    assert (paper["titleCn"], paper["interpretationCn"], paper["Subject"]) == ("译文", "结果", "结果")
+    assert paper["subject_source"] == "llm"
+
+
+def test_batch_resume_requests_only_missing_fields(db, nlp_processor, monkeypatch):
+    db.use_for_processed_papers(monkeypatch)
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: "" if task == "translate" else "结果"
+    nlp_processor.process_pending(batch=False, worker_id="w1", claim_size=5, lease_seconds=600)
+
+    db.now = 601
+    requested = []
+
+    def call_ai_api(text, task, fields=None, **kwargs):
+        requested.append((task, fields))
+        return {doi: {"titleCn": "译文"} for doi in db.raw}
+
+    nlp_processor.call_ai_api = call_ai_api
+    count, _ = nlp_processor.process_pending(batch=True, worker_id="w2", claim_size=5)
+    assert count == 5
+    assert requested == [("batch", ["titleCn"])]
+    assert db.leases == {}
+
+
+def test_worker_completes_failed_papers_after_lease_expiry(db, nlp_processor, monkeypatch):
+    db.use_for_processed_papers(monkeypatch)
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: ""
+    assert nlp_processor.run_worker(batch=False, once=True) == 0
+    assert all(missing_fields_mask(paper) for paper in db.processed.values())
+
+    db.now = process.NLP_LEASE_SECONDS + 1
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: "结果"
+    assert nlp_processor.run_worker(batch=False, once=True) == 5
+    assert not any(missing_fields_mask(paper) for paper in db.processed.values())
+    assert db.leases == {}
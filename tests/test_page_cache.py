@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""PageCache 的读写与LRU淘汰"""
+
+import os
+
+import pytest
+
+from get_data import page_cache
+from get_data.page_cache import PageCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的时钟：每次读取前进1秒，保证访问时间严格递增"""
+    now = [1000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(page_cache.time, "time", tick)
+    return now
+
+
+def page(size=4000):
+    # 随机字节不可压缩，压缩后大小约等于原始大小
+    return os.urandom(size)
+
+
+def test_put_and_get_by_url_and_doi(tmp_path):
+    cache = PageCache(str(tmp_path))
+    content = b"<html>abstract</html>"
+    cache.put("https://doi.org/10.1/x", "https://example.org/x", content, headers={"Content-Type": "text/html"},
+              encoding="utf-8", doi="10.1/X")
+
+    for hit in (cache.get(url="https://doi.org/10.1/x"), cache.get(url="https://example.org/x"), cache.get(doi="10.1/x")):
+        assert hit.content == content
+        assert hit.final_url == "https://example.org/x"
+        assert hit.headers["Content-Type"] == "text/html"
+    assert cache.get(url="https://example.org/other") is None
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = PageCache(str(tmp_path), max_bytes=10000)
+    cache.put("a", "a", page())
+    cache.put("b", "b", page())
+    # 访问 a 之后，b 成为最久未访问的页面
+    assert cache.get(url="a") is not None
+    cache.put("c", "c", page())
+
+    assert cache.get(url="b") is None
+    assert cache.get(url="a") is not None
+    assert cache.get(url="c") is not None
+    assert cache.total_bytes() <= 10000
+    cache.close()
+
+
+def test_keeps_newest_page_even_when_over_limit(tmp_path, clock):
+    cache = PageCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", "a", page())
+    cache.put("b", "b", page())
+
+    assert len(cache) == 1
+    assert cache.get(url="b") is not None
+    cache.close()
+
+
+def test_shared_content_is_stored_once(tmp_path, clock):
+    cache = PageCache(str(tmp_path), max_bytes=10000)
+    content = page()
+    cache.put("a", "a", content)
+    cache.put("b", "b", content)
+    assert cache.total_bytes() < 2 * len(content)
+
+    # a 改为其他正文后，仍被 b 引用的正文不会被删除
+    cache.put("a", "a", page())
+    assert cache.get(url="b").content == content
+    cache.close()
+
+
+def test_truncated_page_is_not_cached(tmp_path):
+    cache = PageCache(str(tmp_path))
+    assert cache.put("a", "a", b"<html>partial", headers={page_cache.TRUNCATED_HEADER: "1"}) is None
+    assert cache.get(url="a") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_truncated_page_does_not_replace_full_page(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("a", "a", b"<html>full</html>")
+    cache.put("a", "a", b"<html>partial", headers={page_cache.TRUNCATED_HEADER: "1"})
+    assert cache.get(url="a").content == b"<html>full</html>"
+    cache.close()
+
+
+def test_legacy_truncated_entries_are_misses(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("a", "a", b"<html>partial", doi="10.1/a")
+    cache.put("b", "b", b"<html>full</html>")
+    # 旧版本写入的截断页面：索引中带有截断标记
+    cache._conn.execute("UPDATE pages SET headers = ? WHERE final_url = 'a'",
+                        ('{"%s": "1"}' % page_cache.TRUNCATED_HEADER,))
+    cache._conn.commit()
+
+    assert cache.get(url="a") is None
+    assert cache.get(doi="10.1/a") is None
+    assert [page.final_url for page in cache.iter_pages()] == ["b"]
+    cache.close()
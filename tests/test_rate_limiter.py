@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""TokenBucket / RateLimiter 的补充、预留与等待"""
+
+import pytest
+
+from get_data import rate_limiter
+from get_data.rate_limiter import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的单调时钟，sleep 直接推进时钟"""
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    return now
+
+
+def test_bucket_starts_full_and_refills_at_rate(clock):
+    bucket = TokenBucket(60)  # 每秒补充1个
+    for _ in range(60):
+        assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock[0] += 10
+    # 透支的1个先补上，之后还剩9个
+    for _ in range(9):
+        assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(60, capacity=5)
+    for _ in range(5):
+        bucket.reserve()
+    clock[0] += 3600
+    for _ in range(5):
+        assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_oversized_request_waits_for_capacity_only(clock):
+    bucket = TokenBucket(600, capacity=100)
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(1000) == pytest.approx(10.0)
+
+
+def test_adjust_returns_unused_tokens(clock):
+    bucket = TokenBucket(60, capacity=10)
+    bucket.reserve(10)
+    bucket.adjust(4)
+    for _ in range(4):
+        assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0
+
+
+def test_limiter_waits_for_the_slower_bucket(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    assert limiter.acquire(600) == 0.0
+    # 请求桶还有额度，token桶需要等待 100 个token（10秒）
+    assert limiter.acquire(100) == pytest.approx(10.0)
+    assert clock[0] == pytest.approx(10.0)
+    assert limiter.summary()["waited_seconds"] == pytest.approx(10.0)
+
+
+def test_record_usage_corrects_estimate(clock):
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600)
+    limiter.acquire(600)
+    limiter.record_usage(600, 100)  # 实际只用了100个
+    assert limiter.acquire(500) == 0.0
+
+
+def test_backoff_pauses_all_requests(clock):
+    limiter = RateLimiter(requests_per_minute=0)
+    limiter.backoff(5)
+    assert limiter.acquire() == pytest.approx(5.0)
+    assert limiter.acquire() == 0.0
+    assert limiter.summary()["throttled"] == 1
+
+
+def test_try_acquire_never_waits(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+    assert limiter.try_acquire(400)
+    # token桶不足时不扣减请求额度
+    assert not limiter.try_acquire(700)
+    assert limiter.try_acquire(600)
+    assert not limiter.try_acquire()
+    assert clock[0] == 0.0
+
+    clock[0] += 30  # 补充1个请求、500个token
+    assert limiter.try_acquire(500)
+
+
+def test_try_acquire_respects_backoff(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.backoff(5)
+    assert not limiter.try_acquire()
+    clock[0] += 5
+    assert limiter.try_acquire()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""bulk_upsert_raw_papers：整批写入失败时逐条写入，跳过出错的论文"""
+
+import pytest
+
+from get_data import db_helper
+from get_data.db_helper import DBHelper
+
+
+def upsert_handler(sql, args):
+    if any("bad" in str(value) for value in args):
+        raise db_helper.pymysql.err.DataError(1406, "Data too long")
+    return []
+
+
+@pytest.fixture
+def db(fake_db, monkeypatch):
+    monkeypatch.setattr(DBHelper, "_fetch_raw_rows", staticmethod(lambda cursor, dois: {}))
+    return fake_db(upsert_handler)
+
+
+def test_bulk_upsert_skips_bad_row(db):
+    papers = [{"doi": "10.1/a", "title": "a"}, {"doi": "10.1/b", "title": "bad"}, {"doi": "10.1/c", "title": "c"}]
+    assert DBHelper.bulk_upsert_raw_papers(papers) == 2
+    assert sorted(args[-2] for _, args in db.committed) == ["10.1/a", "10.1/c"]
+
+
+def test_bulk_upsert_all_rows_failing(db):
+    assert DBHelper.bulk_upsert_raw_papers([{"doi": "10.1/b", "title": "bad"}]) is None
+    assert DBHelper.insert_raw_paper({"doi": "10.1/b", "title": "bad"}) is False
+    assert db.committed == []
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""学科分类来源：本地分类器的结果标记为 classifier，且不进入分类器的训练数据"""
+
+import pytest
+
+from get_data.db_helper import DBHelper
+
+
+class FixedClassifier:
+    def __init__(self, subject):
+        self.subject = subject
+
+    def classify(self, title, abstract):
+        return self.subject
+
+
+@pytest.fixture
+def processor(nlp_processor):
+    nlp_processor.call_ai_api = lambda text, task, **kwargs: "生态学" if task == "classify" else "译文"
+    return nlp_processor
+
+
+def test_llm_subject_is_marked_llm(processor):
+    saved = []
+    results = processor.generate_fields("Title", "Abstract", ["titleCn", "Subject"], on_result=saved.append)
+    assert results["Subject"] == "生态学"
+    assert results["subject_source"] == "llm"
+    assert {"Subject": "生态学", "subject_source": "llm"} in saved
+
+
+def test_classifier_subject_is_marked_classifier(processor):
+    processor.classifier = FixedClassifier("地球科学")
+    saved = []
+    results = processor.generate_fields("Title", "Abstract", ["titleCn", "Subject"], on_result=saved.append)
+    assert results["subject_source"] == "classifier"
+    assert saved[0] == {"Subject": "地球科学", "subject_source": "classifier"}
+
+
+def test_no_source_without_subject(processor):
+    assert "subject_source" not in processor.generate_fields("Title", "Abstract", ["titleCn"])
+
+
+def test_labelled_papers_exclude_classifier_labels(fake_db):
+    db = fake_db()
+    assert DBHelper.get_labelled_papers() == []
+    assert "subject_source != 'classifier'" in db.executed[0][0]